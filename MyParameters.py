@@ -0,0 +1,24 @@
+from enum import Enum
+
+
+class MyParameters(Enum):
+    # discover on the integer-encoded, variant-compressed log (compact_log.CompactLog)
+    COMPACT_LOG = "compact_log"
+    # discover a process tree for every party log instead of only the first one
+    MULTI_PARTY = "multi_party"
+    # number of worker processes (default: number of cpus)
+    N_JOBS = "n_jobs"
+    # subtree_cache.SubtreeCache memoizing the subtrees discovered on identical sublogs
+    SUBTREE_CACHE = "subtree_cache"
+    # order in which discovery_engine.DiscoveryEngine expands the pending subtrees: 'lifo' (default), 'fifo',
+    # 'largest_first' or a scheduler object
+    SCHEDULER = "scheduler"
+    # soft bound of the pending subtrees of the discovery engine
+    MAX_FRONTIER = "max_frontier"
+    # minimum number of events of a child sublog discovered on a pool of MyParameters.N_JOBS processes (default:
+    # None, every subtree is discovered in the process of its parent)
+    PARALLEL_THRESHOLD = "parallel_threshold"
+    # discovery_profiler.DiscoveryProfiler recording the time spent in every phase of the discovery (default: none)
+    PROFILER = "profiler"
+    # subtree_cache.SweepCache shared by discoveries differing only in the noise threshold (see noise_sweep)
+    SWEEP_CACHE = "sweep_cache"
@@ -1,217 +1,411 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 from pm4py import util as pmutil
-from pm4py.algo.discovery.dfg.variants import native as dfg_inst
 from pm4py.algo.discovery.inductive.util import shared_constants
-from pm4py.algo.discovery.inductive.util import tree_consistency
 from pm4py.algo.discovery.inductive.util.petri_el_count import Counts
 from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
 from pm4py.objects.log.obj import EventLog
 from pm4py.objects.log.util import filtering_utils
-from pm4py.objects.process_tree.utils import generic
-from pm4py.objects.process_tree.utils.generic import tree_sort
-from pm4py.statistics.attributes.log import get as attributes_get
-from pm4py.statistics.end_activities.log import get as end_activities_get
-from pm4py.statistics.start_activities.log import get as start_activities_get
 import pm4py
 import my_subtree_infrequent
 from pm4py.objects.process_tree.obj import ProcessTree
 import MyOperator
-from pm4py.objects.process_tree.obj import Operator
+import message_correlation
+import subtree_cache
+import array_tree
+from array_tree import ArrayTree, ArrayTreeBuilder
 from pm4py.util import exec_utils, xes_constants
-from pm4py.algo.discovery.inductive.variants.im.util.get_tree_repr_implain import get_transition
+from MyParameters import MyParameters
+from compact_log import CompactLog
+from log_cache import ColumnarLog
 
 
-def not_working_discover_in_nodes(log: list[EventLog], dfg: dict[EventLog, list[tuple[tuple[str, str], int]]]) -> \
-        dict[EventLog, list[tuple[tuple[str, str], int]]]:
-    sender_nodes = {}
-    sender_nodes[log[0]] = [(('PIPPO', 'Receive patient results'), 50)]
-    return sender_nodes
+def discover_in_nodes(log: list[EventLog], parameters=None) -> dict[int, list[tuple[tuple[str, str], int]]]:
+    """
+    Matches the messages received by every party with the ones sent by the other parties
 
+    Returns
+    -----------
+    dict
+        Index of the receiving party -> list of ((sender activity, receiver activity), number of messages)
+    """
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
+    return message_correlation.build_message_index(log, activity_key).sender_nodes()
 
-def discover_in_nodes(log: EventLog, dfg: list[tuple[tuple[str, str], int]]) -> list[tuple[tuple[str, str], int]]:
-    sender_nodes = [(('PIPPO', 'Receive patient results'), 50)]
-    return sender_nodes
 
+def discover_out_nodes(log: list[EventLog], parameters=None) -> dict[int, list[tuple[tuple[str, str], int]]]:
+    """
+    Same as discover_in_nodes, from the point of view of the sending party
 
-def discover_out_nodes(log: list[EventLog], dfg: list[tuple[tuple[str, str], int]]):
-    receiver_nodes = []
-    return receiver_nodes
+    Returns
+    -----------
+    dict
+        Index of the sending party -> list of ((sender activity, receiver activity), number of messages)
+    """
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
+    return message_correlation.build_message_index(log, activity_key).receiver_nodes()
+
+
+def prepare_party_log(party_log, parameters, convert=False):
+    """
+    Brings a party log in the form used by the discovery
+
+    Parameters
+    -----------
+    party_log
+        Log of a single party (EventLog, CompactLog, ColumnarLog or any format accepted by the log converter)
+    parameters
+        Parameters of the algorithm
+    convert
+        Whether the log has still to be converted to an EventLog
+
+    Returns
+    -----------
+    log
+        EventLog with only the activity attribute, or CompactLog if MyParameters.COMPACT_LOG is set
+    """
+    if isinstance(party_log, CompactLog):
+        return party_log
+    use_compact_log = exec_utils.get_param_value(MyParameters.COMPACT_LOG, parameters, False)
+    if isinstance(party_log, ColumnarLog):
+        if use_compact_log:
+            return party_log.to_compact_log()
+        party_log = party_log.to_event_log()
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
+    if convert:
+        from pm4py.objects.conversion.log import converter
+        party_log = converter.apply(party_log, parameters=parameters)
+    if use_compact_log:
+        # intern the activities and collapse identical traces into variants
+        return CompactLog.from_event_log(party_log, activity_key)
+    # keep only the activity attribute (since the others are not used)
+    return filtering_utils.keep_only_one_attribute_per_event(party_log, activity_key)
 
 
 def my_apply_tree(log: list[EventLog], parameters):
-    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
-                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
+    if exec_utils.get_param_value(MyParameters.MULTI_PARTY, parameters, False):
+        return my_apply_tree_multi_party(log, parameters)
 
+    # the message attributes are dropped by prepare_party_log, the messages are matched before
+    sender_nodes = discover_in_nodes(log, parameters)
     for index, trace in enumerate(log):
-        # keep only the activity attribute (since the others are not used)
-        log[index] = filtering_utils.keep_only_one_attribute_per_event(trace, activity_key)
+        log[index] = prepare_party_log(trace, parameters)
+
+    return discover_party_tree(log[0], parameters, sender_nodes.get(0, []))
+
+
+def _discover_party(party_log, parameters, convert, sender_nodes):
+    # top level function, so that it can be sent to the workers of the pool; the profiler of the worker and what
+    # its copies of the caches learned are sent back along with the tree
+    tree = discover_party_tree(prepare_party_log(party_log, parameters, convert=convert), parameters, sender_nodes)
+    return (tree, exec_utils.get_param_value(MyParameters.PROFILER, parameters, None),
+            [cache.take_delta() for cache in subtree_cache.parameter_caches(parameters)])
+
+
+def my_apply_tree_multi_party(log: list[EventLog], parameters, convert=False) -> dict[int, ProcessTree]:
+    """
+    Discovers the process tree of every party log, distributing the parties on a pool of processes
+
+    Every party is discovered independently, so the result does not depend on the number of workers
+
+    Parameters
+    -----------
+    log
+        One log per party
+    parameters
+        Parameters of the algorithm, MyParameters.N_JOBS sets the number of workers (default: number of cpus)
+    convert
+        Whether the logs have still to be converted to EventLog (done by the workers)
+
+    Returns
+    -----------
+    dict
+        Index of the party in log -> process tree
+    """
+    sender_nodes = discover_in_nodes(log, parameters)
+    party_sender_nodes = [sender_nodes.get(index, []) for index in range(len(log))]
+    n_jobs = exec_utils.get_param_value(MyParameters.N_JOBS, parameters, os.cpu_count() or 1)
+    n_jobs = min(n_jobs, len(log))
+    if n_jobs <= 1:
+        trees = [_discover_party(party_log, parameters, convert, party_sender_nodes[index])[0]
+                 for index, party_log in enumerate(log)]
+    else:
+        # the cpus are already busy with the parties, the subtrees of a party are discovered by its worker
+        parameters = {key: value for key, value in parameters.items() if key != MyParameters.PARALLEL_THRESHOLD}
+        profiler = exec_utils.get_param_value(MyParameters.PROFILER, parameters, None)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_discover_party, log, repeat(parameters), repeat(convert), party_sender_nodes))
+        trees = [tree for tree, _, _ in results]
+        if profiler is not None:
+            for _, worker_profiler, _ in results:
+                profiler.merge(worker_profiler)
+        # the subtrees discovered by the workers and their lookups are merged in the caches of the parameters
+        for _, _, deltas in results:
+            for cache, delta in zip(subtree_cache.parameter_caches(parameters), deltas):
+                cache.merge(delta)
+    return {index: tree for index, tree in enumerate(trees)}
+
+
+def discover_party_tree(log, parameters, sender_nodes=None, statistics=None):
+    """
+    Discovers the process tree of the (already prepared) log of a single party
+
+    Parameters
+    -----------
+    log
+        Log of the party, as returned by prepare_party_log
+    parameters
+        Parameters of the algorithm
+    sender_nodes
+        Edges ((sender activity, receiver activity), number of messages) of the messages received by the party
+    statistics
+        Statistics of the log as returned by get_log_statistics (not modified), computed if not given
+    """
+    if sender_nodes is None:
+        sender_nodes = []
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
 
     noise_threshold = exec_utils.get_param_value(Parameters.NOISE_THRESHOLD, parameters,
                                                  shared_constants.NOISE_THRESHOLD_IMF)
 
     '''DFG INIT'''
-    log = log[0]
-    dfg = [(k, v) for k, v in dfg_inst.apply(log, parameters=parameters).items() if v > 0]
-    sender_nodes = discover_in_nodes(log, dfg)
-    dfg.extend(sender_nodes)
-    #dfg = {}
-    #for index, trace in enumerate(log):
-    #    dfg[trace] = [(k, v) for k, v in dfg_inst.apply(trace, parameters=parameters).items() if v > 0]
-    #sender_nodes = discover_in_nodes(log, dfg)
-    #for key in sender_nodes.keys():
-    #    dfg[key].append(sender_nodes[key])
-    # might be redundant, but will help matching senders with receivers, currently not implemented
-    #receiver_nodes = discover_out_nodes(log, dfg)
-    #for x in receiver_nodes:
-    #    dfg[trace].append(x)
+    if statistics is None:
+        statistics = my_subtree_infrequent.get_log_statistics(log, activity_key, parameters)
+    dfg, activities, start_activities, end_activities = statistics
+    activities, start_activities = dict(activities), list(start_activities)
+    # the sender activities of the other parties are added as predecessors of the receiving activities
+    dfg = dfg.with_edges(sender_nodes)
 
     c = Counts()
-    activities = attributes_get.get_attribute_values(log, activity_key)
-    start_activities = list(start_activities_get.get_start_activities(log, parameters=parameters).keys())
-    end_activities = list(end_activities_get.get_end_activities(log, parameters=parameters).keys())
     for x in sender_nodes:
         activities[x[0][0]] = x[1]
         start_activities.append(x[0][0])
 
-    contains_empty_traces = False
-    traces_length = [len(trace) for trace in log]
-    if traces_length:
-        contains_empty_traces = min([len(trace) for trace in log]) == 0
+    contains_empty_traces = my_subtree_infrequent.contains_empty_traces(log)
 
     # set the threshold parameter based on f and the max value in the dfg:
-    max_value = 0
-    for key, value in dfg:
-        if value > max_value:
-            max_value = value
+    max_value = dfg.max_count()
     threshold = noise_threshold * max_value
 
     recursion_depth = 0
 
-    sub = my_subtree_infrequent.my_make_tree(sender_nodes, log, dfg, dfg, dfg, activities, c, recursion_depth, noise_threshold, threshold,
-                            start_activities, end_activities,
-                            start_activities, end_activities, parameters=parameters)
+    cache = exec_utils.get_param_value(MyParameters.SUBTREE_CACHE, parameters, None)
+    cached = None
+    if cache is not None:
+        cache_key = cache.key(log, activity_key, dfg, start_activities, end_activities, sender_nodes, noise_threshold,
+                              threshold, start_activities, end_activities, parameters)
+        cached = cache.get(cache_key)
+
+    sweep = exec_utils.get_param_value(MyParameters.SWEEP_CACHE, parameters, None)
+    if cached is None and sweep is not None:
+        # same key as the one computed by the root subtree, see MySubtreeInfrequent.get_sweep_key
+        cached = sweep.get(sweep.key(log, activity_key, dfg, start_activities, end_activities, sender_nodes,
+                                     noise_threshold, threshold, start_activities, end_activities, parameters))
+
+    if cached is not None:
+        # the whole log was already discovered (e.g. in a previous run, or with another noise threshold)
+        tree = ArrayTree.from_tuple(cached)
+    else:
+        sub = my_subtree_infrequent.my_make_tree(sender_nodes, log, dfg, dfg, dfg, activities, c, recursion_depth, noise_threshold, threshold,
+                                start_activities, end_activities,
+                                start_activities, end_activities, parameters=parameters)
+        if cache is not None:
+            sub.cache_key = cache_key
+
+        tree = get_array_tree_repr(sub, contains_empty_traces=contains_empty_traces)
+    # folds the tree (to simplify it in case fallthroughs/filtering is applied) and sorts it to ensure consistency
+    # in different executions of the algorithm, in a single pass giving the same tree as fold and tree_sort of pm4py;
+    # the ProcessTree is built once, with consistent parent pointers
+    return tree.normalize().to_process_tree()
 
-    process_tree = get_tree_repr_implain_get_repr(sub, 0, contains_empty_traces=contains_empty_traces)
-    # Ensures consistency to the parent pointers in the process tree
-    tree_consistency.fix_parent_pointers(process_tree)
-    # Fixes a 1 child XOR that is added when single-activities flowers are found
-    tree_consistency.fix_one_child_xor_flower(process_tree)
-    # folds the process tree (to simplify it in case fallthroughs/filtering is applied)
-    process_tree = generic.fold(process_tree)
-    # sorts the process tree to ensure consistency in different executions of the algorithm
-    tree_sort(process_tree)
 
-    return process_tree
+def get_tree_repr_implain_get_repr(spec_tree_struct, rec_depth, contains_empty_traces=False):
+    """
+    Builds the process tree of a subtree structure
+
+    The structure is visited in post order with an explicit stack, so that the depth of the tree is not bounded by
+    the recursion limit. A structure shared by several parents (see SubtreeCache) gets a separate representation
+    under each of them
+    """
+    return _build_repr(spec_tree_struct, contains_empty_traces, ProcessTreeRepr())
+
+
+def get_array_tree_repr(spec_tree_struct, contains_empty_traces=False) -> ArrayTree:
+    """
+    Same as get_tree_repr_implain_get_repr, building an ArrayTree
+    """
+    representation = ArrayTreeRepr()
+    return representation.builder.build(_build_repr(spec_tree_struct, contains_empty_traces, representation))
+
+
+class ProcessTreeRepr(object):
+    """
+    Representations of the subtrees as pm4py ProcessTree
+    """
+
+    def cached(self, tree):
+        return subtree_cache.tuple_to_tree(tree)
+
+    def leaf(self, label=None):
+        return ProcessTree(operator=None, label=label)
+
+    def operator_node(self, operator, children):
+        """
+        Node with the given operator code (see array_tree.OPERATORS) and children
+        """
+        tree = ProcessTree(operator=MyOperator.MyOperator(array_tree.OPERATORS[operator]))
+        for child in children:
+            tree.children.append(child)
+            child.parent = tree
+        return tree
+
+    def to_tuple(self, tree):
+        return subtree_cache.tree_to_tuple(tree)
+
+
+class ArrayTreeRepr(object):
+    """
+    Representations of the subtrees as ids of the nodes added to an ArrayTreeBuilder
+    """
+
+    def __init__(self):
+        self.builder = ArrayTreeBuilder()
+
+    def cached(self, tree):
+        return self.builder.add_tuple(tree)
+
+    def leaf(self, label=None):
+        return self.builder.leaf(label)
+
+    def operator_node(self, operator, children):
+        return self.builder.node(operator, children)
+
+    def to_tuple(self, node):
+        return self.builder.to_tuple(node)
+
+
+def _build_repr(spec_tree_struct, contains_empty_traces, representation):
+    # every frame is the structure, the representations of the children built so far and whether they are
+    # independent of the noise threshold
+    stack = [(spec_tree_struct, [], [])]
+    while True:
+        spec, children, independent = stack[-1]
+        to_visit = _children_to_visit(spec)
+        if len(children) < len(to_visit):
+            stack.append((to_visit[len(children)], [], []))
+            continue
+        stack.pop()
+        final_tree_repr = _finish_tree_repr(spec, children,
+                                            contains_empty_traces if spec is spec_tree_struct else False,
+                                            representation)
+        spec_independent = all(independent) and _threshold_independent(spec)
+        if spec_independent:
+            _store_threshold_independent(spec, final_tree_repr, representation)
+        if not stack:
+            return final_tree_repr
+        stack[-1][1].append(final_tree_repr)
+        stack[-1][2].append(spec_independent)
+
+
+def _children_to_visit(spec_tree_struct):
+    if spec_tree_struct.detected_cut in ('cached', 'empty_log', 'single_activity', 'flower'):
+        return []
+    return spec_tree_struct.children
+
+
+def _finish_tree_repr(spec_tree_struct, children, contains_empty_traces, representation):
+    if spec_tree_struct.detected_cut == 'cached':
+        return representation.cached(spec_tree_struct.tree)
+
+    final_tree_repr = _get_repr(representation, spec_tree_struct, children, contains_empty_traces)
+
+    if getattr(spec_tree_struct, 'cache_key', None) is not None:
+        cache = exec_utils.get_param_value(MyParameters.SUBTREE_CACHE, spec_tree_struct.parameters, None)
+        # base cases are cheaper to rediscover than to store
+        if cache is not None and spec_tree_struct.detected_cut not in ('empty_log', 'single_activity'):
+            cache.put(spec_tree_struct.cache_key, representation.to_tuple(final_tree_repr))
+    return final_tree_repr
 
 
-def get_tree_repr_implain_get_repr(spec_tree_struct, rec_depth, contains_empty_traces=False):
-    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, spec_tree_struct.parameters,
-                                              xes_constants.DEFAULT_NAME_KEY)
-
-    base_cases = ('empty_log', 'single_activity')
-    cut = ('concurrent', 'sequential', 'parallel', 'loopCut', 'receive_message_activity')
-    # note that the activity_once_per_trace is not included here, as it is can be dealt with as a parallel cut
-    fall_throughs = ('empty_trace', 'strict_tau_loop', 'tau_loop', 'flower')
-
-    # if a cut was detected in the current subtree:
-    if spec_tree_struct.detected_cut in cut:
-        if spec_tree_struct.detected_cut == "sequential":
-            final_tree_repr = ProcessTree(operator=Operator.SEQUENCE)
-        elif spec_tree_struct.detected_cut == "loopCut":
-            final_tree_repr = ProcessTree(operator=Operator.LOOP)
-        elif spec_tree_struct.detected_cut == "concurrent":
-            final_tree_repr = ProcessTree(operator=Operator.XOR)
-        elif spec_tree_struct.detected_cut == "parallel":
-            final_tree_repr = ProcessTree(operator=Operator.PARALLEL)
-        elif spec_tree_struct.detected_cut == "receive_message_activity":
-            final_tree_repr = ProcessTree(operator=Operator.RECEIVE_MESSAGE)
-
-        if not (spec_tree_struct.detected_cut == "loopCut" and len(spec_tree_struct.children) >= 3):
-            for ch in spec_tree_struct.children:
-                # get the representation of the current child (from children in the subtree-structure):
-                child = get_tree_repr_implain_get_repr(ch, rec_depth + 1)
-                # add connection from child_tree to child_final and the other way around:
-                final_tree_repr.children.append(child)
-                child.parent = final_tree_repr
-
-        else:
-            child = get_tree_repr_implain_get_repr(spec_tree_struct.children[0], rec_depth + 1)
-            final_tree_repr.children.append(child)
-            child.parent = final_tree_repr
-
-            redo_child = ProcessTree(operator=Operator.XOR)
-            for ch in spec_tree_struct.children[1:]:
-                child = get_tree_repr_implain_get_repr(ch, rec_depth + 1)
-                redo_child.children.append(child)
-                child.parent = redo_child
-
-            final_tree_repr.children.append(redo_child)
-            redo_child.parent = final_tree_repr
-
-        if spec_tree_struct.detected_cut == "loopCut" and len(spec_tree_struct.children) < 3:
-            while len(spec_tree_struct.children) < 2:
-                child = ProcessTree()
-                final_tree_repr.children.append(child)
-                child.parent = final_tree_repr
-                spec_tree_struct.children.append(None)
-
-    if spec_tree_struct.detected_cut in base_cases:
+def _threshold_independent(spec_tree_struct):
+    # whether the subtree structure itself was discovered without the noise threshold (see SweepCache); the
+    # subtrees discovered by other processes or found in the subtree cache are not known to be
+    if spec_tree_struct.detected_cut == 'cached':
+        return getattr(spec_tree_struct, 'threshold_independent', False)
+    return not getattr(spec_tree_struct, 'threshold_dependent', True)
+
+
+def _store_threshold_independent(spec_tree_struct, final_tree_repr, representation):
+    if getattr(spec_tree_struct, 'sweep_key', None) is None:
+        return
+    sweep = exec_utils.get_param_value(MyParameters.SWEEP_CACHE, spec_tree_struct.parameters, None)
+    if sweep is not None and spec_tree_struct.detected_cut not in ('empty_log', 'single_activity'):
+        sweep.put(spec_tree_struct.sweep_key, representation.to_tuple(final_tree_repr))
+
+
+# operator of the node of every cut
+CUT_OPERATORS = {
+    'sequential': array_tree.SEQUENCE,
+    'loopCut': array_tree.LOOP,
+    'concurrent': array_tree.XOR,
+    'parallel': array_tree.PARALLEL,
+    'receive_message_activity': array_tree.RECEIVE_MESSAGE,
+}
+
+
+def _get_repr(representation, spec_tree_struct, children, contains_empty_traces=False):
+    """
+    Representation of a subtree structure, given the representations of its children: the nodes are added through
+    the leaf and operator_node of representation (ProcessTreeRepr or ArrayTreeRepr)
+    """
+    detected_cut = spec_tree_struct.detected_cut
+    if detected_cut in CUT_OPERATORS:
+        if detected_cut == "loopCut" and len(spec_tree_struct.children) >= 3:
+            # the redo children become the alternatives of a choice
+            children = [children[0], representation.operator_node(array_tree.XOR, children[1:])]
+        elif detected_cut == "loopCut":
+            # the subtree structure is left untouched, as it can be shared by the subtree cache
+            children = list(children) + [representation.leaf() for _ in range(len(spec_tree_struct.children), 2)]
+        return representation.operator_node(CUT_OPERATORS[detected_cut], children)
+
+    if detected_cut == "empty_log":
         # in the base case of an empty log, we only return a silent transition
-        if spec_tree_struct.detected_cut == "empty_log":
-            return ProcessTree(operator=None, label=None)
-        # in the base case of a single activity, we return a tree consisting of the single activity
-        elif spec_tree_struct.detected_cut == "single_activity":
-            act_a = spec_tree_struct.log[0][0][activity_key]
-            return ProcessTree(operator=None, label=act_a)
-
-    if spec_tree_struct.detected_cut in fall_throughs:
-        if spec_tree_struct.detected_cut == "empty_trace":
-            # should return XOR(tau, IM(L') )
-            final_tree_repr = ProcessTree(operator=Operator.XOR)
-            final_tree_repr.children.append(ProcessTree(operator=None, label=None))
-            # iterate through all children of the current node
-            for ch in spec_tree_struct.children:
-                child = get_tree_repr_implain_get_repr(ch, rec_depth + 1)
-                final_tree_repr.children.append(child)
-                child.parent = final_tree_repr
-
-        elif spec_tree_struct.detected_cut == "strict_tau_loop" or spec_tree_struct.detected_cut == "tau_loop":
-            # should return LOOP( IM(L'), tau)
-            final_tree_repr = ProcessTree(operator=Operator.LOOP)
-            # iterate through all children of the current node
-            if spec_tree_struct.children:
-                for ch in spec_tree_struct.children:
-                    child = get_tree_repr_implain_get_repr(ch, rec_depth + 1)
-                    final_tree_repr.children.append(child)
-                    child.parent = final_tree_repr
-            else:
-                for ch in spec_tree_struct.activities:
-                    child = get_transition(ch)
-                    final_tree_repr.append(child)
-                    child.parent = final_tree_repr
-
-            # add a silent tau transition as last child of the current node
-            final_tree_repr.children.append(ProcessTree(operator=None, label=None))
-
-        elif spec_tree_struct.detected_cut == "flower":
-            # should return something like LOOP(XOR(a,b,c,d,...), tau)
-            final_tree_repr = ProcessTree(operator=Operator.LOOP)
-            xor_child = ProcessTree(operator=Operator.XOR, parent=final_tree_repr)
-            # append all the activities in the current subtree to the XOR part to allow for any behaviour
-            for ch in spec_tree_struct.activities:
-                child = get_transition(ch)
-                xor_child.children.append(child)
-                child.parent = xor_child
-            final_tree_repr.children.append(xor_child)
-            # now add the tau to the children to get the wanted output
-            final_tree_repr.children.append(ProcessTree(operator=None, label=None))
-
-    return final_tree_repr
+        return representation.leaf()
+    elif detected_cut == "single_activity":
+        activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, spec_tree_struct.parameters,
+                                                  xes_constants.DEFAULT_NAME_KEY)
+        return representation.leaf(my_subtree_infrequent.get_single_activity(spec_tree_struct.log, activity_key))
+
+    if detected_cut == "empty_trace":
+        # XOR(tau, IM(L'))
+        return representation.operator_node(array_tree.XOR, [representation.leaf()] + list(children))
+    elif detected_cut == "strict_tau_loop" or detected_cut == "tau_loop":
+        # LOOP(IM(L'), tau)
+        if not children:
+            children = [representation.leaf(activity) for activity in spec_tree_struct.activities]
+        return representation.operator_node(array_tree.LOOP, list(children) + [representation.leaf()])
+    elif detected_cut == "flower":
+        # LOOP(XOR(a, b, c, ...), tau), allowing for any behaviour
+        xor_child = representation.operator_node(array_tree.XOR, [representation.leaf(activity)
+                                                                  for activity in spec_tree_struct.activities])
+        return representation.operator_node(array_tree.LOOP, [xor_child, representation.leaf()])
+    raise Exception("Unsupported cut: %s" % detected_cut)
 
 
 def my_apply_im_f(log: list[EventLog], parameters):
     from pm4py.objects.conversion.log import converter
+    if exec_utils.get_param_value(MyParameters.MULTI_PARTY, parameters, False):
+        # the conversion of every party is done by the worker discovering it
+        return my_apply_tree_multi_party(log, parameters, convert=True)
     for index, trace in enumerate(log):
-        log[index] = converter.apply(trace, parameters=parameters)
+        if not isinstance(trace, CompactLog):
+            log[index] = converter.apply(trace, parameters=parameters)
     tree = my_apply_tree(log, parameters)
     return tree
 
@@ -0,0 +1,252 @@
+from array import array
+from hashlib import md5
+
+# operator codes of the nodes, the position in OPERATORS (values of MyOperator); the leaves have code LEAF
+OPERATORS = ('->', 'X', '+', '*', 'O', '<>', 'receive_message')
+SEQUENCE, XOR, PARALLEL, LOOP, OR, INTERLEAVING, RECEIVE_MESSAGE = range(len(OPERATORS))
+LEAF = -1
+# label id of the silent leaves
+TAU = -1
+# operators whose nested nodes of the same operator are merged, and whose children are sorted, by normalize (as
+# fold and tree_sort of pm4py)
+FOLDED_OPERATORS = (SEQUENCE, XOR, PARALLEL)
+SORTED_OPERATORS = (XOR, PARALLEL)
+
+
+def label_hash(label) -> int:
+    # same hash of the labels used by tree_sort of pm4py, stable across executions
+    return int(md5(label.encode('utf-8')).hexdigest(), 16)
+
+
+class ArrayTreeBuilder(object):
+    """
+    Appends the nodes of an ArrayTree in post order: every node is added after its children, which are given by
+    their ids
+    """
+
+    def __init__(self, labels=None):
+        self.labels = labels if labels is not None else []
+        self.label_ids = {label: i for i, label in enumerate(self.labels)}
+        self.operators = array('b')
+        self.node_labels = array('i')
+        self.children = []
+
+    def label_id(self, label) -> int:
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = len(self.labels)
+            self.label_ids[label] = label_id
+            self.labels.append(label)
+        return label_id
+
+    def leaf(self, label=None) -> int:
+        """
+        Adds a leaf, silent if label is None, and returns its id
+        """
+        self.operators.append(LEAF)
+        self.node_labels.append(TAU if label is None else self.label_id(label))
+        self.children.append(())
+        return len(self.operators) - 1
+
+    def node(self, operator, children) -> int:
+        """
+        Adds a node with the given operator code and children ids, and returns its id
+        """
+        self.operators.append(operator)
+        self.node_labels.append(TAU)
+        self.children.append(tuple(children))
+        return len(self.operators) - 1
+
+    def add_tuple(self, representation) -> int:
+        """
+        Adds the nodes of a nested tuple (see subtree_cache.tree_to_tuple) and returns the id of its root
+        """
+        stack = [(representation, [])]
+        while True:
+            (operator, label, children), ids = stack[-1]
+            if len(ids) < len(children):
+                stack.append((children[len(ids)], []))
+                continue
+            stack.pop()
+            if operator is None:
+                node = self.leaf(label)
+            else:
+                node = self.node(OPERATORS.index(operator), ids)
+            if not stack:
+                return node
+            stack[-1][1].append(node)
+
+    def to_tuple(self, node):
+        """
+        Nested tuple (see subtree_cache.tree_to_tuple) of the subtree of a node added so far
+        """
+        representations = {}
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            missing = [child for child in self.children[current] if child not in representations]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            operator = self.operators[current]
+            label_id = self.node_labels[current]
+            representations[current] = (OPERATORS[operator] if operator != LEAF else None,
+                                        self.labels[label_id] if label_id != TAU else None,
+                                        tuple(representations[child] for child in self.children[current]))
+        return representations[node]
+
+    def build(self, root) -> 'ArrayTree':
+        offsets = array('i', [0])
+        children = array('i')
+        for node_children in self.children:
+            children.extend(node_children)
+            offsets.append(len(children))
+        return ArrayTree(self.labels, self.operators, self.node_labels, offsets, children, root)
+
+
+class ArrayTree(object):
+    """
+    Process tree stored in flat arrays, the nodes being numbered in post order (children before their parent)
+
+    operators[n] is the operator code of node n (LEAF for the leaves), labels[n] the id of its label in label_names
+    (TAU for the silent leaves and the operators), and children[offsets[n]:offsets[n + 1]] the ids of its children
+    """
+
+    def __init__(self, label_names, operators, labels, offsets, children, root):
+        self.label_names = label_names
+        self.operators = operators
+        self.labels = labels
+        self.offsets = offsets
+        self.children = children
+        self.root = root
+
+    def __len__(self):
+        return len(self.operators)
+
+    def node_children(self, node):
+        return self.children[self.offsets[node]:self.offsets[node + 1]]
+
+    @classmethod
+    def from_tuple(cls, representation) -> 'ArrayTree':
+        builder = ArrayTreeBuilder()
+        return builder.build(builder.add_tuple(representation))
+
+    @classmethod
+    def from_process_tree(cls, tree) -> 'ArrayTree':
+        import subtree_cache
+        return cls.from_tuple(subtree_cache.tree_to_tuple(tree))
+
+    def to_tuple(self):
+        representations = [None] * len(self)
+        for node in range(len(self)):
+            operator = self.operators[node]
+            label = self.labels[node]
+            representations[node] = (OPERATORS[operator] if operator != LEAF else None,
+                                     self.label_names[label] if label != TAU else None,
+                                     tuple(representations[child] for child in self.node_children(node)))
+        return representations[self.root]
+
+    def to_process_tree(self):
+        """
+        Converts the tree to a pm4py ProcessTree, with consistent parent pointers
+        """
+        from pm4py.objects.process_tree.obj import ProcessTree
+        from MyOperator import MyOperator
+        operators = [MyOperator(value) for value in OPERATORS]
+        nodes = [None] * len(self)
+        # children first: every node is created after its children
+        for node in range(len(self)):
+            operator = self.operators[node]
+            label = self.labels[node]
+            tree = ProcessTree(operator=operators[operator] if operator != LEAF else None,
+                               label=self.label_names[label] if label != TAU else None)
+            for child in self.node_children(node):
+                nodes[child].parent = tree
+                tree.children.append(nodes[child])
+            nodes[node] = tree
+        return nodes[self.root]
+
+    def normalize(self) -> 'ArrayTree':
+        """
+        Returns the tree as fold and tree_sort of pm4py leave it, in a single pass over its nodes (the choices with
+        one child are replaced by it in place: fix_one_child_xor_flower never applies to our trees, as it compares
+        their operators with the Operator of pm4py it imported before MyOperator replaced it):
+        - the silent children of sequences and parallels are dropped, choices and ors keep only the last one
+        - sequences, parallels, choices and ors with only silent children, and loops with two, become a silent leaf
+        - the operators with one child are replaced by it, the ones with no children are kept
+        - sequences, choices and parallels nested in an operator of the same type are merged into it
+        - the children of choices and parallels are sorted by the sum of the hashes of their labels
+        """
+        builder = ArrayTreeBuilder(list(self.label_names))
+        # normalized form of every node with the sum of the hashes of its labels (as tree_sort). A form is the id
+        # of a node added to builder, or a node not added yet, as its parent may merge its children: (LEAF, label)
+        # for a leaf, (operator, children) for an operator whose children are pairs (id, hash)
+        normalized = [None] * len(self)
+        label_hashes = {}
+        for node in range(len(self)):
+            operator = self.operators[node]
+            if operator == LEAF:
+                label = self.labels[node]
+                if label == TAU:
+                    normalized[node] = (SILENT, 0)
+                    continue
+                if label not in label_hashes:
+                    label_hashes[label] = label_hash(self.label_names[label])
+                normalized[node] = ((LEAF, self.label_names[label]), label_hashes[label])
+                continue
+            normalized[node] = _normalize_node(builder, operator,
+                                               [normalized[child] for child in self.node_children(node)])
+        return builder.build(_add(builder, normalized[self.root][0]))
+
+
+# form of a silent leaf not added yet, see ArrayTree.normalize
+SILENT = (LEAF, None)
+# operators whose children, all silent, are replaced by a silent leaf
+ALL_SILENT_OPERATORS = (SEQUENCE, PARALLEL, XOR, OR)
+
+
+def _add(builder, form) -> int:
+    # id of a normalized form, adding it to builder if needed
+    if isinstance(form, int):
+        return form
+    operator, children = form
+    if operator == LEAF:
+        return builder.leaf(children)
+    return builder.node(operator, [child for child, _ in children])
+
+
+def _normalize_node(builder, operator, children):
+    # children: normalized forms of the children with their hashes, returns the one of the node
+    def is_tau(child):
+        form = child[0]
+        if isinstance(form, int):
+            return builder.operators[form] == LEAF and builder.node_labels[form] == TAU
+        return form == SILENT
+
+    if not children:
+        return (operator, []), 0
+    if operator in FOLDED_OPERATORS:
+        merged = []
+        for child in children:
+            if not isinstance(child[0], int) and child[0][0] == operator:
+                merged.extend(child[0][1])
+            else:
+                merged.append(child)
+        children = merged
+    silent = [child for child in children if is_tau(child)]
+    if silent:
+        if len(silent) == len(children):
+            if operator in ALL_SILENT_OPERATORS or (operator == LOOP and len(children) == 2):
+                return silent[-1]
+        elif operator in (SEQUENCE, PARALLEL):
+            children = [child for child in children if not is_tau(child)]
+        elif operator in (XOR, OR):
+            # a single silent alternative is enough, the last one is kept
+            children = [child for child in children if not is_tau(child) or child is silent[-1]]
+    if len(children) == 1:
+        return children[0]
+    children = [(_add(builder, form), form_hash) for form, form_hash in children]
+    if operator in SORTED_OPERATORS:
+        children.sort(key=lambda child: child[1])
+    return (operator, children), sum(form_hash for _, form_hash in children)
@@ -0,0 +1,118 @@
+"""
+Times the pipeline on synthetic logs (see log_generator) of growing size
+
+    python benchmark.py --cases 100 1000 10000 --activities 8 16 32 --parties 3 -o benchmark.json
+
+For every combination of cases and activities the logs are generated, then every stage is run in turn and its
+wall time and peak of the memory allocated by Python are recorded
+"""
+import argparse
+import gc
+import itertools
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import log_generator
+
+
+class StageTimer(object):
+    """
+    Records the wall time and, if trace_memory, the peak of the memory allocated by Python of every stage
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def run(self, stage: str, function, *args, **kwargs):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.records.append({'stage': stage, 'seconds': elapsed, 'peak_bytes': peak})
+
+
+def discovery_parameters(compact_log: bool) -> dict:
+    from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+    from MyParameters import MyParameters
+    return {
+        Parameters.ACTIVITY_KEY: 'concept:name',
+        Parameters.TIMESTAMP_KEY: 'time:timestamp',
+        Parameters.CASE_ID_KEY: 'case:concept:name',
+        MyParameters.MULTI_PARTY: True,
+        MyParameters.COMPACT_LOG: compact_log,
+        # the parties are discovered in this process, so that their memory is traced
+        MyParameters.N_JOBS: 1,
+    }
+
+
+def run_configuration(timer: StageTimer, directory: str, config: dict, compact_log: bool):
+    import log_cache
+    import message_correlation
+    import apply_tree
+    import pm4py
+    paths = timer.run('generate', log_generator.generate_xes, directory, **config)
+    columnar = timer.run('parse', lambda: [log_cache.parse_xes(path) for path in paths])
+    timer.run('correlate', message_correlation.build_message_index, columnar)
+    parameters = discovery_parameters(compact_log)
+    logs = timer.run('encode', lambda: [apply_tree.prepare_party_log(log, parameters) for log in columnar])
+    sender_nodes = message_correlation.build_message_index(columnar).sender_nodes()
+    timer.run('discover', lambda: [apply_tree.discover_party_tree(log, parameters, sender_nodes.get(index, []))
+                                   for index, log in enumerate(logs)])
+    # the whole entry point, from the EventLogs
+    event_logs = [log.to_event_log() for log in columnar]
+    trees = timer.run('my_apply_im_f', apply_tree.my_apply_im_f, event_logs, parameters)
+    import my_to_bpmn
+    timer.run('bpmn', lambda: [pm4py.convert_to_bpmn(tree) for tree in trees.values()])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times every stage of the pipeline on synthetic logs')
+    parser.add_argument('--cases', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--activities', type=int, nargs='+', default=[8, 16])
+    parser.add_argument('--parties', type=int, nargs='+', default=[2])
+    parser.add_argument('--variants', type=int, default=20)
+    parser.add_argument('--loop-depth', type=int, default=1)
+    parser.add_argument('--concurrency', type=float, default=0.3)
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact-log', action='store_true', help='discover on the variant-compressed logs')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace the memory (faster, times only)')
+    parser.add_argument('-o', '--output', default=None, help='JSON file of the results (default: stdout)')
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_parties, n_cases, n_activities in itertools.product(args.parties, args.cases, args.activities):
+        config = {'n_parties': n_parties, 'n_cases': n_cases, 'n_activities': n_activities,
+                  'n_variants': args.variants, 'loop_depth': args.loop_depth, 'concurrency': args.concurrency,
+                  'noise': args.noise, 'seed': args.seed}
+        timer = StageTimer(trace_memory=not args.no_memory)
+        with tempfile.TemporaryDirectory() as directory:
+            run_configuration(timer, directory, config, args.compact_log)
+        for record in timer.records:
+            print('%2d parties %7d cases %4d activities  %-14s %9.3f s  %s' % (
+                n_parties, n_cases, n_activities, record['stage'], record['seconds'],
+                '%.1f MiB' % (record['peak_bytes'] / 2 ** 20) if record['peak_bytes'] is not None else ''),
+                file=sys.stderr)
+        results.append({'config': config, 'compact_log': args.compact_log, 'stages': timer.records})
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=1)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
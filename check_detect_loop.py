@@ -0,0 +1,187 @@
+"""
+Differential check of MySubtreeInfrequent.detect_loop against the former implementation (detect_loop_reference)
+
+    python check_detect_loop.py
+
+Discovers the models of the logs in Logs/ and of generated noisy logs whose loops have a redo block (see
+log_generator), which give loop cuts unlike the former, every party on EventLog
+and on CompactLog, comparing at every call the loop cut found by the two implementations. The order of the
+activities in a part and of the redo parts is not significant, so the partitions are compared as sets. Exits with
+status 1 if they differ, or if no loop cut is found at all
+"""
+import itertools
+import sys
+import tempfile
+
+import apply_tree
+from my_subtree_infrequent import MySubtreeInfrequent
+import log_cache
+import log_generator
+from pm4py.algo.discovery.inductive.util import detection_utils
+from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+from MyParameters import MyParameters
+
+LOG_SETS = [
+    ['Logs/real/hospital.xes', 'Logs/real/gynecologist.xes', 'Logs/real/laboratory.xes', 'Logs/real/patient.xes'],
+    ['Logs/generated/PartyA.xes', 'Logs/generated/PartyC.xes'],
+]
+
+# noisy logs with a redo block in every loop
+GENERATED_CONFIGURATIONS = [
+    {'n_parties': 2, 'n_cases': 150, 'n_activities': n_activities, 'n_variants': 15, 'noise': noise, 'seed': seed,
+     'redo': 1.0}
+    for seed, n_activities, noise in itertools.product(range(4), (6, 10), (0.1, 0.3))
+]
+
+
+def detect_loop_reference(node):
+    """
+    Former list based implementation of MySubtreeInfrequent.detect_loop, on the subtree node
+    """
+    # p0 is part of return value, it contains the partition of activities
+    # write all start and end activities in p1
+    if node.contains_empty_trace():
+        return [False, []]
+    start_activities, end_activities = node.get_start_end_activities()
+    p1 = []
+    for act in start_activities:
+        if act not in p1:
+            p1.append(act)
+    for act in end_activities:
+        if act not in p1:
+            p1.append(act)
+
+    # create new dfg without the transitions to start and end activities
+    new_dfg = node.dfg.without_activities(p1)
+    # get connected components of this new dfg
+    new_ingoing = new_dfg.ingoing
+    new_outgoing = new_dfg.outgoing
+    # it was a pain in the *** to get a working directory of the current_activities, as we can't iterate ove the dfg
+    current_activities = {}
+    for element in node.activities:
+        if element not in p1:
+            current_activities.update({element: 1})
+    p0 = detection_utils.get_connected_components(new_ingoing, new_outgoing, current_activities)
+    p0.insert(0, p1)
+
+    iterable_dfg = node.dfg.index
+    # p0 is like P1,P2,...,Pn in line 3 on page 190 of the IM Thesis
+    # check for subsets in p0 that have connections to and end or from a start activity
+    p0_copy = []
+    for int_el in p0:
+        p0_copy.append(int_el)
+    for element in p0_copy:  # for every set in p0
+        removed = False
+        if element in p0 and element != p0[0]:
+            for act in element:  # for every activity in this set
+                for e in end_activities:  # for every end activity
+                    if e not in start_activities:
+                        if (act, e) in iterable_dfg:  # check if connected
+                            # is there an element in dfg pointing from any act in a subset of p0 to an end activity
+                            for activ in element:
+                                if activ not in p0[0]:
+                                    p0[0].append(activ)
+                            if element in p0:
+                                p0.remove(element)  # remove subsets that are connected to an end activity
+                            removed = True
+                            break
+                if removed:
+                    break
+                for s in start_activities:
+                    if s not in end_activities:
+                        if not removed:
+                            if (s, act) in iterable_dfg:
+                                for acti in element:
+                                    if acti not in p0[0]:
+                                        p0[0].append(acti)
+                                if element in p0:
+                                    p0.remove(element)  # remove subsets that are connected to an end activity
+                                removed = True
+                                break
+                        else:
+                            break
+                if removed:
+                    break
+
+    iterable_dfg = node.dfg.index
+
+    p0_copy = []
+    for int_el in p0:
+        p0_copy.append(int_el)
+    for element in p0_copy:
+        if element in p0 and element != p0[0]:
+            for act in element:
+                for e in node.end_activities:
+                    if (e, act) in iterable_dfg:  # get those act, that are connected from an end activity
+                        for e2 in node.end_activities:  # check, if the act is connected from all end activities
+                            if (e2, act) not in iterable_dfg:
+                                for acti in element:
+                                    if acti not in p0[0]:
+                                        p0[0].append(acti)
+                                if element in p0:
+                                    p0.remove(element)  # remove subsets that are connected to an end activity
+                                break
+                for s in node.start_activities:
+                    if (act, s) in iterable_dfg:  # same as above (in this case for activities connected to
+                        # a start activity)
+                        for s2 in node.start_activities:
+                            if (act, s2) not in iterable_dfg:
+                                for acti in element:
+                                    if acti not in p0[0]:
+                                        p0[0].append(acti)
+                                if element in p0:
+                                    p0.remove(element)  # remove subsets that are connected to an end activity
+                                break
+
+    if len(p0) > 1:
+        return [True, p0]
+    else:
+        return [False, []]
+
+
+def canonical(result):
+    found, partition = result
+    if not found:
+        return False, None
+    return True, (frozenset(partition[0]), frozenset(frozenset(part) for part in partition[1:]))
+
+
+def main():
+    calls = []
+    mismatches = []
+    detect_loop = MySubtreeInfrequent.detect_loop
+
+    def checked_detect_loop(self):
+        result = detect_loop(self)
+        expected = detect_loop_reference(self)
+        calls.append(result[0])
+        if canonical(result) != canonical(expected):
+            mismatches.append((sorted(self.activities), result, expected))
+        return result
+
+    MySubtreeInfrequent.detect_loop = checked_detect_loop
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            log_sets = LOG_SETS + [log_generator.generate_xes('%s/%d' % (directory, index), **config)
+                                   for index, config in enumerate(GENERATED_CONFIGURATIONS)]
+            for paths in log_sets:
+                logs = [log_cache.parse_xes(path) for path in paths]
+                for compact_log in (False, True):
+                    parameters = {
+                        Parameters.ACTIVITY_KEY: 'concept:name',
+                        MyParameters.COMPACT_LOG: compact_log,
+                        # the patched method only exists in this process
+                        MyParameters.N_JOBS: 1,
+                    }
+                    apply_tree.my_apply_tree_multi_party(logs, parameters)
+    finally:
+        MySubtreeInfrequent.detect_loop = detect_loop
+
+    print('%d calls, %d loop cuts, %d mismatches' % (len(calls), sum(calls), len(mismatches)))
+    for activities, result, expected in mismatches:
+        print('activities %s: found %s, expected %s' % (activities, result, expected))
+    return 1 if mismatches or sum(calls) == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Regression check of the discovery on generated noisy logs
+
+    python check_discovery.py
+
+Generates noisy multi-party logs (see log_generator) and discovers every party, on EventLog and on CompactLog. Unlike
+the logs in Logs/, these reach the fall throughs, the activity concurrent one included, which runs the cut detection
+of pm4py on copies of the subtrees. Exits with status 1 if a discovery fails, if the trees discovered on CompactLog
+differ from the ones discovered on EventLog, or if the activity concurrent fall through is never reached
+"""
+import itertools
+import sys
+import tempfile
+import traceback
+
+import apply_tree
+import log_cache
+import log_generator
+from discovery_profiler import DiscoveryProfiler
+from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+from MyParameters import MyParameters
+
+CONFIGURATIONS = [
+    {'n_parties': 2, 'n_cases': 150, 'n_activities': n_activities, 'n_variants': 15, 'noise': noise, 'seed': seed}
+    for seed, n_activities, noise in itertools.product(range(4), (6, 10), (0.1, 0.3))
+]
+
+
+def discover(logs, compact_log: bool, profiler: DiscoveryProfiler) -> dict:
+    parameters = {
+        Parameters.ACTIVITY_KEY: 'concept:name',
+        MyParameters.COMPACT_LOG: compact_log,
+        MyParameters.PROFILER: profiler,
+        # the profiler is filled in this process
+        MyParameters.N_JOBS: 1,
+    }
+    return apply_tree.my_apply_tree_multi_party(logs, parameters)
+
+
+def phase_calls(profiler: DiscoveryProfiler, name: str) -> int:
+    return sum(calls for (_, path), (calls, _, _) in profiler.phases.items() if path[-1] == name)
+
+
+def main():
+    profiler = DiscoveryProfiler()
+    failures = []
+    differences = []
+    with tempfile.TemporaryDirectory() as directory:
+        for index, config in enumerate(CONFIGURATIONS):
+            paths = log_generator.generate_xes('%s/%d' % (directory, index), **config)
+            logs = [log_cache.parse_xes(path) for path in paths]
+            trees = {}
+            for compact_log in (False, True):
+                try:
+                    trees[compact_log] = discover(logs, compact_log, profiler)
+                except Exception:
+                    failures.append((config, compact_log, traceback.format_exc()))
+            if len(trees) == 2:
+                differences.extend((config, party, str(tree), str(trees[True][party]))
+                                   for party, tree in trees[False].items() if str(tree) != str(trees[True][party]))
+    reached = phase_calls(profiler, 'activity_concurrent')
+
+    print('%d discoveries, %d failures, %d parties with a different tree on CompactLog, activity concurrent fall '
+          'through reached %d times' % (2 * len(CONFIGURATIONS), len(failures), len(differences), reached))
+    for config, compact_log, error in failures:
+        print('%s, compact log %s:\n%s' % (config, compact_log, error))
+    for config, party, tree, compact_tree in differences:
+        print('%s, party %d:\n  EventLog   %s\n  CompactLog %s' % (config, party, tree, compact_tree))
+    return 1 if failures or differences or reached == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
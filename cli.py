@@ -0,0 +1,129 @@
+"""
+Headless discovery of the process trees of a set of party logs
+
+    python cli.py Logs/real/hospital.xes Logs/real/gynecologist.xes Logs/real/laboratory.xes Logs/real/patient.xes \
+        --output-dir out --formats tree ptml bpmn svg
+
+Every input log is a party, its models are written in the output directory named after the input file. No viewer
+is ever opened, and the conversion/visualization modules are imported only when an output format needs them
+"""
+import argparse
+import os
+import sys
+import time
+
+FORMATS = ('tree', 'ptml', 'bpmn', 'dot', 'svg', 'png')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Discovers the process tree of every party log')
+    parser.add_argument('inputs', nargs='+', help='XES log of every party')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory of the exported models')
+    parser.add_argument('-f', '--formats', nargs='*', default=['tree'], choices=FORMATS,
+                        help='formats of the exported models (none for a discovery-only run)')
+    parser.add_argument('--noise-threshold', type=float, default=None, help='noise threshold of IMf')
+    parser.add_argument('--compact-log', action='store_true', help='discover on the variant-compressed logs')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: number of cpus)')
+    parser.add_argument('--parallel-threshold', type=int, default=None,
+                        help='discover the child sublogs with at least this many events on the worker processes')
+    parser.add_argument('--log-cache', default=None,
+                        help='directory of the columnar cache of the parsed logs (default: .log_cache)')
+    parser.add_argument('--no-log-cache', action='store_true', help='always parse the XES files')
+    parser.add_argument('--subtree-cache', default=None, help='directory of the on-disk subtree cache')
+    parser.add_argument('--profile', default=None,
+                        help='write the time spent in every phase of the discovery to PROFILE.json and '
+                             'PROFILE.folded (collapsed stacks for flame graphs)')
+    parser.add_argument('--force-export', action='store_true',
+                        help='export the models even if they are equal to the ones already exported')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print the time spent in every stage')
+    return parser.parse_args(argv)
+
+
+def load_logs(args):
+    if args.no_log_cache:
+        import xes_stream
+        return [xes_stream.read_xes(file_path) for file_path in args.inputs]
+    import log_cache
+    cache_dir = args.log_cache if args.log_cache is not None else log_cache.DEFAULT_CACHE_DIR
+    # the columnar logs are converted by the workers discovering them
+    return [log_cache.read_columnar(file_path, cache_dir) for file_path in args.inputs]
+
+
+def build_parameters(args) -> dict:
+    from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+    from MyParameters import MyParameters
+    parameters = {
+        Parameters.ACTIVITY_KEY: 'concept:name',
+        Parameters.TIMESTAMP_KEY: 'time:timestamp',
+        Parameters.CASE_ID_KEY: 'case:concept:name',
+        MyParameters.COMPACT_LOG: args.compact_log,
+    }
+    if args.noise_threshold is not None:
+        parameters[Parameters.NOISE_THRESHOLD] = args.noise_threshold
+    if args.jobs is not None:
+        parameters[MyParameters.N_JOBS] = args.jobs
+    if args.parallel_threshold is not None:
+        parameters[MyParameters.PARALLEL_THRESHOLD] = args.parallel_threshold
+    if args.profile is not None:
+        from discovery_profiler import DiscoveryProfiler
+        parameters[MyParameters.PROFILER] = DiscoveryProfiler()
+    if args.subtree_cache is not None:
+        from subtree_cache import SubtreeCache
+        parameters[MyParameters.SUBTREE_CACHE] = SubtreeCache(directory=args.subtree_cache)
+    return parameters
+
+
+def export(trees: dict, names: list, output_dir: str, formats, n_jobs=None, skip_unchanged=True):
+    os.makedirs(output_dir, exist_ok=True)
+    for index, tree in trees.items():
+        path = os.path.join(output_dir, names[index])
+        if 'tree' in formats:
+            with open(path + '.tree.txt', 'w') as f:
+                f.write(str(tree) + '\n')
+        if 'ptml' in formats:
+            import pm4py
+            # exporter of the receive message nodes
+            import my_to_ptml
+            pm4py.write_ptml(tree, path + '.ptml')
+    model_formats = [f for f in formats if f not in ('tree', 'ptml')]
+    if model_formats:
+        # imports the BPMN conversion and the visualizations
+        import export as model_export
+        model_export.export_models({names[index]: tree for index, tree in trees.items()}, output_dir,
+                                   model_formats, n_jobs, skip_unchanged)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = []
+    start = time.perf_counter()
+    import apply_tree
+    timings.append(('import', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    logs = load_logs(args)
+    parameters = build_parameters(args)
+    timings.append(('load', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    trees = apply_tree.my_apply_tree_multi_party(logs, parameters, convert=True)
+    timings.append(('discovery', time.perf_counter() - start))
+    if args.profile is not None:
+        from MyParameters import MyParameters
+        parameters[MyParameters.PROFILER].to_json(args.profile + '.json')
+        parameters[MyParameters.PROFILER].to_collapsed(args.profile + '.folded')
+
+    if args.formats:
+        start = time.perf_counter()
+        names = [os.path.splitext(os.path.basename(file_path))[0] for file_path in args.inputs]
+        export(trees, names, args.output_dir, args.formats, args.jobs, not args.force_export)
+        timings.append(('export', time.perf_counter() - start))
+
+    if args.verbose:
+        for stage, elapsed in timings:
+            print('%-10s %8.3f s' % (stage, elapsed), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
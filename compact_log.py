@@ -0,0 +1,493 @@
+from array import array
+from collections import Counter
+from itertools import islice
+
+from log_statistics import LogStatistics
+
+
+class ActivityIndex(object):
+    """
+    Interns activity names to small consecutive integers, shared by a log and all its sublogs
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name) -> int:
+        activity_id = self.ids.get(name)
+        if activity_id is None:
+            activity_id = len(self.names)
+            self.ids[name] = activity_id
+            self.names.append(name)
+        return activity_id
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, activity_id):
+        return self.names[activity_id]
+
+
+class CompactLog(object):
+    """
+    Log where identical traces are collapsed into variants with a multiplicity
+
+    The activity ids of all the variants are stored one after the other in a single array,
+    offsets[i]:offsets[i + 1] delimiting the i-th variant, which occurs counts[i] times in the log
+    """
+
+    def __init__(self, activity_index: ActivityIndex, events=None, offsets=None, counts=None):
+        self.activity_index = activity_index
+        self.events = events if events is not None else array('i')
+        self.offsets = offsets if offsets is not None else array('q', [0])
+        self.counts = counts if counts is not None else array('q')
+
+    @classmethod
+    def from_variants(cls, activity_index: ActivityIndex, variants):
+        """
+        Builds the log from a mapping (or iterable of pairs) variant -> multiplicity, variants being tuples of ids
+        """
+        log = cls(activity_index)
+        items = variants.items() if hasattr(variants, 'items') else variants
+        for variant, count in items:
+            if count > 0:
+                log.events.extend(variant)
+                log.offsets.append(len(log.events))
+                log.counts.append(count)
+        return log
+
+    @classmethod
+    def from_traces(cls, traces, activity_index: ActivityIndex = None):
+        """
+        Builds the log from an iterable of traces, each one being a sequence of activity names
+        """
+        if activity_index is None:
+            activity_index = ActivityIndex()
+        intern = activity_index.intern
+        variants = Counter()
+        for trace in traces:
+            variants[tuple(intern(name) for name in trace)] += 1
+        return cls.from_variants(activity_index, variants)
+
+    @classmethod
+    def from_event_log(cls, log, activity_key: str, activity_index: ActivityIndex = None):
+        return cls.from_traces(([event[activity_key] for event in trace] for trace in log), activity_index)
+
+    def to_event_log(self, activity_key: str):
+        """
+        Expands the variants back to a pm4py EventLog, where every event only has the activity attribute
+        """
+        from pm4py.objects.log.obj import EventLog, Trace, Event
+        log = EventLog()
+        for variant, count in self.variants():
+            names = [self.activity_index[a] for a in variant]
+            for _ in range(count):
+                log.append(Trace([Event({activity_key: name}) for name in names]))
+        return log
+
+    def variants(self):
+        """
+        Iterates over (variant, multiplicity), the variant being an array of activity ids
+        """
+        events = self.events
+        offsets = self.offsets
+        for i, count in enumerate(self.counts):
+            yield events[offsets[i]:offsets[i + 1]], count
+
+    @property
+    def num_variants(self) -> int:
+        return len(self.counts)
+
+    @property
+    def num_traces(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def num_events(self) -> int:
+        return sum(count * (self.offsets[i + 1] - self.offsets[i]) for i, count in enumerate(self.counts))
+
+    def __len__(self):
+        # same semantic of len(EventLog), the number of traces
+        return self.num_traces
+
+    def is_empty(self) -> bool:
+        return len(self.counts) == 0
+
+    def contains_empty_trace(self) -> bool:
+        offsets = self.offsets
+        return any(offsets[i] == offsets[i + 1] for i in range(len(self.counts)))
+
+    def single_activity(self):
+        """
+        Returns the name of the activity if every trace is made by exactly that single activity, None otherwise
+        """
+        if self.is_empty():
+            return None
+        offsets = self.offsets
+        first = None
+        for i in range(len(self.counts)):
+            if offsets[i + 1] - offsets[i] != 1:
+                return None
+            if first is None:
+                first = self.events[offsets[i]]
+            elif self.events[offsets[i]] != first:
+                return None
+        return self.activity_index[first]
+
+    def activity_ids(self) -> set:
+        return set(self.events)
+
+    def activity_names(self) -> set:
+        return {self.activity_index[a] for a in set(self.events)}
+
+    def statistics(self) -> LogStatistics:
+        """
+        DFG, activities, start and end activities (by name) in a single pass over the variants
+        """
+        statistics = LogStatistics()
+        for variant, count in self.variants():
+            statistics.add_trace(variant, count)
+        return statistics.translate(self.activity_index.names)
+
+    def dfg(self) -> dict:
+        names = self.activity_index.names
+        dfg = Counter()
+        for variant, count in self.variants():
+            for a, b in zip(variant, islice(variant, 1, None)):
+                dfg[(a, b)] += count
+        return {(names[a], names[b]): v for (a, b), v in dfg.items()}
+
+    def activities(self) -> dict:
+        names = self.activity_index.names
+        activities = Counter()
+        for variant, count in self.variants():
+            for a in variant:
+                activities[a] += count
+        return {names[a]: v for a, v in activities.items()}
+
+    def start_activities(self) -> dict:
+        names = self.activity_index.names
+        start_activities = Counter()
+        for variant, count in self.variants():
+            if variant:
+                start_activities[variant[0]] += count
+        return {names[a]: v for a, v in start_activities.items()}
+
+    def end_activities(self) -> dict:
+        names = self.activity_index.names
+        end_activities = Counter()
+        for variant, count in self.variants():
+            if variant:
+                end_activities[variant[-1]] += count
+        return {names[a]: v for a, v in end_activities.items()}
+
+    def _partition_of(self, cut) -> dict:
+        ids = self.activity_index.ids
+        partition_of = {}
+        for index, part in enumerate(cut):
+            for name in part:
+                if name in ids:
+                    partition_of[ids[name]] = index
+        return partition_of
+
+    def _make_logs(self, sublogs):
+        return [CompactLog.from_variants(self.activity_index, variants) for variants in sublogs]
+
+    def _make_logs_with_statistics(self, sublogs):
+        # the statistics of every sublog (mapping or iterable of pairs variant -> multiplicity, as in from_variants)
+        # are accumulated while its variants are packed
+        names = self.activity_index.names
+        logs = []
+        for variants in sublogs:
+            log = CompactLog(self.activity_index)
+            statistics = LogStatistics()
+            for variant, count in (variants.items() if hasattr(variants, 'items') else variants):
+                log.events.extend(variant)
+                log.offsets.append(len(log.events))
+                log.counts.append(count)
+                statistics.add_trace(variant, count)
+            logs.append((log, statistics.translate(names)))
+        return logs
+
+    def split_with_statistics(self, split_name: str, cut):
+        """
+        Applies the split named split_name (e.g. 'split_xor') returning, for every sublog, the pair
+        (sublog, LogStatistics of the sublog), everything computed by one pass over the variants of this log
+        """
+        return self._make_logs_with_statistics(getattr(self, SPLIT_VARIANTS[split_name])(cut))
+
+    def split_xor(self, cut):
+        """
+        Same as splitting.split_xor: every trace goes to each partition that contains all of its activities
+        """
+        return self._make_logs(self._xor_variants(cut))
+
+    def split_xor_infrequent(self, cut):
+        """
+        Same as splitting_infrequent.split_xor_infrequent: every trace goes to the (first) partition holding most of
+        its events, projected on it
+        """
+        return self._make_logs(self._xor_infrequent_variants(cut))
+
+    def split_sequence(self, cut):
+        """
+        Same as splitting.split_sequence: every partition gets the first run of its activities of every trace, an
+        empty trace if there is none
+        """
+        return self._make_logs(self._sequence_variants(cut))
+
+    def split_sequence_infrequent(self, cut):
+        """
+        Same as splitting_infrequent.split_sequence_infrequent: every trace is cut at the split points of
+        find_split_point, the i-th piece being projected on the i-th partition
+        """
+        return self._make_logs(self._sequence_infrequent_variants(cut))
+
+    def split_parallel(self, cut):
+        """
+        Same as splitting.split_parallel: projects every trace on every partition, keeping the empty projections
+        """
+        return self._make_logs(self._parallel_variants(cut))
+
+    def split_loop(self, cut):
+        """
+        Same as splitting.split_loop: cuts every trace in maximal runs of activities of the same partition, each run
+        going to its partition; the partitions without runs get no sublog
+        """
+        return self._make_logs(self._loop_variants(cut))
+
+    def split_loop_infrequent(self, cut):
+        """
+        Split of splitting_infrequent.split_loop_infrequent, which fails on any non empty trace of an EventLog
+        (events are compared with activity names): every trace is cut before each activity that is not in the
+        partition of the current piece, the first piece being in the do partition, so that the do partition gets an
+        empty trace when the trace starts or ends in a redo one. Every partition has its sublog, empty or not
+        """
+        return self._make_logs(self._loop_infrequent_variants(cut))
+
+    def _xor_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            parts = {partition_of.get(a) for a in variant}
+            for index in range(len(cut)):
+                if not parts or parts == {index}:
+                    sublogs[index][tuple(variant)] += count
+        return sublogs
+
+    def _xor_infrequent_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            occurrences = [0] * len(cut)
+            for a in variant:
+                if a in partition_of:
+                    occurrences[partition_of[a]] += 1
+            index = occurrences.index(max(occurrences))
+            sublogs[index][tuple(a for a in variant if partition_of.get(a) == index)] += count
+        return sublogs
+
+    def _sequence_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            parts = [partition_of.get(a) for a in variant]
+            for index in range(len(cut)):
+                start = parts.index(index) if index in parts else len(parts)
+                end = start
+                while end < len(parts) and parts[end] == index:
+                    end += 1
+                sublogs[index][tuple(variant[start:end])] += count
+        return sublogs
+
+    def _sequence_infrequent_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            parts = [partition_of.get(a) for a in variant]
+            split_point = 0
+            for index in range(len(cut)):
+                new_split_point = _find_split_point(parts, index, split_point)
+                sublogs[index][tuple(a for a, part in zip(variant[split_point:new_split_point],
+                                                          parts[split_point:new_split_point])
+                                     if part == index)] += count
+                split_point = new_split_point
+        return sublogs
+
+    def _parallel_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            projections = [[] for _ in cut]
+            for a in variant:
+                if a in partition_of:
+                    projections[partition_of[a]].append(a)
+            for index, projection in enumerate(projections):
+                sublogs[index][tuple(projection)] += count
+        return sublogs
+
+    def _loop_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            run = []
+            run_index = None
+            for a in variant:
+                index = partition_of.get(a)
+                # an activity out of the partitions ends the run as well
+                if index != run_index and run:
+                    sublogs[run_index][tuple(run)] += count
+                    run = []
+                run_index = index
+                if index is not None:
+                    run.append(a)
+            if run:
+                sublogs[run_index][tuple(run)] += count
+        return [sublog for sublog in sublogs if sublog]
+
+    def _loop_infrequent_variants(self, cut):
+        partition_of = self._partition_of(cut)
+        sublogs = [Counter() for _ in cut]
+        for variant, count in self.variants():
+            piece = []
+            piece_index = 0
+            for a in variant:
+                if partition_of.get(a) == piece_index:
+                    piece.append(a)
+                else:
+                    sublogs[piece_index][tuple(piece)] += count
+                    piece = []
+                    if a in partition_of:
+                        piece_index = partition_of[a]
+                        piece.append(a)
+            sublogs[piece_index][tuple(piece)] += count
+            if piece_index != 0:
+                sublogs[0][()] += count
+        return sublogs
+
+    def empty_trace_filtering(self, f):
+        """
+        Same as fall_through_infrequent.empty_trace_filtering: removes the empty traces, telling if they
+        were present and if they are frequent enough (at least f times the number of traces)
+
+        Returns (present, frequent enough, log without the empty traces, LogStatistics of that log)
+        """
+        empty = 0
+        variants = []
+        for variant, count in self.variants():
+            if len(variant) == 0:
+                empty += count
+            else:
+                variants.append((variant, count))
+        (new_log, statistics), = self._make_logs_with_statistics([variants])
+        return empty > 0, empty >= f * self.num_traces, new_log, statistics
+
+    def act_once_per_trace(self, activities):
+        """
+        Same as fall_through.act_once_per_trace: looks for an activity occurring exactly once in every trace, the
+        first one in the order of activities (dict activity -> occurrences) being chosen
+
+        Returns (found, log without the activity, log made by a single trace of the activity, and the LogStatistics
+        of the two logs)
+        """
+        ids = self.activity_index.ids
+        num_traces = self.num_traces
+        chosen = None
+        for name, occurrences in activities.items():
+            # occurring as many times as the traces, the activity occurs once in every trace containing it
+            if occurrences == num_traces and name in ids and \
+                    all(ids[name] in variant for variant, _ in self.variants()):
+                chosen = ids[name]
+                break
+        if chosen is None:
+            return False, self, None, None, None
+        new_variants = Counter()
+        for variant, count in self.variants():
+            new_variants[tuple(a for a in variant if a != chosen)] += count
+        (new_log, new_statistics), (small_log, small_statistics) = self._make_logs_with_statistics(
+            [new_variants, {(chosen,): 1}])
+        return True, new_log, small_log, new_statistics, small_statistics
+
+    def _split_traces(self, split_before):
+        new_variants = Counter()
+        found = False
+        for variant, count in self.variants():
+            start = 0
+            for i in range(1, len(variant)):
+                if split_before(variant[i - 1], variant[i]):
+                    new_variants[tuple(variant[start:i])] += count
+                    start = i
+                    found = True
+            new_variants[tuple(variant[start:])] += count
+        (new_log, statistics), = self._make_logs_with_statistics([new_variants])
+        return found, new_log, statistics
+
+    def strict_tau_loop(self, start_activities, end_activities):
+        """
+        Splits the traces where an end activity is directly followed by a start activity
+
+        Returns (found, log of the split traces, LogStatistics of that log)
+        """
+        ids = self.activity_index.ids
+        start_ids = {ids[a] for a in start_activities if a in ids}
+        end_ids = {ids[a] for a in end_activities if a in ids}
+        return self._split_traces(lambda a, b: a in end_ids and b in start_ids)
+
+    def tau_loop(self, start_activities):
+        """
+        Splits the traces before every start activity that is not the first event, returning the same as
+        strict_tau_loop
+        """
+        ids = self.activity_index.ids
+        start_ids = {ids[a] for a in start_activities if a in ids}
+        return self._split_traces(lambda a, b: b in start_ids)
+
+
+# variants computation behind every split
+SPLIT_VARIANTS = {
+    'split_xor': '_xor_variants',
+    'split_xor_infrequent': '_xor_infrequent_variants',
+    'split_sequence': '_sequence_variants',
+    'split_sequence_infrequent': '_sequence_infrequent_variants',
+    'split_parallel': '_parallel_variants',
+    'split_loop': '_loop_variants',
+    'split_loop_infrequent': '_loop_infrequent_variants',
+}
+
+
+def _find_split_point(parts, index, start):
+    """
+    Same as splitting_infrequent.find_split_point, on the partition of every event (None if in no partition): the
+    activities of the partitions before index are ignored
+    """
+    possibly_best_before_first_activity = False
+    least_cost = start
+    position_with_least_cost = start
+    cost = 0
+    for i in range(start, len(parts)):
+        part = parts[i]
+        if part == index:
+            cost -= 1
+        elif part is None or part > index:
+            if i == 0:
+                possibly_best_before_first_activity = True
+            cost += 1
+        if cost <= least_cost:
+            least_cost = cost
+            position_with_least_cost = i + 1
+    if possibly_best_before_first_activity and position_with_least_cost == 1:
+        position_with_least_cost = 0
+    return position_with_least_cost
+
+
+def read_xes(file_path: str, activity_key: str = 'concept:name', activity_index: ActivityIndex = None) -> CompactLog:
+    """
+    Streams a XES file directly into a CompactLog, without building the intermediate EventLog
+    """
+    import xes_stream
+    traces = ([event[activity_key] for event in events if activity_key in event]
+              for _, events in xes_stream.iter_xes_traces(file_path, event_attributes=(activity_key,)))
+    return CompactLog.from_traces(traces, activity_index)
@@ -0,0 +1,145 @@
+from compact_log import CompactLog
+from discovery_profiler import NULL_PROFILER
+from MyParameters import MyParameters
+from sparse_dfg import SparseDfg
+
+
+def get_log_activities(log, activity_key) -> set:
+    if isinstance(log, CompactLog):
+        return log.activity_names()
+    return {event[activity_key] for trace in log for event in trace}
+
+
+def get_receive_predecessors(initial_dfg, initial_start_activities, initial_log_activities) -> dict:
+    """
+    Index used by the receive message base case, built once for the whole log
+
+    Returns
+    -----------
+    dict
+        Activity -> its predecessors in the initial dfg that are start activities without occurring in the log,
+        i.e. the sender activities of the other parties (activities without such predecessors are left out)
+    """
+    initial_start_activities = set(initial_start_activities)
+    receive_predecessors = {}
+    for activity, predecessors in initial_dfg.ingoing.items():
+        senders = [a for a in predecessors if a in initial_start_activities and a not in initial_log_activities]
+        if senders:
+            receive_predecessors[activity] = senders
+    return receive_predecessors
+
+
+class DiscoveryContext(object):
+    """
+    Read-only state of the discovery of a log, built once at the root and shared by all the subtrees
+
+    The attributes cannot be reassigned; derive returns a copy with some of them replaced
+    """
+    __slots__ = ('sender_nodes', 'initial_log', 'master_dfg', 'initial_dfg', 'counts', 'f', 'noise_threshold',
+                 'initial_start_activities', 'initial_end_activities', 'parameters', 'activity_key', 'engine',
+                 'profiler', 'receive_predecessors')
+
+    def __init__(self, sender_nodes, initial_log, master_dfg, initial_dfg, counts, f=0, noise_threshold=0,
+                 initial_start_activities=None, initial_end_activities=None, parameters=None, engine=None,
+                 receive_predecessors=None):
+        """
+        Parameters
+        -----------
+        sender_nodes
+            Edges ((sender activity, receiver activity), number of messages) of the messages received by the party
+        initial_log
+            Whole log
+        master_dfg
+            Original DFG
+        initial_dfg
+            Referral directly follows graph that should be taken in account adding hidden/loop transitions
+        counts
+            Shared variable
+        f
+            Noise threshold
+        noise_threshold
+            Noise threshold multiplied by the max count of the dfg
+        initial_start_activities
+            Start activities of the whole log (inferred from master_dfg if not given)
+        initial_end_activities
+            End activities of the whole log (inferred from master_dfg if not given)
+        parameters
+            Parameters of the algorithm
+        engine
+            DiscoveryEngine in which the subtrees are queued, None to expand them right away
+        receive_predecessors
+            Index of the sender activities (see get_receive_predecessors), built from the log if not given
+        """
+        from pm4py import util as pmutil
+        from pm4py.algo.discovery.dfg.utils.dfg_utils import infer_start_activities, infer_end_activities
+        from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+        from pm4py.util import exec_utils
+        # the dfgs are never modified, there is no need to copy them
+        if not isinstance(master_dfg, SparseDfg):
+            master_dfg = SparseDfg(master_dfg)
+        if not isinstance(initial_dfg, SparseDfg):
+            initial_dfg = SparseDfg(initial_dfg)
+        if initial_start_activities is None:
+            initial_start_activities = infer_start_activities(master_dfg)
+        if initial_end_activities is None:
+            initial_end_activities = infer_end_activities(master_dfg)
+        activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                                  pmutil.xes_constants.DEFAULT_NAME_KEY)
+        if receive_predecessors is None:
+            # the whole log is scanned once, the leaves only look the index up
+            receive_predecessors = get_receive_predecessors(initial_dfg, initial_start_activities,
+                                                            get_log_activities(initial_log, activity_key))
+        values = {
+            'sender_nodes': sender_nodes if sender_nodes is not None else [],
+            'initial_log': initial_log,
+            'master_dfg': master_dfg,
+            'initial_dfg': initial_dfg,
+            'counts': counts,
+            'f': f,
+            'noise_threshold': noise_threshold,
+            'initial_start_activities': initial_start_activities,
+            'initial_end_activities': initial_end_activities,
+            'parameters': parameters,
+            'activity_key': activity_key,
+            'engine': engine,
+            'profiler': exec_utils.get_param_value(MyParameters.PROFILER, parameters, NULL_PROFILER),
+            'receive_predecessors': receive_predecessors,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("the discovery context is read-only")
+
+    def derive(self, **changes):
+        """
+        Returns a copy of the context with the given attributes replaced; a new parameters dictionary also
+        replaces the profiler taken from it, unless one is given
+        """
+        context = object.__new__(DiscoveryContext)
+        context.__setstate__({name: getattr(self, name) for name in self.__slots__})
+        if 'parameters' in changes:
+            from pm4py.util import exec_utils
+            parameters = changes['parameters']
+            changes.setdefault('profiler', exec_utils.get_param_value(MyParameters.PROFILER, parameters, NULL_PROFILER))
+        for name, value in changes.items():
+            object.__setattr__(context, name, value)
+        return context
+
+    def __getstate__(self):
+        # the engine only makes sense in the process running it
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state['engine'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def initial_outgoing(self):
+        return self.initial_dfg.outgoing
+
+    @property
+    def initial_ingoing(self):
+        return self.initial_dfg.ingoing
@@ -0,0 +1,168 @@
+import heapq
+from collections import deque
+from itertools import count
+
+from compact_log import CompactLog
+from MyParameters import MyParameters
+
+
+def log_size(log) -> int:
+    # number of events of a (sub)log
+    if log is None:
+        return 0
+    if isinstance(log, CompactLog):
+        return log.num_events
+    return sum(len(trace) for trace in log)
+
+
+class FifoScheduler(object):
+    """
+    Expands the subtrees level by level, in the order they were found
+    """
+
+    def __init__(self):
+        self.tasks = deque()
+
+    def push(self, node):
+        self.tasks.append(node)
+
+    def pop(self):
+        return self.tasks.popleft()
+
+    def pop_last(self):
+        return self.tasks.pop()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+
+class LifoScheduler(FifoScheduler):
+    """
+    Expands the last subtree found first (depth first, as the recursive discovery), keeping the frontier small
+    """
+
+    def pop(self):
+        return self.tasks.pop()
+
+
+class LargestSublogFirstScheduler(object):
+    """
+    Expands first the subtree of the largest sublog, ties broken by arrival order
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self.counter = count()
+
+    def push(self, node):
+        heapq.heappush(self.tasks, (-log_size(node.log), next(self.counter), node))
+
+    def pop(self):
+        return heapq.heappop(self.tasks)[2]
+
+    def pop_last(self):
+        # the most recent task, wherever it is in the heap
+        position = max(range(len(self.tasks)), key=lambda i: self.tasks[i][1])
+        task = self.tasks[position]
+        self.tasks[position] = self.tasks[-1]
+        self.tasks.pop()
+        heapq.heapify(self.tasks)
+        return task[2]
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return (task[2] for task in sorted(self.tasks))
+
+
+SCHEDULERS = {
+    'fifo': FifoScheduler,
+    'lifo': LifoScheduler,
+    'largest_first': LargestSublogFirstScheduler,
+}
+
+
+class DiscoveryEngine(object):
+    """
+    Drives the discovery with an explicit work queue instead of recursion
+
+    A subtree whose cut is still to be detected is a task in the frontier: MySubtreeInfrequent pushes itself once
+    initialized, and the engine pops the tasks one at a time and detects their cut, which pushes the children in
+    turn. The order in which the tasks are expanded is chosen by the scheduler and does not change the discovered
+    tree. When the frontier reaches max_frontier, the most recent tasks are expanded first (depth first) until it
+    shrinks again, so that it never grows beyond max_frontier plus the children of a single cut
+
+    With a parallel threshold, the subtrees of the sublogs having at least that many events are discovered on a
+    pool of processes (see parallel_discovery) instead of being queued
+    """
+
+    def __init__(self, scheduler='lifo', max_frontier=None, parallel_threshold=None, n_jobs=None):
+        """
+        Parameters
+        -----------
+        scheduler
+            Name in SCHEDULERS or object with push, pop, pop_last, __len__ and __iter__
+        max_frontier
+            Soft bound of the number of pending tasks (None for no bound)
+        parallel_threshold
+            Minimum number of events of a sublog discovered on the pool of processes (None to discover everything
+            in this process)
+        n_jobs
+            Number of worker processes (default: number of cpus)
+        """
+        self.frontier = SCHEDULERS[scheduler]() if isinstance(scheduler, str) else scheduler
+        self.max_frontier = max_frontier
+        self.expanded = 0
+        self.peak_frontier = 0
+        self.parallel = None
+        if parallel_threshold is not None:
+            from parallel_discovery import ParallelDiscovery
+            self.parallel = ParallelDiscovery(parallel_threshold, n_jobs)
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        from pm4py.util import exec_utils
+        return cls(exec_utils.get_param_value(MyParameters.SCHEDULER, parameters, 'lifo'),
+                   exec_utils.get_param_value(MyParameters.MAX_FRONTIER, parameters, None),
+                   exec_utils.get_param_value(MyParameters.PARALLEL_THRESHOLD, parameters, None),
+                   exec_utils.get_param_value(MyParameters.N_JOBS, parameters, None))
+
+    def offload(self, parent, log, statistics, start_activities, end_activities):
+        """
+        Returns the subtree structure of a child sublog discovered on the pool of processes, or None if the child
+        has to be discovered by this engine
+        """
+        if self.parallel is None:
+            return None
+        return self.parallel.submit(parent, log, log_size(log), statistics, start_activities, end_activities)
+
+    def push(self, node):
+        self.frontier.push(node)
+        self.peak_frontier = max(self.peak_frontier, len(self.frontier))
+
+    def pending(self) -> list:
+        """
+        Subtrees still to be expanded, in scheduling order
+        """
+        return list(self.frontier)
+
+    def run(self):
+        while len(self.frontier):
+            if self.max_frontier is not None and len(self.frontier) >= self.max_frontier:
+                node = self.frontier.pop_last()
+            else:
+                node = self.frontier.pop()
+            self.expanded += 1
+            sizes = node.profiler.start_node(node)
+            node.detect_cut_if(parameters=node.parameters)
+            node.profiler.end_node(sizes, node)
+        if self.parallel is not None:
+            self.parallel.join()
+
+    def stats(self) -> dict:
+        return {'expanded': self.expanded, 'peak_frontier': self.peak_frontier, 'pending': len(self.frontier),
+                'offloaded': len(self.parallel.remote) if self.parallel is not None else 0}
@@ -0,0 +1,158 @@
+import json
+import time
+from collections import Counter
+
+from compact_log import CompactLog
+
+
+class _Phase(object):
+    __slots__ = ('profiler', 'name', 'depth', 'start', 'children_time')
+
+    def __init__(self, profiler, name, depth):
+        self.profiler = profiler
+        self.name = name
+        self.depth = depth
+
+    def __enter__(self):
+        self.children_time = 0.0
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler.stack
+        path = tuple(phase.name for phase in stack)
+        stack.pop()
+        if stack:
+            stack[-1].children_time += elapsed
+        entry = self.profiler.phases.get((self.depth, path))
+        if entry is None:
+            self.profiler.phases[(self.depth, path)] = [1, elapsed, elapsed - self.children_time]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += elapsed - self.children_time
+        return False
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+def log_sizes(log, activities) -> tuple:
+    # traces, events and activities of a (sub)log
+    if log is None:
+        return 0, 0, len(activities or ())
+    if isinstance(log, CompactLog):
+        return log.num_traces, log.num_events, len(activities or ())
+    return len(log), sum(len(trace) for trace in log), len(activities or ())
+
+
+class DiscoveryProfiler(object):
+    """
+    Wall time and number of calls of the phases of the discovery (base cases, cut detection, filtering, splitting,
+    DFG computation, fall throughs), per recursion depth, and size and detected cut of every discovered subtree
+
+    A phase is timed with `with profiler.phase(name, depth):`, phases nest: the time of a phase includes the one of
+    the phases it contains (total) and is also kept without it (self), which is what the collapsed stacks of
+    to_collapsed report
+    """
+    enabled = True
+
+    def __init__(self):
+        # (depth, path of phase names) -> [calls, total seconds, self seconds]
+        self.phases = {}
+        # (depth, traces, events, activities, detected cut) of every expanded subtree
+        self.nodes = []
+        self.stack = []
+
+    def phase(self, name: str, depth: int):
+        return _Phase(self, name, depth)
+
+    def start_node(self, node):
+        return log_sizes(node.log, node.activities)
+
+    def end_node(self, sizes, node):
+        self.nodes.append((node.rec_depth,) + sizes + (node.detected_cut,))
+
+    def merge(self, other):
+        """
+        Adds the records of another profiler (e.g. of a worker process)
+        """
+        for key, (calls, total, own) in other.phases.items():
+            entry = self.phases.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] += own
+        self.nodes.extend(other.nodes)
+
+    def cuts(self) -> Counter:
+        """
+        Number of subtrees per detected cut or fall through
+        """
+        return Counter(node[4] for node in self.nodes)
+
+    def as_dict(self) -> dict:
+        return {
+            'phases': [{'depth': depth, 'path': list(path), 'calls': calls, 'total_seconds': total,
+                        'self_seconds': own} for (depth, path), (calls, total, own) in sorted(self.phases.items())],
+            'nodes': [{'depth': depth, 'traces': traces, 'events': events, 'activities': activities, 'cut': cut}
+                      for depth, traces, events, activities, cut in self.nodes],
+            'cuts': dict(self.cuts()),
+        }
+
+    def to_json(self, file_path: str):
+        with open(file_path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=1)
+
+    def to_collapsed(self, file_path: str = None):
+        """
+        Collapsed stacks ("depth 2;detect_cut;check_cut_im_plain;detect_loop <microseconds>"), the input of
+        flamegraph.pl and speedscope
+
+        Returns
+        -----------
+        lines
+            The lines, also written in file_path if given
+        """
+        lines = ['%s %d' % (';'.join(('depth %d' % depth,) + path), round(own * 1e6))
+                 for (depth, path), (calls, total, own) in sorted(self.phases.items())]
+        if file_path is not None:
+            with open(file_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+        return lines
+
+    def __getstate__(self):
+        # the phases being timed only make sense in the process timing them
+        state = self.__dict__.copy()
+        state['stack'] = []
+        return state
+
+
+class NullProfiler(object):
+    """
+    Profiler used when the instrumentation is disabled, every call is a no-op
+    """
+    enabled = False
+
+    def phase(self, name, depth):
+        return NULL_PHASE
+
+    def start_node(self, node):
+        return None
+
+    def end_node(self, sizes, node):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,210 @@
+"""
+Global stream of the events of all the parties, in order of timestamp
+
+    for event in merge_party_logs(['Logs/generated/PartyA.xes', 'Logs/generated/PartyC.xes']):
+        print(event.timestamp, event.party, event.case_id, event.event['concept:name'])
+
+The party logs are merged lazily with a heap: only the traces with events still to be emitted, plus the next trace
+of every party, are kept in memory as events. The traces of a party are taken in order of their first event: the XES
+files are read through the columnar cache, whose memory mapped columns give the cases in any order, or streamed
+through a heap of the next STREAM_LOOKAHEAD traces of the file, which reorders the traces listed at most that far
+from their place
+"""
+import heapq
+from collections import namedtuple
+from datetime import timezone, timedelta
+
+import log_cache
+import xes_stream
+from message_correlation import MSG_INSTANCE_ID_KEY, MSG_TYPE_KEY, MSG_FLOW_KEY, MESSAGE_TYPES, SEND, RECEIVE
+
+TIMESTAMP_KEY = 'time:timestamp'
+ACTIVITY_KEY = 'concept:name'
+CASE_ID_KEY = 'concept:name'
+# traces of a streamed XES file read ahead to put them in order of their first event
+STREAM_LOOKAHEAD = 1024
+
+# event: dict of the attributes of the event
+GlobalEvent = namedtuple('GlobalEvent', ['timestamp', 'party', 'case_id', 'event'])
+
+
+def _timestamp(event, timestamp_key, case_id):
+    timestamp = event.get(timestamp_key)
+    if timestamp is None:
+        raise ValueError("event without %s in case %s" % (timestamp_key, case_id))
+    # naive timestamps are taken as UTC, as in log_cache, so that they compare with the others
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def _xes_traces(file_path, timestamp_key, lookahead):
+    # the traces read ahead: (start, position in the file, case id, events)
+    pending = []
+    previous = None
+    for position, (attributes, events) in enumerate(xes_stream.iter_xes_traces(file_path)):
+        if not events:
+            continue
+        case_id = attributes.get(CASE_ID_KEY)
+        start = _timestamp(events[0], timestamp_key, case_id)
+        if previous is not None and start < previous:
+            raise ValueError("%s: case %s starts before a case listed more than %d traces earlier, read the log "
+                             "through the columnar cache or with a larger lookahead" % (file_path, case_id, lookahead))
+        heapq.heappush(pending, (start, position, case_id, events))
+        if len(pending) > lookahead:
+            previous, _, case_id, events = heapq.heappop(pending)
+            yield case_id, events
+    while pending:
+        _, _, case_id, events = heapq.heappop(pending)
+        yield case_id, events
+
+
+def _columnar_traces(log):
+    import numpy as np
+    offsets = np.asarray(log.case_offsets)
+    # only the first event of every case is read from the columns, which may be memory mapped
+    non_empty = np.flatnonzero(offsets[1:] > offsets[:-1])
+    starts = np.asarray(log.timestamps)[offsets[non_empty]]
+    for i in non_empty[np.argsort(starts, kind='stable')].tolist():
+        # the events of a case are built only when the case is reached
+        yield log.case_ids[i], _columnar_events(log, int(offsets[i]), int(offsets[i + 1]))
+
+
+def _columnar_events(log, start, end):
+    events = []
+    for j in range(start, end):
+        event = {ACTIVITY_KEY: log.activity_names[log.activities[j]]}
+        if log.timestamps[j] != log_cache.NO_TIMESTAMP:
+            event[TIMESTAMP_KEY] = log_cache.EPOCH + timedelta(microseconds=int(log.timestamps[j]))
+        if log.msg_instances[j] >= 0:
+            event[MSG_INSTANCE_ID_KEY] = log.msg_instance_ids[log.msg_instances[j]]
+        if log.msg_types[j] > 0:
+            event[MSG_TYPE_KEY] = MESSAGE_TYPES[log.msg_types[j]]
+        if log.msg_flows[j] >= 0:
+            event[MSG_FLOW_KEY] = log.msg_flow_names[log.msg_flows[j]]
+        events.append(event)
+    return events
+
+
+def party_traces(log, timestamp_key=TIMESTAMP_KEY, cache_dir=log_cache.DEFAULT_CACHE_DIR,
+                 lookahead=STREAM_LOOKAHEAD):
+    """
+    Non empty traces of a party log, in order of their first event
+
+    Parameters
+    -----------
+    log
+        Path of a XES file, ColumnarLog, or EventLog
+    timestamp_key
+        Timestamp attribute (of the XES files and EventLog, the ColumnarLog has time:timestamp only)
+    cache_dir
+        Directory of the columnar cache through which the XES files are read (see log_cache.read_columnar), so that
+        their cases are taken from the memory mapped columns in any order; if None the XES files are streamed
+        instead, and a trace may be listed after at most lookahead traces starting after it
+    lookahead
+        Number of traces of a streamed XES file kept in memory to put them in order (ValueError if not enough)
+
+    Returns
+    -----------
+    generator
+        Pairs (case id, list of events), every event being a dict of its attributes
+    """
+    if isinstance(log, str):
+        if cache_dir is None:
+            return _xes_traces(log, timestamp_key, lookahead)
+        log = log_cache.read_columnar(log, cache_dir)
+    if hasattr(log, 'case_offsets'):
+        return _columnar_traces(log)
+    traces = [trace for trace in log if len(trace) > 0]
+    traces.sort(key=lambda trace: _timestamp(trace[0], timestamp_key, trace.attributes.get(CASE_ID_KEY)))
+    return ((trace.attributes.get(CASE_ID_KEY), list(trace)) for trace in traces)
+
+
+def merge_party_logs(logs, timestamp_key=TIMESTAMP_KEY, cache_dir=log_cache.DEFAULT_CACHE_DIR,
+                     lookahead=STREAM_LOOKAHEAD):
+    """
+    Merges the events of the party logs into a single stream, in order of timestamp
+
+    The order of the events inside a trace is kept; events with the same timestamp are given in order of party, then
+    of trace
+
+    Parameters
+    -----------
+    logs
+        One log per party, as accepted by party_traces, the party being identified by its position
+    timestamp_key
+        Timestamp attribute
+    cache_dir
+        Directory of the columnar cache of the XES files, see party_traces
+    lookahead
+        Traces read ahead in every streamed XES file, see party_traces
+
+    Returns
+    -----------
+    generator
+        GlobalEvent of every event of every party
+    """
+    sources = [party_traces(log, timestamp_key, cache_dir, lookahead) for log in logs]
+    sequence = [0] * len(sources)
+    # next trace of every party not started yet: (start, party, sequence, case id, events)
+    upcoming = []
+    # traces started: (timestamp of the next event, party, sequence, position of the next event, case id, events)
+    started = []
+
+    def read_next(party):
+        trace = next(sources[party], None)
+        if trace is not None:
+            case_id, events = trace
+            heapq.heappush(upcoming, (_timestamp(events[0], timestamp_key, case_id), party, sequence[party], case_id,
+                                      events))
+            sequence[party] += 1
+
+    for party in range(len(sources)):
+        read_next(party)
+    while started or upcoming:
+        # a trace starting before the next event of the started ones has to be started first
+        while upcoming and (not started or upcoming[0][:3] <= started[0][:3]):
+            start, party, trace_sequence, case_id, events = heapq.heappop(upcoming)
+            heapq.heappush(started, (start, party, trace_sequence, 0, case_id, events))
+            read_next(party)
+        timestamp, party, trace_sequence, position, case_id, events = heapq.heappop(started)
+        yield GlobalEvent(timestamp, party, case_id, events[position])
+        if position + 1 < len(events):
+            heapq.heappush(started, (_timestamp(events[position + 1], timestamp_key, case_id), party, trace_sequence,
+                                     position + 1, case_id, events))
+
+
+def message_latencies(events, activity_key=ACTIVITY_KEY):
+    """
+    Matches the send and receive events of a global stream (see merge_party_logs) on their message instance id;
+    only the messages still waiting for their counterpart are kept in memory
+
+    Returns
+    -----------
+    generator
+        Tuples (message instance id, (sender party, sender activity), (receiver party, receiver activity), time
+        from the send to the receive), in order of the later of the two events
+    """
+    sends = {}
+    receives = {}
+    for event in events:
+        instance_id = event.event.get(MSG_INSTANCE_ID_KEY)
+        if instance_id is None:
+            continue
+        side = (event.party, event.event[activity_key], event.timestamp)
+        message_type = event.event.get(MSG_TYPE_KEY)
+        if message_type == SEND:
+            counterpart = receives.pop(instance_id, None)
+            if counterpart is None:
+                sends[instance_id] = side
+                continue
+            sender, receiver = side, counterpart
+        elif message_type == RECEIVE:
+            counterpart = sends.pop(instance_id, None)
+            if counterpart is None:
+                receives[instance_id] = side
+                continue
+            sender, receiver = counterpart, side
+        else:
+            continue
+        yield instance_id, sender[:2], receiver[:2], receiver[2] - sender[2]
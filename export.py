@@ -0,0 +1,147 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pm4py
+import model_hash
+import my_to_bpmn
+import view_process_tree
+from pm4py.visualization.process_tree import visualizer as tree_visualizer
+from pm4py.visualization.bpmn import visualizer as bpmn_visualizer
+
+# formats rendered by Graphviz from the DOT sources
+IMAGE_FORMATS = ('svg', 'png')
+EXPORT_FORMATS = ('dot', 'bpmn') + IMAGE_FORMATS
+
+
+def render(source: str, image_format: str, file_path: str) -> str:
+    """
+    Lays out a DOT source with Graphviz and writes the image
+
+    Returns
+    -----------
+    file_path
+        Path of the written image
+    """
+    import graphviz
+    with open(file_path, 'wb') as f:
+        f.write(graphviz.Source(source).pipe(format=image_format))
+    return file_path
+
+
+def write_bpmn(bpmn, file_path: str) -> str:
+    """
+    Lays out a BPMN graph with Graphviz and writes its XML
+
+    Returns
+    -----------
+    file_path
+        Path of the written file
+    """
+    pm4py.write_bpmn(bpmn, file_path, enable_layout=True)
+    return file_path
+
+
+def model_sources(tree) -> dict:
+    """
+    Returns
+    -----------
+    dict
+        DOT source of the process tree ('tree') and of its BPMN ('bpmn'), plus the BPMN graph itself ('bpmn_graph')
+    """
+    bpmn = pm4py.convert_to_bpmn(tree)
+    return {
+        'tree': tree_visualizer.apply(tree).source,
+        'bpmn': bpmn_visualizer.apply(bpmn).source,
+        'bpmn_graph': bpmn,
+    }
+
+
+def model_paths(path: str, formats) -> list[str]:
+    """
+    Paths of the files exported for a party, path being the output directory joined with its name
+    """
+    paths = [path + '.bpmn'] if 'bpmn' in formats else []
+    for model in ('tree', 'bpmn'):
+        paths.extend('%s.%s.%s' % (path, model, f) for f in ('dot',) + IMAGE_FORMATS if f in formats)
+    return paths
+
+
+def is_unchanged(path: str, serialization: str, formats) -> bool:
+    """
+    Whether the files of a party were exported from the same model, whose serialization was stored in <path>.model
+    """
+    if not os.path.exists(path + '.model') or not all(os.path.exists(p) for p in model_paths(path, formats)):
+        return False
+    with open(path + '.model', encoding='utf-8') as f:
+        # same serialization, hence same content hash
+        return f.read() == serialization
+
+
+def export_models(trees: dict, output_dir: str, formats=EXPORT_FORMATS, n_jobs=None, skip_unchanged=True,
+                  sender_nodes=None) -> list[str]:
+    """
+    Writes the process tree and the BPMN of every party
+
+    For a party named <name> the files are <name>.tree.<format> and <name>.bpmn.<format> for the DOT and image
+    formats, and <name>.bpmn for the BPMN XML. The DOT sources are built in this process, the Graphviz layouts of the
+    images and of the BPMN XML, which take most of the time, run concurrently in a pool of n_jobs workers
+
+    The canonical serialization of every model (see model_hash) is stored in <name>.model once its files are
+    written: a model equal to the stored one, whose files are all there, is neither converted nor rendered again
+
+    Parameters
+    -----------
+    trees
+        Name of the party -> process tree
+    output_dir
+        Directory of the exported files
+    formats
+        Subset of EXPORT_FORMATS
+    n_jobs
+        Number of concurrent Graphviz layouts and writes (default: number of cpus)
+    skip_unchanged
+        Whether the models equal to the ones already exported are skipped
+    sender_nodes
+        Name of the party -> messages received by the party, stored in the serialization of its model
+
+    Returns
+    -----------
+    list
+        Paths of the written files
+    """
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError("unknown export formats: %s" % ', '.join(sorted(unknown)))
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    # (function, arguments) of the layouts run in the pool
+    tasks = []
+    serializations = {}
+    for name, tree in trees.items():
+        path = os.path.join(output_dir, name)
+        serialization = model_hash.serialize_model(tree, (sender_nodes or {}).get(name))
+        if skip_unchanged and is_unchanged(path, serialization, formats):
+            continue
+        serializations[path] = serialization
+        sources = model_sources(tree)
+        if 'bpmn' in formats:
+            tasks.append((write_bpmn, (sources['bpmn_graph'], path + '.bpmn')))
+        for model in ('tree', 'bpmn'):
+            if 'dot' in formats:
+                with open('%s.%s.dot' % (path, model), 'w') as f:
+                    f.write(sources[model])
+                written.append('%s.%s.dot' % (path, model))
+            for image_format in IMAGE_FORMATS:
+                if image_format in formats:
+                    tasks.append((render, (sources[model], image_format, '%s.%s.%s' % (path, model, image_format))))
+    if tasks:
+        # the layouts run in the Graphviz subprocesses, threads are enough to keep every cpu busy
+        with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+            futures = [executor.submit(function, *arguments) for function, arguments in tasks]
+            written.extend(future.result() for future in futures)
+    # written last, so that an interrupted export is done again
+    for path, serialization in serializations.items():
+        with open(path + '.model', 'w', encoding='utf-8') as f:
+            f.write(serialization)
+        written.append(path + '.model')
+    return written
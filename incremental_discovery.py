@@ -0,0 +1,148 @@
+"""
+Discovery of the process trees of a set of parties kept up to date while their events arrive
+
+    discovery = IncrementalDiscovery(n_parties=2, parameters=parameters)
+    discovery.add_event(0, 'case 1', {'concept:name': 'pick', 'msgInstanceId': 'm1', 'msgType': 'send'})
+    discovery.add_event(1, 'case 7', {'concept:name': 'place', 'msgInstanceId': 'm1', 'msgType': 'receive'})
+    discovery.close_case(0, 'case 1')
+    discovery.close_case(1, 'case 7')
+    trees = discovery.refresh()
+
+The variants, the statistics (dfg, activities, start and end activities) and the matched messages of every party
+are updated with every event, so that a refresh never goes through the history. A refresh rediscovers only the
+parties with new traces or new messages, and their subtrees are looked up in an IncrementalCache: only the sublogs
+reached by the new traces are rediscovered, the subtrees of the others are reused
+"""
+from collections import Counter
+
+from compact_log import ActivityIndex, CompactLog
+from log_statistics import LogStatistics
+from message_correlation import MessageIndex, MSG_INSTANCE_ID_KEY, MSG_TYPE_KEY
+from MyParameters import MyParameters
+
+
+class PartyStream(object):
+    """
+    Events of a party received so far: the cases still open, and the variants and statistics of the closed ones
+    """
+
+    def __init__(self):
+        self.activity_index = ActivityIndex()
+        self.open_cases = {}
+        self.variants = Counter()
+        # statistics of the closed cases, by activity id
+        self.statistics = LogStatistics()
+        self.changed = False
+
+    def add_event(self, case_id, activity):
+        self.open_cases.setdefault(case_id, []).append(self.activity_index.intern(activity))
+
+    def close_case(self, case_id):
+        trace = tuple(self.open_cases.pop(case_id, ()))
+        self.variants[trace] += 1
+        self.statistics.add_trace(trace)
+        self.changed = True
+
+    def log(self) -> CompactLog:
+        return CompactLog.from_variants(self.activity_index, self.variants)
+
+    def log_statistics(self):
+        """
+        Statistics of the closed cases, as returned by get_log_statistics
+        """
+        return self.statistics.translate(self.activity_index.names).as_tuple()
+
+
+class IncrementalDiscovery(object):
+    """
+    Process trees of a set of parties, discovered on the closed cases and refreshed on demand
+
+    An open case is not part of the models until it is closed: the discovery needs whole traces. The models are the
+    same as the ones discovered in batch on the closed cases with MyParameters.COMPACT_LOG
+    """
+
+    def __init__(self, n_parties, parameters=None, cache=None):
+        """
+        Parameters
+        -----------
+        n_parties
+            Number of parties, identified by their position
+        parameters
+            Parameters of the algorithm
+        cache
+            IncrementalCache of the subtrees (e.g. with a bounded size or a directory), a new one if not given
+        """
+        from pm4py import util as pmutil
+        from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+        from pm4py.util import exec_utils
+        from subtree_cache import IncrementalCache
+        # the subtrees have to be discovered in this process to be cached
+        self.parameters = {key: value for key, value in (parameters or {}).items()
+                           if key != MyParameters.PARALLEL_THRESHOLD}
+        self.parameters[MyParameters.COMPACT_LOG] = True
+        self.cache = cache if cache is not None else IncrementalCache()
+        self.parameters[MyParameters.SUBTREE_CACHE] = self.cache
+        self.activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, self.parameters,
+                                                       pmutil.xes_constants.DEFAULT_NAME_KEY)
+        self.parties = [PartyStream() for _ in range(n_parties)]
+        self.messages = MessageIndex()
+        self.sender_nodes = {}
+        self.trees = {}
+
+    def add_event(self, party, case_id, event):
+        """
+        Adds an event at the end of a case of a party
+
+        Parameters
+        -----------
+        party
+            Index of the party
+        case_id
+            Identifier of the case in the party
+        event
+            Attributes of the event: the activity and, if it exchanges a message, msgInstanceId and msgType
+        """
+        activity = event[self.activity_key]
+        self.parties[party].add_event(case_id, activity)
+        instance_id = event.get(MSG_INSTANCE_ID_KEY)
+        if instance_id is not None:
+            self.messages.add(party, activity, instance_id, event.get(MSG_TYPE_KEY))
+
+    def close_case(self, party, case_id):
+        """
+        Marks a case of a party as complete, adding its trace to the log of the party
+        """
+        self.parties[party].close_case(case_id)
+
+    def add_trace(self, party, case_id, events):
+        """
+        Adds a whole case to a party
+        """
+        for event in events:
+            self.add_event(party, case_id, event)
+        self.close_case(party, case_id)
+
+    def refresh(self) -> dict:
+        """
+        Rediscovers the trees of the parties whose log or received messages changed since the previous refresh
+
+        Returns
+        -----------
+        dict
+            Index of the party -> process tree, for the parties with at least a closed case
+        """
+        import apply_tree
+        sender_nodes = self.messages.sender_nodes()
+        for index, party in enumerate(self.parties):
+            party_sender_nodes = sender_nodes.get(index, [])
+            if not party.variants:
+                continue
+            if not party.changed and index in self.trees and party_sender_nodes == self.sender_nodes.get(index, []):
+                continue
+            self.trees[index] = apply_tree.discover_party_tree(party.log(), self.parameters, party_sender_nodes,
+                                                               party.log_statistics())
+            party.changed = False
+        self.sender_nodes = sender_nodes
+        # the structures of the base cases are never stored as trees, they are not kept between refreshes
+        self.cache.pending.clear()
+        return dict(self.trees)
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+import xes_stream
+from message_correlation import MSG_INSTANCE_ID_KEY, MSG_TYPE_KEY, MSG_FLOW_KEY, MESSAGE_TYPES
+
+DEFAULT_CACHE_DIR = '.log_cache'
+# bump when the layout of the cached columns changes
+FORMAT_VERSION = 2
+
+ACTIVITY_KEY = 'concept:name'
+TIMESTAMP_KEY = 'time:timestamp'
+CASE_ID_KEY = 'concept:name'
+
+NO_TIMESTAMP = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+COLUMNS = ('case_offsets', 'activities', 'timestamps', 'msg_instances', 'msg_types', 'msg_flows')
+# tables growing with the log, stored as memory mapped StringTable instead of in tables.json
+STRING_TABLES = (('cases', 'case_ids'), ('msg_instances', 'msg_instance_ids'), ('msg_flows', 'msg_flow_names'))
+
+
+class StringTable(object):
+    """
+    Read-only sequence of strings stored as the concatenation of their UTF-8 bytes (data) and the offsets of every
+    string in it, so that it can be memory mapped and only the strings actually used are decoded. A string whose
+    index is in missing stands for None
+    """
+
+    def __init__(self, data, offsets, missing=None):
+        self.data = data
+        self.offsets = offsets
+        self.missing = frozenset(missing.tolist()) if missing is not None else frozenset()
+
+    @staticmethod
+    def from_strings(strings):
+        encoded = [value.encode() if value is not None else b'' for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        missing = np.array([i for i, value in enumerate(strings) if value is None], dtype=np.int64)
+        return StringTable(data, offsets, missing)
+
+    def save(self, directory: str, name: str):
+        np.save(os.path.join(directory, name + '.strings.npy'), self.data)
+        np.save(os.path.join(directory, name + '.offsets.npy'), self.offsets)
+        if self.missing:
+            np.save(os.path.join(directory, name + '.missing.npy'), np.array(sorted(self.missing), dtype=np.int64))
+
+    @staticmethod
+    def load(directory: str, name: str):
+        missing_path = os.path.join(directory, name + '.missing.npy')
+        return StringTable(np.load(os.path.join(directory, name + '.strings.npy'), mmap_mode='r'),
+                           np.load(os.path.join(directory, name + '.offsets.npy'), mmap_mode='r'),
+                           np.load(missing_path) if os.path.exists(missing_path) else None)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index in self.missing:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ColumnarLog(object):
+    """
+    Log stored column by column: the events of the i-th case are case_offsets[i]:case_offsets[i + 1] of every
+    event column. Strings are ids in the tables of the log, -1 standing for a missing value; timestamps are UTC
+    microseconds since the epoch. The tables are lists, or StringTable when the log is opened from the cache
+    """
+
+    def __init__(self, columns: dict, tables: dict):
+        self.case_offsets = columns['case_offsets']
+        self.activities = columns['activities']
+        self.timestamps = columns['timestamps']
+        self.msg_instances = columns['msg_instances']
+        self.msg_types = columns['msg_types']
+        self.msg_flows = columns['msg_flows']
+        self.activity_names = tables['activities']
+        self.case_ids = tables['cases']
+        self.msg_instance_ids = tables['msg_instances']
+        self.msg_flow_names = tables['msg_flows']
+
+    @property
+    def num_cases(self) -> int:
+        return len(self.case_offsets) - 1
+
+    @property
+    def num_events(self) -> int:
+        return len(self.activities)
+
+    def to_compact_log(self, activity_index=None):
+        """
+        Builds the CompactLog straight from the activity column, without creating any event object
+        """
+        from compact_log import CompactLog, ActivityIndex
+        if activity_index is None:
+            activity_index = ActivityIndex()
+        remap = np.array([activity_index.intern(name) for name in self.activity_names], dtype=np.int32)
+        activities = remap[self.activities] if len(self.activities) else self.activities
+        offsets = self.case_offsets
+        traces = (tuple(activities[offsets[i]:offsets[i + 1]].tolist()) for i in range(self.num_cases))
+        return CompactLog.from_variants(activity_index, Counter(traces))
+
+    def to_event_log(self):
+        from pm4py.objects.log.obj import EventLog, Trace, Event
+        activities = self.activities.tolist()
+        timestamps = self.timestamps.tolist()
+        msg_instances = self.msg_instances.tolist()
+        msg_types = self.msg_types.tolist()
+        msg_flows = self.msg_flows.tolist()
+        offsets = self.case_offsets.tolist()
+        log = EventLog()
+        for i in range(self.num_cases):
+            trace = Trace(attributes={CASE_ID_KEY: self.case_ids[i]})
+            for j in range(offsets[i], offsets[i + 1]):
+                event = {ACTIVITY_KEY: self.activity_names[activities[j]]}
+                if timestamps[j] != NO_TIMESTAMP:
+                    event[TIMESTAMP_KEY] = EPOCH + timedelta(microseconds=timestamps[j])
+                if msg_instances[j] >= 0:
+                    event[MSG_INSTANCE_ID_KEY] = self.msg_instance_ids[msg_instances[j]]
+                if msg_types[j] > 0:
+                    event[MSG_TYPE_KEY] = MESSAGE_TYPES[msg_types[j]]
+                if msg_flows[j] >= 0:
+                    event[MSG_FLOW_KEY] = self.msg_flow_names[msg_flows[j]]
+                trace.append(Event(event))
+            log.append(trace)
+        return log
+
+
+def _intern(table: dict, value) -> int:
+    if value is None:
+        return -1
+    return table.setdefault(value, len(table))
+
+
+def parse_xes(file_path: str) -> ColumnarLog:
+    """
+    Streams a XES file into a ColumnarLog
+    """
+    tables = {'activities': {}, 'cases': [], 'msg_instances': {}, 'msg_flows': {}}
+    case_offsets = [0]
+    activities = []
+    timestamps = []
+    msg_instances = []
+    msg_types = []
+    msg_flows = []
+    for attributes, events in xes_stream.iter_xes_traces(file_path):
+        tables['cases'].append(attributes.get(CASE_ID_KEY))
+        for event in events:
+            activities.append(_intern(tables['activities'], event.get(ACTIVITY_KEY)))
+            timestamp = event.get(TIMESTAMP_KEY)
+            if timestamp is None:
+                timestamps.append(NO_TIMESTAMP)
+            else:
+                if timestamp.tzinfo is None:
+                    timestamp = timestamp.replace(tzinfo=timezone.utc)
+                timestamps.append((timestamp - EPOCH) // timedelta(microseconds=1))
+            msg_instances.append(_intern(tables['msg_instances'], event.get(MSG_INSTANCE_ID_KEY)))
+            msg_type = event.get(MSG_TYPE_KEY)
+            msg_types.append(MESSAGE_TYPES.index(msg_type) if msg_type in MESSAGE_TYPES else 0)
+            msg_flows.append(_intern(tables['msg_flows'], event.get(MSG_FLOW_KEY)))
+        case_offsets.append(len(activities))
+    columns = {
+        'case_offsets': np.array(case_offsets, dtype=np.int64),
+        'activities': np.array(activities, dtype=np.int32),
+        'timestamps': np.array(timestamps, dtype=np.int64),
+        'msg_instances': np.array(msg_instances, dtype=np.int32),
+        'msg_types': np.array(msg_types, dtype=np.int8),
+        'msg_flows': np.array(msg_flows, dtype=np.int32),
+    }
+    return ColumnarLog(columns, {name: list(table) for name, table in tables.items()})
+
+
+def content_hash(file_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """
+    SHA-256 of the file content, remembered in the cache directory by path, size and modification time so that
+    an unchanged file is not read again
+    """
+    stat = os.stat(file_path)
+    stamp = [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+    index_path = os.path.join(cache_dir, 'hashes.json')
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+    entry = index.get(stamp[0])
+    if entry is not None and entry[:2] == stamp[1:]:
+        return entry[2]
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    index[stamp[0]] = stamp[1:] + [sha.hexdigest()]
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = index_path + '.%d.tmp' % os.getpid()
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return sha.hexdigest()
+
+
+def save(log: ColumnarLog, entry_dir: str):
+    # written in a temporary directory and renamed, a reader never sees a partial entry
+    tmp_dir = entry_dir + '.%d.tmp' % os.getpid()
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in COLUMNS:
+        np.save(os.path.join(tmp_dir, name + '.npy'), getattr(log, name))
+    for name, attribute in STRING_TABLES:
+        table = getattr(log, attribute)
+        if not isinstance(table, StringTable):
+            table = StringTable.from_strings(table)
+        table.save(tmp_dir, name)
+    # written last, its presence marks a complete entry
+    with open(os.path.join(tmp_dir, 'tables.json'), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'activities': list(log.activity_names)}, f)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # another process stored the same entry in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load(entry_dir: str):
+    """
+    Opens a cache entry with the columns and the string tables memory mapped, returns None if the entry is missing or
+    outdated
+    """
+    tables_path = os.path.join(entry_dir, 'tables.json')
+    if not os.path.exists(tables_path):
+        return None
+    with open(tables_path) as f:
+        tables = json.load(f)
+    if tables.get('version') != FORMAT_VERSION:
+        return None
+    columns = {name: np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode='r') for name in COLUMNS}
+    for name, _ in STRING_TABLES:
+        tables[name] = StringTable.load(entry_dir, name)
+    return ColumnarLog(columns, tables)
+
+
+def read_columnar(file_path: str, cache_dir: str = DEFAULT_CACHE_DIR) -> ColumnarLog:
+    """
+    Returns the ColumnarLog of a XES file, parsing it only if the cache has no entry for its content
+
+    Parameters
+    -----------
+    file_path
+        Path of the XES file
+    cache_dir
+        Directory of the cache
+
+    Returns
+    -----------
+    log
+        Columnar log, memory mapped from the cache
+    """
+    entry_dir = os.path.join(cache_dir, content_hash(file_path, cache_dir))
+    log = load(entry_dir)
+    if log is None:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        save(parse_xes(file_path), entry_dir)
+        log = load(entry_dir)
+    return log
+
+
+def read_xes(file_path: str, cache_dir: str = DEFAULT_CACHE_DIR):
+    """
+    Same as xes_stream.read_xes, going through the columnar cache
+    """
+    return read_columnar(file_path, cache_dir).to_event_log()
@@ -0,0 +1,246 @@
+"""
+Synthetic multi-party logs exchanging messages, in the format of Logs/generated
+
+    python log_generator.py out/ --parties 3 --cases 1000 --activities 12 --variants 20 --loop-depth 1 \
+        --redo 0.5 --concurrency 0.3 --noise 0.05
+
+Party i sends one message per case to party i + 1: the send and receive events carry the msgInstanceId, msgType
+and msgFlow attributes used by message_correlation
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import quoteattr
+
+from message_correlation import MSG_INSTANCE_ID_KEY, MSG_TYPE_KEY, MSG_FLOW_KEY, RECEIVE
+
+ACTIVITY_KEY = 'concept:name'
+TIMESTAMP_KEY = 'time:timestamp'
+START_TIME = datetime(2021, 6, 23, 8, 0, tzinfo=timezone.utc)
+
+
+def party_name(index: int) -> str:
+    return 'Party%s' % chr(ord('A') + index) if index < 26 else 'Party%d' % index
+
+
+def random_model(activities: list, rng: random.Random, loop_depth: int, concurrency: float, redo: float = 0.0):
+    """
+    Random block-structured model over the activities, as nested tuples (operator, children) with the operators
+    'seq', 'xor', 'and', 'loop' and the activity names as leaves. Every activity appears exactly once; a loop has
+    its body and, possibly, a redo block
+    """
+    activities = list(activities)
+    rng.shuffle(activities)
+    blocks = []
+    while activities:
+        size = min(len(activities), rng.choice((1, 1, 2, 3)))
+        children, activities = activities[:size], activities[size:]
+        if size == 1:
+            blocks.append(children[0])
+        elif rng.random() < concurrency:
+            blocks.append(('and', children))
+        else:
+            blocks.append(('xor', children))
+    # the loops wrap consecutive blocks, nested up to loop_depth times
+    for _ in range(loop_depth):
+        if len(blocks) < 2:
+            break
+        start = rng.randrange(len(blocks) - 1)
+        end = rng.randrange(start + 1, len(blocks) + 1)
+        if redo and end - start > 1 and rng.random() < redo:
+            # the last block is executed between two iterations of the others
+            blocks[start:end] = [('loop', [('seq', blocks[start:end - 1]), blocks[end - 1]])]
+        else:
+            blocks[start:end] = [('loop', [('seq', blocks[start:end])])]
+    return 'seq', blocks
+
+
+def play_out(model, rng: random.Random, max_repetitions=3) -> list:
+    # one random execution of the model
+    if isinstance(model, str):
+        return [model]
+    operator, children = model
+    if operator == 'seq':
+        return [activity for child in children for activity in play_out(child, rng, max_repetitions)]
+    if operator == 'xor':
+        return play_out(rng.choice(children), rng, max_repetitions)
+    if operator == 'loop':
+        repetitions = rng.randint(1, max_repetitions)
+        trace = play_out(children[0], rng, max_repetitions)
+        for _ in range(repetitions - 1):
+            for child in children[1:]:
+                trace.extend(play_out(child, rng, max_repetitions))
+            trace.extend(play_out(children[0], rng, max_repetitions))
+        return trace
+    # 'and': the branches are interleaved at random
+    branches = [play_out(child, rng, max_repetitions) for child in children]
+    trace = []
+    while branches:
+        branch = rng.choice(branches)
+        trace.append(branch.pop(0))
+        if not branch:
+            branches.remove(branch)
+    return trace
+
+
+def add_noise(trace: list, activities: list, rng: random.Random) -> list:
+    # removes, swaps or inserts an event, the message events are left untouched
+    trace = list(trace)
+    positions = [i for i, event in enumerate(trace) if not isinstance(event, tuple)]
+    kind = rng.choice(('remove', 'swap', 'insert'))
+    if kind == 'remove' and positions:
+        del trace[rng.choice(positions)]
+    elif kind == 'swap' and len(positions) > 1:
+        i = rng.randrange(len(positions) - 1)
+        a, b = positions[i], positions[i + 1]
+        trace[a], trace[b] = trace[b], trace[a]
+    else:
+        trace.insert(rng.randint(0, len(trace)), rng.choice(activities))
+    return trace
+
+
+def generate_logs(n_parties=2, n_cases=100, n_activities=8, n_variants=10, loop_depth=1, concurrency=0.3,
+                  noise=0.0, seed=0, redo=0.0) -> list:
+    """
+    Generates the logs of n_parties parties
+
+    Every party has n_activities activities arranged in a random block-structured model; n_variants executions of
+    the model are drawn for every party and every case picks one of them. Party i sends a message to party i + 1
+    in every case
+
+    Parameters
+    -----------
+    n_parties
+        Number of parties
+    n_cases
+        Number of cases, shared by all the parties
+    n_activities
+        Number of activities of every party, besides the ones sending and receiving messages
+    n_variants
+        Number of distinct executions of every party before the noise
+    loop_depth
+        Number of nested loops of every model
+    redo
+        Probability that a loop has a redo block, executed between two iterations of its body
+    concurrency
+        Probability that a block of activities is concurrent instead of a choice
+    noise
+        Fraction of the traces with an event removed, swapped or inserted
+    seed
+        Seed of the random generator
+
+    Returns
+    -----------
+    logs
+        For every party, the list of (case id, events) with every event a dict of attributes
+    """
+    rng = random.Random(seed)
+    variants = []
+    for party in range(n_parties):
+        name = party_name(party)
+        activities = ['%s activity %d' % (name, a) for a in range(n_activities)]
+        model = random_model(activities, rng, loop_depth, concurrency, redo)
+        party_variants = []
+        for _ in range(n_variants):
+            trace = play_out(model, rng)
+            # the message to the next party is received and sent at random positions of the sequence
+            if party > 0:
+                trace.insert(rng.randint(0, len(trace)), ('receive', party - 1))
+            if party < n_parties - 1:
+                trace.insert(rng.randint(0, len(trace)), ('send', party))
+            party_variants.append(trace)
+        variants.append((name, activities, party_variants))
+
+    logs = [[] for _ in range(n_parties)]
+    for case in range(n_cases):
+        case_start = START_TIME + timedelta(minutes=case)
+        send_times = {}
+        for party, (name, activities, party_variants) in enumerate(variants):
+            trace = rng.choice(party_variants)
+            if noise and rng.random() < noise:
+                trace = add_noise(trace, activities, rng)
+            clock = case_start
+            events = []
+            for step in trace:
+                clock += timedelta(seconds=rng.randint(1, 30))
+                if isinstance(step, tuple):
+                    message_type, sender = step
+                    flow = 'm%d' % sender
+                    if message_type == RECEIVE:
+                        # a message is received after being sent
+                        clock = max(clock, send_times[sender] + timedelta(seconds=1))
+                    else:
+                        send_times[sender] = clock
+                    events.append({ACTIVITY_KEY: '%s %s %s' % (name, message_type, flow), TIMESTAMP_KEY: clock,
+                                   MSG_INSTANCE_ID_KEY: '%s_%d' % (flow, case), MSG_TYPE_KEY: message_type,
+                                   MSG_FLOW_KEY: flow})
+                else:
+                    events.append({ACTIVITY_KEY: step, TIMESTAMP_KEY: clock})
+            logs[party].append(('case_%d' % case, events))
+    return logs
+
+
+def write_xes(traces: list, file_path: str, name: str):
+    """
+    Writes the traces returned by generate_logs for a party as a XES file
+    """
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+        f.write('<log xes.version="1.0" xes.features="nested-attributes">\n')
+        f.write('\t<extension name="Time" prefix="time" uri="http://www.xes-standard.org/time.xesext"/>\n')
+        f.write('\t<extension name="Concept" prefix="concept" uri="http://www.xes-standard.org/concept.xesext"/>\n')
+        f.write('\t<string key="concept:name" value=%s/>\n' % quoteattr('Log for ' + name))
+        for case_id, events in traces:
+            f.write('\t<trace>\n\t\t<string key="concept:name" value=%s/>\n' % quoteattr(case_id))
+            for event in events:
+                f.write('\t\t<event>\n')
+                for key, value in event.items():
+                    if isinstance(value, datetime):
+                        f.write('\t\t\t<date key=%s value=%s/>\n' % (quoteattr(key), quoteattr(value.isoformat())))
+                    else:
+                        f.write('\t\t\t<string key=%s value=%s/>\n' % (quoteattr(key), quoteattr(value)))
+                f.write('\t\t</event>\n')
+            f.write('\t</trace>\n')
+        f.write('</log>\n')
+
+
+def generate_xes(output_dir: str, **kwargs) -> list[str]:
+    """
+    Generates the logs (see generate_logs for the arguments) and writes them as <output_dir>/<party name>.xes
+
+    Returns
+    -----------
+    list
+        Paths of the written files, one per party
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for party, traces in enumerate(generate_logs(**kwargs)):
+        path = os.path.join(output_dir, party_name(party) + '.xes')
+        write_xes(traces, path, party_name(party))
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates synthetic multi-party logs')
+    parser.add_argument('output_dir')
+    parser.add_argument('--parties', type=int, default=2)
+    parser.add_argument('--cases', type=int, default=100)
+    parser.add_argument('--activities', type=int, default=8)
+    parser.add_argument('--variants', type=int, default=10)
+    parser.add_argument('--loop-depth', type=int, default=1)
+    parser.add_argument('--redo', type=float, default=0.0)
+    parser.add_argument('--concurrency', type=float, default=0.3)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for path in generate_xes(args.output_dir, n_parties=args.parties, n_cases=args.cases,
+                             n_activities=args.activities, n_variants=args.variants, loop_depth=args.loop_depth,
+                             concurrency=args.concurrency, noise=args.noise, seed=args.seed, redo=args.redo):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from collections import Counter
+
+from sparse_dfg import SparseDfg
+
+
+class LogStatistics(object):
+    """
+    DFG, activity counts, start and end activities of a log, accumulated one trace at a time so that all of them
+    are obtained with a single pass over the events
+    """
+    __slots__ = ('dfg', 'activities', 'start_activities', 'end_activities')
+
+    def __init__(self):
+        self.dfg = Counter()
+        self.activities = Counter()
+        self.start_activities = Counter()
+        self.end_activities = Counter()
+
+    def add_trace(self, trace, count=1):
+        """
+        Parameters
+        -----------
+        trace
+            Sequence of activities (names or ids)
+        count
+            Number of occurrences of the trace
+        """
+        previous = None
+        for activity in trace:
+            self.activities[activity] += count
+            if previous is not None:
+                self.dfg[(previous, activity)] += count
+            else:
+                self.start_activities[activity] += count
+            previous = activity
+        if previous is not None:
+            self.end_activities[previous] += count
+
+    def translate(self, names):
+        """
+        Returns the same statistics with the activity ids replaced by names[id]
+        """
+        translated = LogStatistics()
+        translated.dfg = Counter({(names[a], names[b]): v for (a, b), v in self.dfg.items()})
+        translated.activities = Counter({names[a]: v for a, v in self.activities.items()})
+        translated.start_activities = Counter({names[a]: v for a, v in self.start_activities.items()})
+        translated.end_activities = Counter({names[a]: v for a, v in self.end_activities.items()})
+        return translated
+
+    def as_tuple(self):
+        """
+        Returns
+        -----------
+        tuple
+            dfg (SparseDfg), activities dict, start activities list, end activities list
+        """
+        return SparseDfg(self.dfg), dict(self.activities), list(self.start_activities), list(self.end_activities)
+
+
+def get_event_log_statistics(log, activity_key: str) -> LogStatistics:
+    statistics = LogStatistics()
+    for trace in log:
+        statistics.add_trace([event[activity_key] for event in trace])
+    return statistics
+
+
+def log_variants(log, activity_key: str) -> list[tuple[tuple, int]]:
+    """
+    Variants (sequence of activity names, number of traces) of an EventLog or a CompactLog
+    """
+    from compact_log import CompactLog
+    if isinstance(log, CompactLog):
+        names = log.activity_index.names
+        return [(tuple(names[a] for a in variant), count) for variant, count in log.variants()]
+    return list(Counter(tuple(event[activity_key] for event in trace) for trace in log).items())
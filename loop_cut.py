@@ -0,0 +1,117 @@
+class UnionFind(object):
+    """
+    Disjoint sets of activities, merged by union
+    """
+
+    def __init__(self, elements=()):
+        self.parent = {}
+        for element in elements:
+            self.add(element)
+
+    def add(self, element):
+        self.parent.setdefault(element, element)
+
+    def find(self, element):
+        parent = self.parent
+        while parent[element] != element:
+            # path halving
+            parent[element] = parent[parent[element]]
+            element = parent[element]
+        return element
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self) -> list[set]:
+        """
+        The disjoint sets, in the order of the first element added to each of them
+        """
+        groups = {}
+        for element in self.parent:
+            groups.setdefault(self.find(element), set()).add(element)
+        return list(groups.values())
+
+
+def connected_components(dfg, activities) -> list[set]:
+    """
+    Same as detection_utils.get_connected_components: the weakly connected components of the dfg, plus a singleton
+    for every activity without edges
+    """
+    components = UnionFind(activities)
+    for (a, b), _ in dfg:
+        components.add(a)
+        components.add(b)
+        components.union(a, b)
+    return components.groups()
+
+
+def detect_loop_cut(dfg, activities, start_activities, end_activities, node_start_activities, node_end_activities):
+    """
+    Loop cut of the inductive miner, on the adjacency of the dfg
+
+    Parameters
+    -----------
+    dfg
+        SparseDfg of the (sub)log
+    activities
+        Activities of the (sub)log
+    start_activities
+        Start activities of the log, with the sender activities of the party
+    end_activities
+        End activities of the log
+    node_start_activities
+        Start activities given to the subtree by its parent
+    node_end_activities
+        End activities given to the subtree by its parent
+
+    Returns
+    -----------
+    list
+        [True, partition] with the do part (start and end activities and everything attached to them) first and the
+        redo parts after it, or [False, []] if there is no loop cut
+    """
+    # do part: the start and end activities, in order of appearance
+    do_part = list(dict.fromkeys(list(start_activities) + list(end_activities)))
+    in_do_part = set(do_part)
+
+    # the redo parts are the components of the dfg without the do part
+    redo_dfg = dfg.without_activities(in_do_part)
+    components = connected_components(redo_dfg, [a for a in activities if a not in in_do_part])
+
+    start_set = set(start_activities)
+    end_set = set(end_activities)
+    only_end = end_set - start_set
+    only_start = start_set - end_set
+    node_start = set(node_start_activities)
+    node_end = set(node_end_activities)
+
+    def partially_connected(neighbours, activities_set):
+        # connected to some, but not all, the activities
+        connected = len(activities_set.intersection(neighbours))
+        return 0 < connected < len(activities_set)
+
+    def joins_do_part(component):
+        for act in component:
+            outgoing = dfg.outgoing.get(act, {})
+            ingoing = dfg.ingoing.get(act, {})
+            # a redo part can neither lead to an end activity nor be reached from a start activity
+            if not only_end.isdisjoint(outgoing) or not only_start.isdisjoint(ingoing):
+                return True
+            # it has to be reached from all the end activities and to lead to all the start activities, or none
+            if partially_connected(ingoing, node_end) or partially_connected(outgoing, node_start):
+                return True
+        return False
+
+    redo_parts = []
+    for component in components:
+        if joins_do_part(component):
+            do_part.extend(act for act in component if act not in in_do_part)
+            in_do_part.update(component)
+        else:
+            redo_parts.append(component)
+
+    if redo_parts:
+        return [True, [do_part] + redo_parts]
+    return [False, []]
@@ -0,0 +1,114 @@
+from collections import Counter
+
+from compact_log import CompactLog
+
+MSG_INSTANCE_ID_KEY = 'msgInstanceId'
+MSG_TYPE_KEY = 'msgType'
+MSG_FLOW_KEY = 'msgFlow'
+SEND = 'send'
+RECEIVE = 'receive'
+# message types by their code in the columnar logs (log_cache.ColumnarLog)
+MESSAGE_TYPES = (None, SEND, RECEIVE)
+
+
+def _iter_message_events(party_log, activity_key: str):
+    # yields (activity, message instance id, message type) of the events exchanging a message
+    if isinstance(party_log, CompactLog):
+        # compact logs only keep the activities
+        return
+    if hasattr(party_log, 'msg_instances'):
+        # columnar log: the message attributes are already columns of ids
+        names = party_log.activity_names
+        instance_ids = party_log.msg_instance_ids
+        for activity, instance, message_type in zip(party_log.activities.tolist(), party_log.msg_instances.tolist(),
+                                                    party_log.msg_types.tolist()):
+            if instance >= 0:
+                yield names[activity], instance_ids[instance], MESSAGE_TYPES[message_type]
+        return
+    if hasattr(party_log, 'columns'):
+        # dataframe: the join does not depend on the order of the events, the columns are enough
+        if MSG_INSTANCE_ID_KEY not in party_log.columns:
+            return
+        rows = party_log[[activity_key, MSG_INSTANCE_ID_KEY, MSG_TYPE_KEY]].dropna(subset=[MSG_INSTANCE_ID_KEY])
+        yield from rows.itertuples(index=False, name=None)
+        return
+    for trace in party_log:
+        for event in trace:
+            instance_id = event.get(MSG_INSTANCE_ID_KEY)
+            if instance_id is not None:
+                yield event[activity_key], instance_id, event.get(MSG_TYPE_KEY)
+
+
+class MessageIndex(object):
+    """
+    Hash join of the send and receive events of all the parties on their message instance id
+
+    Every message instance is sent once and received once: as soon as both sides have been seen the pair is
+    counted and dropped, so only the messages still waiting for their counterpart are kept in memory
+    """
+
+    def __init__(self):
+        self.pending_sends = {}
+        self.pending_receives = {}
+        # ((sender party, sender activity), (receiver party, receiver activity)) -> number of messages
+        self.edges = Counter()
+
+    def add(self, party, activity, instance_id, message_type):
+        if message_type == SEND:
+            receiver = self.pending_receives.pop(instance_id, None)
+            if receiver is None:
+                self.pending_sends[instance_id] = (party, activity)
+            else:
+                self._match((party, activity), receiver)
+        elif message_type == RECEIVE:
+            sender = self.pending_sends.pop(instance_id, None)
+            if sender is None:
+                self.pending_receives[instance_id] = (party, activity)
+            else:
+                self._match(sender, (party, activity))
+
+    def _match(self, sender, receiver):
+        # a message exchanged inside the same party is already in its DFG
+        if sender[0] != receiver[0]:
+            self.edges[(sender, receiver)] += 1
+
+    def sender_nodes(self) -> dict:
+        """
+        Returns, for every receiving party, the weighted edges (sender activity, receiver activity)
+        """
+        sender_nodes = {}
+        for (sender, receiver), count in sorted(self.edges.items()):
+            sender_nodes.setdefault(receiver[0], []).append(((sender[1], receiver[1]), count))
+        return sender_nodes
+
+    def receiver_nodes(self) -> dict:
+        """
+        Returns, for every sending party, the weighted edges (sender activity, receiver activity)
+        """
+        receiver_nodes = {}
+        for (sender, receiver), count in sorted(self.edges.items()):
+            receiver_nodes.setdefault(sender[0], []).append(((sender[1], receiver[1]), count))
+        return receiver_nodes
+
+
+def build_message_index(logs, activity_key: str = 'concept:name') -> MessageIndex:
+    """
+    Builds the message index in a single pass over the events of all the party logs
+
+    Parameters
+    -----------
+    logs
+        One log per party (EventLog, ColumnarLog or dataframe), the party being identified by its position
+    activity_key
+        Activity attribute
+
+    Returns
+    -----------
+    index
+        Message index
+    """
+    index = MessageIndex()
+    for party, party_log in enumerate(logs):
+        for activity, instance_id, message_type in _iter_message_events(party_log, activity_key):
+            index.add(party, activity, instance_id, message_type)
+    return index
@@ -0,0 +1,214 @@
+"""
+Canonical serialization, content hash and diff of the discovered models
+
+A model is serialized as a version line, the tree on one line and a line per message edge (sender activity, receiver
+activity), e.g.
+
+    pt1
+    ->("a",X("b",tau),receive_message("send x","receive x"))
+    "send x" "receive x"
+
+The tree is normalized first (see ArrayTree.normalize), and the children of the commutative operators (choice,
+parallel, or, interleaving, and the senders of a receive message node) are written in the order of their own
+serialization: trees differing only in the order of such children have the same serialization and hash. The labels
+are JSON strings, silent leaves are tau
+"""
+import json
+from collections import Counter
+from hashlib import blake2b
+
+import array_tree
+from array_tree import ArrayTree, LEAF, OPERATORS, TAU
+
+VERSION = 'pt1'
+COMMUTATIVE_OPERATORS = (array_tree.XOR, array_tree.PARALLEL, array_tree.OR, array_tree.INTERLEAVING)
+SILENT_LABEL = 'tau'
+
+
+def _canonical_texts(tree: ArrayTree) -> list[str]:
+    # serialization of every node, in the post order of the array tree
+    texts = [None] * len(tree)
+    for node in range(len(tree)):
+        operator = tree.operators[node]
+        if operator == LEAF:
+            label = tree.labels[node]
+            texts[node] = json.dumps(tree.label_names[label], ensure_ascii=False) if label != TAU else SILENT_LABEL
+            continue
+        children = [texts[child] for child in tree.node_children(node)]
+        if operator in COMMUTATIVE_OPERATORS:
+            children.sort()
+        elif operator == array_tree.RECEIVE_MESSAGE:
+            # the receiving activity is the last child
+            children = sorted(children[:-1]) + children[-1:]
+        texts[node] = '%s(%s)' % (OPERATORS[operator], ','.join(children))
+    return texts
+
+
+def tree_message_edges(tree: ArrayTree) -> set:
+    """
+    Edges (sender activity, receiver activity) of the receive message nodes of a tree
+    """
+    edges = set()
+    for node in range(len(tree)):
+        if tree.operators[node] == array_tree.RECEIVE_MESSAGE:
+            labels = [tree.label_names[tree.labels[child]] if tree.labels[child] != TAU else None
+                      for child in tree.node_children(node)]
+            if labels[-1] is not None:
+                edges.update((sender, labels[-1]) for sender in labels[:-1] if sender is not None)
+    return edges
+
+
+def serialize_model(tree, sender_nodes=None) -> str:
+    """
+    Canonical serialization of a model
+
+    Parameters
+    -----------
+    tree
+        ProcessTree, ArrayTree or nested tuple (see subtree_cache.tree_to_tuple)
+    sender_nodes
+        Messages received by the party, ((sender activity, receiver activity), number of messages), whose edges are
+        added to the ones of the receive message nodes; the numbers of messages are not part of the model
+
+    Returns
+    -----------
+    text
+        Serialization, see the module documentation
+    """
+    if isinstance(tree, tuple):
+        tree = ArrayTree.from_tuple(tree)
+    elif not isinstance(tree, ArrayTree):
+        tree = ArrayTree.from_process_tree(tree)
+    tree = tree.normalize()
+    edges = tree_message_edges(tree)
+    edges.update(edge for edge, _ in (sender_nodes or []))
+    lines = [VERSION, _canonical_texts(tree)[tree.root]]
+    lines.extend('%s %s' % (json.dumps(sender, ensure_ascii=False), json.dumps(receiver, ensure_ascii=False))
+                 for sender, receiver in sorted(edges))
+    return '\n'.join(lines) + '\n'
+
+
+def model_hash(tree=None, sender_nodes=None, serialization=None) -> str:
+    """
+    Content hash (hex digest) of a model, given as a tree or by its serialization
+    """
+    if serialization is None:
+        serialization = serialize_model(tree, sender_nodes)
+    return blake2b(serialization.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def parse_model(text: str):
+    """
+    Parses a serialization written by serialize_model
+
+    Returns
+    -----------
+    tuple
+        Nested tuple of the tree (see subtree_cache.tree_to_tuple) and sorted list of the message edges
+    """
+    lines = text.splitlines()
+    if not lines or lines[0] != VERSION:
+        raise ValueError("not a serialized model (expected version %s)" % VERSION)
+    decoder = json.JSONDecoder()
+    tree = _parse_tree(lines[1], decoder)
+    edges = []
+    for line in lines[2:]:
+        sender, end = decoder.raw_decode(line)
+        receiver, _ = decoder.raw_decode(line, end + 1)
+        edges.append((sender, receiver))
+    return tree, edges
+
+
+def _parse_tree(text, decoder):
+    # every frame is the operator being parsed and its children parsed so far
+    stack = [(None, [])]
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char == '"':
+            label, position = decoder.raw_decode(text, position)
+            stack[-1][1].append((None, label, ()))
+        elif text.startswith(SILENT_LABEL, position) and not text.startswith(SILENT_LABEL + '(', position):
+            stack[-1][1].append((None, None, ()))
+            position += len(SILENT_LABEL)
+        elif char == ',':
+            position += 1
+        elif char == ')':
+            operator, children = stack.pop()
+            stack[-1][1].append((operator, None, tuple(children)))
+            position += 1
+        else:
+            opening = text.index('(', position)
+            operator = text[position:opening]
+            if operator not in OPERATORS:
+                raise ValueError("unknown operator %r at %d" % (operator, position))
+            stack.append((operator, []))
+            position = opening + 1
+    if len(stack) != 1 or len(stack[0][1]) != 1:
+        raise ValueError("unbalanced tree serialization")
+    return stack[0][1][0]
+
+
+def diff_models(old: str, new: str) -> dict:
+    """
+    Differences between two serialized models
+
+    The trees are compared top down: the children of two nodes with the same operator are paired (by position for
+    the ordered operators, by equality first for the commutative ones) until the subtrees differing as a whole
+    are found
+
+    Returns
+    -----------
+    dict
+        equal, the activities and the message edges added and removed, and changes: the list of (path, old subtree,
+        new subtree) with the serializations of the differing subtrees, path being the positions of the children
+        from the root in the old model
+    """
+    old_tree, old_edges = parse_model(old)
+    new_tree, new_edges = parse_model(new)
+    old_array, new_array = ArrayTree.from_tuple(old_tree), ArrayTree.from_tuple(new_tree)
+    old_texts, new_texts = _canonical_texts(old_array), _canonical_texts(new_array)
+    changes = []
+    stack = [((), old_array.root, new_array.root)]
+    while stack:
+        path, old_node, new_node = stack.pop()
+        if old_texts[old_node] == new_texts[new_node]:
+            continue
+        operator = old_array.operators[old_node]
+        old_children = list(old_array.node_children(old_node))
+        new_children = list(new_array.node_children(new_node))
+        if operator == LEAF or operator != new_array.operators[new_node]:
+            changes.append((path, old_texts[old_node], new_texts[new_node]))
+        elif operator in COMMUTATIVE_OPERATORS or operator == array_tree.RECEIVE_MESSAGE:
+            # the children equal on both sides are paired first
+            available = Counter(new_texts[child] for child in new_children)
+            old_left = []
+            for i, child in enumerate(old_children):
+                if available[old_texts[child]] > 0:
+                    available[old_texts[child]] -= 1
+                else:
+                    old_left.append((i, child))
+            new_left = []
+            for child in new_children:
+                if available[new_texts[child]] > 0:
+                    available[new_texts[child]] -= 1
+                    new_left.append(child)
+            if len(old_left) == 1 and len(new_left) == 1:
+                stack.append((path + (old_left[0][0],), old_left[0][1], new_left[0]))
+            else:
+                changes.append((path, old_texts[old_node], new_texts[new_node]))
+        elif len(old_children) == len(new_children):
+            stack.extend((path + (i,), old_child, new_child)
+                         for i, (old_child, new_child) in enumerate(zip(old_children, new_children)))
+        else:
+            changes.append((path, old_texts[old_node], new_texts[new_node]))
+    old_activities = {label for label in old_array.label_names}
+    new_activities = {label for label in new_array.label_names}
+    return {
+        'equal': old == new,
+        'activities_added': sorted(new_activities - old_activities),
+        'activities_removed': sorted(old_activities - new_activities),
+        'edges_added': sorted(set(new_edges) - set(old_edges)),
+        'edges_removed': sorted(set(old_edges) - set(new_edges)),
+        'changes': sorted(changes),
+    }
@@ -3,29 +3,188 @@ from copy import copy
 
 import pm4py
 from pm4py import util as pmutil
-from pm4py.algo.discovery.dfg.utils.dfg_utils import get_activities_from_dfg, \
-    infer_start_activities, infer_end_activities
-from pm4py.algo.discovery.dfg.utils.dfg_utils import get_ingoing_edges, get_outgoing_edges
-from pm4py.algo.discovery.dfg.utils.dfg_utils import negate, get_activities_self_loop
-from pm4py.algo.discovery.dfg.variants import native as dfg_inst
-from pm4py.algo.discovery.inductive.util import detection_utils
+from pm4py.algo.discovery.dfg.utils.dfg_utils import get_activities_from_dfg
 from pm4py.algo.discovery.inductive.variants.im.util import base_case
 from pm4py.algo.discovery.inductive.variants.im.util import fall_through
 from pm4py.algo.discovery.inductive.variants.im.util import splitting as split
 from pm4py.algo.discovery.inductive.variants.im_f import splitting_infrequent, fall_through_infrequent
 from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
-from pm4py.algo.filtering.dfg.dfg_filtering import clean_dfg_based_on_noise_thresh
-from pm4py.statistics.attributes.log import get as attributes_get
 from pm4py.statistics.end_activities.log import get as end_activities_get
 from pm4py.statistics.start_activities.log import get as start_activities_get
 from pm4py.util import exec_utils
 from pm4py.algo.discovery.inductive.variants.im_f.data_structures.subtree_infrequent import SubtreeInfrequent
+from compact_log import CompactLog
+from sparse_dfg import SparseDfg
+from log_statistics import get_event_log_statistics
+from subtree_cache import CachedSubtree
+from parallel_discovery import RemoteSubtree
+from MyParameters import MyParameters
+from discovery_engine import DiscoveryEngine
+from discovery_context import DiscoveryContext
+from loop_cut import detect_loop_cut
+
+# splitting functions of pm4py for EventLog, CompactLog exposes methods with the same names
+EVENT_LOG_SPLITS = {
+    'split_xor': split.split_xor,
+    'split_sequence': split.split_sequence,
+    'split_parallel': split.split_parallel,
+    'split_loop': split.split_loop,
+    'split_xor_infrequent': splitting_infrequent.split_xor_infrequent,
+    'split_sequence_infrequent': splitting_infrequent.split_sequence_infrequent,
+    'split_loop_infrequent': splitting_infrequent.split_loop_infrequent,
+}
+
+
+def split_log(split_name, cut, log, activity_key):
+    if isinstance(log, CompactLog):
+        return getattr(log, split_name)(cut)
+    return EVENT_LOG_SPLITS[split_name](cut, log, activity_key)
+
+
+def get_log_statistics(log, activity_key, parameters=None):
+    """
+    Computes the DFG, the activities, the start and the end activities of a (sub)log in a single pass
+
+    Returns
+    -----------
+    tuple
+        dfg (SparseDfg), activities dict, start activities list, end activities list
+    """
+    if isinstance(log, CompactLog):
+        return log.statistics().as_tuple()
+    return get_event_log_statistics(log, activity_key).as_tuple()
+
+
+def split_log_with_statistics(split_name, cut, log, activity_key, parameters=None):
+    """
+    Splits the log returning, for every sublog, the pair (sublog, statistics as returned by get_log_statistics)
+
+    The sublogs of a CompactLog get their statistics while the split is performed, the ones of an EventLog with
+    one more pass over their events
+    """
+    if isinstance(log, CompactLog):
+        return [(l, statistics.as_tuple()) for l, statistics in log.split_with_statistics(split_name, cut)]
+    return [(l, get_log_statistics(l, activity_key, parameters)) for l in split_log(split_name, cut, log, activity_key)]
+
+
+def as_tuple(statistics):
+    # LogStatistics in the form taken by add_child, None (computed by add_child) if not available
+    return statistics.as_tuple() if statistics is not None else None
+
+
+def get_single_activity(log, activity_key):
+    # label of a log found as single_activity base case
+    if isinstance(log, CompactLog):
+        return log.single_activity()
+    return log[0][0][activity_key]
+
+
+def contains_empty_traces(log):
+    if isinstance(log, CompactLog):
+        return log.contains_empty_trace()
+    return any(len(trace) == 0 for trace in log)
+
+
+def concurrent_activity_logs(log, activities, activity, activity_key):
+    """
+    Logs returned by the activity concurrent fall through of pm4py once activity is found: the log without the
+    activity, and the log of its occurrences (with, as in pm4py, one more empty trace for every trace without it)
+    """
+    from pm4py.objects.log import obj
+    new_log = fall_through.filter_activity_use_idx(log, activity, activity_key,
+                                                   fall_through.index_containing(log, activities, activity_key))
+    small_log = obj.EventLog()
+    empty_trace = obj.Trace()
+    for trace in log:
+        small_trace = obj.Trace()
+        for event in trace:
+            if event[activity_key] == activity:
+                small_trace.append(event)
+        small_log.append(small_trace)
+        if not len(small_trace):
+            small_log.append(empty_trace)
+    return new_log, small_log
+
+
+def _context_attribute(name):
+    # read-only attribute of the node taken from its DiscoveryContext, for the code of pm4py reading it
+    return property(lambda self: getattr(self.context, name), doc="See DiscoveryContext.%s" % name)
+
+
+def _dfg_view(name, compute, source=None):
+    """
+    Attribute computed on first access from the dfg the node was initialized with (or from the view source), and
+    cached until the node is initialized again: as the attributes set by initialize_tree in pm4py, it is not updated
+    when the dfg is filtered
+    """
+
+    def get(self):
+        views = self._views
+        if name not in views:
+            views[name] = compute(getattr(self, source) if source is not None else self._views_dfg)
+        return views[name]
+
+    def set(self, value):
+        self._views[name] = value
+
+    return property(get, set, doc="View %s of the dfg, computed on first access" % name)
 
 
 class MySubtreeInfrequent(SubtreeInfrequent):
+    """
+    Subtree of the discovery: the state of its own sublog is kept in slots, the state of the whole log is in the
+    DiscoveryContext shared by all the subtrees
+    """
+    __slots__ = ('context', 'log', '_dfg', '_views_dfg', '_views', 'activities', 'start_activities', 'end_activities',
+                 'rec_depth', 'second_iteration', 'detected_cut', 'children', 'must_insert_skip', 'cache_key',
+                 'sweep_key', 'threshold_dependent', 'activities_direction', 'activities_dir_list', 'inverted_dfg')
+
+    sender_nodes = _context_attribute('sender_nodes')
+    initial_log = _context_attribute('initial_log')
+    master_dfg = _context_attribute('master_dfg')
+    initial_dfg = _context_attribute('initial_dfg')
+    initial_outgoing = _context_attribute('initial_outgoing')
+    initial_ingoing = _context_attribute('initial_ingoing')
+    counts = _context_attribute('counts')
+    f = _context_attribute('f')
+    noise_threshold = _context_attribute('noise_threshold')
+    initial_start_activities = _context_attribute('initial_start_activities')
+    initial_end_activities = _context_attribute('initial_end_activities')
+    parameters = _context_attribute('parameters')
+    engine = _context_attribute('engine')
+    profiler = _context_attribute('profiler')
+    receive_predecessors = _context_attribute('receive_predecessors')
+
+    # views of the dfg used by the cut detection, computed on first access: the base cases never need them
+    outgoing = _dfg_view('outgoing', lambda dfg: dfg.outgoing)
+    ingoing = _dfg_view('ingoing', lambda dfg: dfg.ingoing)
+    self_loop_activities = _dfg_view('self_loop_activities', lambda dfg: dfg.self_loop_activities())
+    negated_dfg = _dfg_view('negated_dfg', lambda dfg: dfg.negate())
+    negated_activities = _dfg_view('negated_activities', lambda dfg: sorted(dfg.activities()), 'negated_dfg')
+    negated_outgoing = _dfg_view('negated_outgoing', lambda dfg: dfg.outgoing, 'negated_dfg')
+    negated_ingoing = _dfg_view('negated_ingoing', lambda dfg: dfg.ingoing, 'negated_dfg')
+
+    @property
+    def dfg(self):
+        return self._dfg
+
+    @dfg.setter
+    def dfg(self, dfg):
+        # the lists assigned by the code of pm4py (check_for_cut on the copies made by the activity concurrent fall
+        # through) are indexed; the views are kept, see _dfg_view
+        if dfg is not None and not isinstance(dfg, SparseDfg):
+            dfg = SparseDfg(dfg)
+        self._dfg = dfg
+
+    def reset_dfg_views(self):
+        # the views are computed again, from the current dfg, on their next access
+        self._views_dfg = self._dfg
+        self._views = {}
+
     def __init__(self, sender_nodes, log, initial_log, dfg, master_dfg, initial_dfg, activities, counts, rec_depth, f=0, noise_threshold=0,
                  start_activities=None, end_activities=None, initial_start_activities=None,
-                 initial_end_activities=None, parameters=None, real_init=True):
+                 initial_end_activities=None, parameters=None, real_init=True, engine=None,
+                 receive_predecessors=None, context=None):
         """
         Constructor
 
@@ -43,95 +202,55 @@ class MySubtreeInfrequent(SubtreeInfrequent):
             Shared variable
         rec_depth
             Current recursion depth
+        engine
+            DiscoveryEngine in which the subtree is queued instead of being expanded right away
+        receive_predecessors
+            Index of the sender activities of the whole log (see get_receive_predecessors), built if not given
+        context
+            DiscoveryContext of the parent; if given, the arguments describing the whole log are ignored
         """
+        self.cache_key = None
+        self.sweep_key = None
+        # set once the noise threshold is used, see SweepCache
+        self.threshold_dependent = False
+        self.context = context
         if real_init:
-            self.master_dfg = copy(master_dfg)
-            self.initial_dfg = copy(initial_dfg)
-            self.counts = counts
+            if context is None:
+                # root of the tree
+                self.context = DiscoveryContext(sender_nodes, initial_log, master_dfg, initial_dfg, counts, f,
+                                                noise_threshold, initial_start_activities, initial_end_activities,
+                                                parameters, engine, receive_predecessors)
             self.rec_depth = rec_depth
-            self.noise_threshold = noise_threshold
             self.start_activities = start_activities
-            self.f = f
             if self.start_activities is None:
                 self.start_activities = []
             self.end_activities = end_activities
             if self.end_activities is None:
                 self.end_activities = []
-            self.initial_start_activities = initial_start_activities
-            if self.initial_start_activities is None:
-                self.initial_start_activities = infer_start_activities(master_dfg)
-            self.initial_end_activities = initial_end_activities
-            if self.initial_end_activities is None:
-                self.initial_end_activities = infer_end_activities(master_dfg)
 
             self.second_iteration = None
             self.activities = None
             self.dfg = None
-            self.outgoing = None
-            self.ingoing = None
-            self.self_loop_activities = None
-            self.initial_ingoing = None
-            self.initial_outgoing = None
+            self.reset_dfg_views()
             self.activities_direction = None
             self.activities_dir_list = None
-            self.negated_dfg = None
-            self.negated_activities = None
-            self.negated_outgoing = None
-            self.negated_ingoing = None
             self.detected_cut = None
             self.children = None
             self.must_insert_skip = False
             self.log = log
-            self.initial_log = initial_log
             self.inverted_dfg = None
-            self.parameters = parameters
-            self.sender_nodes = sender_nodes
 
-            self.initialize_tree(sender_nodes, dfg, log, initial_dfg, activities)
+            self.initialize_tree(self.sender_nodes, dfg, log, self.initial_dfg, activities)
 
     def __deepcopy__(self, memodict={}):
-        """
-            def __init__(self, log, dfg, master_dfg, initial_dfg, activities, counts, rec_depth, noise_threshold=0,
-                 start_activities=None, end_activities=None, initial_start_activities=None,
-                 initial_end_activities=None, parameters=None, real_init=False):
-        :param memodict:
-        :return:
-        """
-        S = SubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False)
-        S.master_dfg = self.master_dfg
-        S.initial_dfg = self.initial_dfg
-        S.counts = self.counts
-        S.rec_depth = self.rec_depth
-        S.noise_threshold = self.noise_threshold
-        S.start_activities = self.start_activities
-        S.end_activities = self.end_activities
-        S.initial_start_activities = self.initial_start_activities
-        S.initial_end_activities = self.initial_end_activities
-        S.second_iteration = self.second_iteration
-        S.activities = self.activities
-        S.dfg = self.dfg
-        S.outgoing = self.outgoing
-        S.ingoing = self.ingoing
-        S.self_loop_activities = self.self_loop_activities
-        S.initial_ingoing = self.initial_ingoing
-        S.initial_outgoing = self.initial_outgoing
-        S.activities_direction = self.activities_direction
-        S.activities_dir_list = self.activities_dir_list
-        S.negated_dfg = self.negated_dfg
-        S.negated_activities = self.negated_activities
-        S.negated_outgoing = self.negated_outgoing
-        S.negated_ingoing = self.negated_ingoing
-        S.detected_cut = self.detected_cut
-        S.children = self.children
-        S.must_insert_skip = self.must_insert_skip
-        S.log = self.log
-        S.initial_log = self.initial_log
-        S.inverted_dfg = self.inverted_dfg
-        S.sender_nodes = self.sender_nodes
-        try:
-            S.parameters = self.parameters
-        except:
-            pass
+        # the subtree is copied, sharing its context and the (never modified) logs and dfgs
+        S = MySubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False,
+                                context=self.context)
+        for name in MySubtreeInfrequent.__slots__:
+            if hasattr(self, name):
+                setattr(S, name, getattr(self, name))
+        if hasattr(self, '_views'):
+            S._views = dict(self._views)
         return S
 
     def initialize_tree(self, sender_nodes, dfg, log, initial_dfg, activities, second_iteration=False, end_call=True):
@@ -143,259 +262,251 @@ class MySubtreeInfrequent(SubtreeInfrequent):
             self.activities = copy(activities)
 
         if second_iteration:
-            self.dfg = clean_dfg_based_on_noise_thresh(self.dfg, self.activities, self.noise_threshold)
+            self.dfg = self.dfg.filter_noise(self.activities, self.noise_threshold)
         else:
-            self.dfg = copy(dfg)
-
-        self.initial_dfg = initial_dfg
+            self.dfg = dfg
+        self.reset_dfg_views()
 
-        self.outgoing = get_outgoing_edges(self.dfg)
-        self.ingoing = get_ingoing_edges(self.dfg)
-        self.self_loop_activities = get_activities_self_loop(self.dfg)
-        self.initial_outgoing = get_outgoing_edges(self.initial_dfg)
-        self.initial_ingoing = get_ingoing_edges(self.initial_dfg)
         # self.activities_direction = get_activities_direction(self.dfg, self.activities)
         # self.activities_dir_list = get_activities_dirlist(self.activities_direction)
-        self.negated_dfg = negate(self.dfg)
-        self.negated_activities = get_activities_from_dfg(self.negated_dfg)
-        self.negated_outgoing = get_outgoing_edges(self.negated_dfg)
-        self.negated_ingoing = get_ingoing_edges(self.negated_dfg)
         self.detected_cut = None
         self.children = []
         self.log = log
-        self.sender_nodes = sender_nodes
 
-        self.detect_cut_if(second_iteration=False, parameters=self.parameters)
+        if not end_call:
+            return
+        if self.engine is not None:
+            self.engine.push(self)
+        else:
+            self.detect_cut_if(second_iteration=False, parameters=self.parameters)
+
+    def filter_dfg_on_threshold(self):
+        # as in pm4py, the cut detection on the filtered dfg keeps the views of the unfiltered one
+        with self.profiler.phase('filter_dfg_on_threshold', self.rec_depth):
+            self.dfg = self.dfg.filter_on_threshold(self.f)
+
+    def check_cut_im_plain(self):
+        with self.profiler.phase('check_cut_im_plain', self.rec_depth):
+            return super().check_cut_im_plain()
 
     def detect_loop(self):
-        # p0 is part of return value, it contains the partition of activities
-        # write all start and end activities in p1
-        if self.contains_empty_trace():
-            return [False, []]
-        start_activities = list(
-            start_activities_get.get_start_activities(self.log, parameters=self.parameters).keys())
+        with self.profiler.phase('detect_loop', self.rec_depth):
+            return self._detect_loop()
 
-        end_activities = list(end_activities_get.get_end_activities(self.log, parameters=self.parameters).keys())
+    def get_start_end_activities(self):
+        """
+        Start activities of the log, with the sender activities of the party, and end activities of the log
+        """
+        if isinstance(self.log, CompactLog):
+            start_activities = list(self.log.start_activities().keys())
+            end_activities = list(self.log.end_activities().keys())
+        else:
+            start_activities = list(
+                start_activities_get.get_start_activities(self.log, parameters=self.parameters).keys())
+            end_activities = list(end_activities_get.get_end_activities(self.log, parameters=self.parameters).keys())
         for x in self.sender_nodes:
             start_activities.append(x[0][0])
-        # TODO check if sta
-        p1 = []
-        for act in start_activities:
-            if act not in p1:
-                p1.append(act)
-        for act in end_activities:
-            if act not in p1:
-                p1.append(act)
-
-        # create new dfg without the transitions to start and end activities
-        new_dfg = copy(self.dfg)
-        copy_dfg = copy(new_dfg)
-        for ele in copy_dfg:
-            if ele[0][0] in p1 or ele[0][1] in p1:
-                new_dfg.remove(ele)
-        # get connected components of this new dfg
-        new_ingoing = get_ingoing_edges(new_dfg)
-        new_outgoing = get_outgoing_edges(new_dfg)
-        # it was a pain in the *** to get a working directory of the current_activities, as we can't iterate ove the dfg
-        current_activities = {}
-        for element in self.activities:
-            if element not in p1:
-                current_activities.update({element: 1})
-        p0 = detection_utils.get_connected_components(new_ingoing, new_outgoing, current_activities)
-        p0.insert(0, p1)
-
-        iterable_dfg = []
-        for i in range(0, len(self.dfg)):
-            iterable_dfg.append(self.dfg[i][0])
-        # p0 is like P1,P2,...,Pn in line 3 on page 190 of the IM Thesis
-        # check for subsets in p0 that have connections to and end or from a start activity
-        p0_copy = []
-        for int_el in p0:
-            p0_copy.append(int_el)
-        for element in p0_copy:  # for every set in p0
-            removed = False
-            if element in p0 and element != p0[0]:
-                for act in element:  # for every activity in this set
-                    for e in end_activities:  # for every end activity
-                        if e not in start_activities:
-                            if (act, e) in iterable_dfg:  # check if connected
-                                # is there an element in dfg pointing from any act in a subset of p0 to an end activity
-                                for activ in element:
-                                    if activ not in p0[0]:
-                                        p0[0].append(activ)
-                                if element in p0:
-                                    p0.remove(element)  # remove subsets that are connected to an end activity
-                                removed = True
-                                break
-                    if removed:
-                        break
-                    for s in start_activities:
-                        if s not in end_activities:
-                            if not removed:
-                                if (s, act) in iterable_dfg:
-                                    for acti in element:
-                                        if acti not in p0[0]:
-                                            p0[0].append(acti)
-                                    if element in p0:
-                                        p0.remove(element)  # remove subsets that are connected to an end activity
-                                    removed = True
-                                    break
-                            else:
-                                break
-                    if removed:
-                        break
-
-        iterable_dfg = []
-        for i in range(0, len(self.dfg)):
-            iterable_dfg.append(self.dfg[i][0])
-
-        p0_copy = []
-        for int_el in p0:
-            p0_copy.append(int_el)
-        for element in p0_copy:
-            if element in p0 and element != p0[0]:
-                for act in element:
-                    for e in self.end_activities:
-                        if (e, act) in iterable_dfg:  # get those act, that are connected from an end activity
-                            for e2 in self.end_activities:  # check, if the act is connected from all end activities
-                                if (e2, act) not in iterable_dfg:
-                                    for acti in element:
-                                        if acti not in p0[0]:
-                                            p0[0].append(acti)
-                                    if element in p0:
-                                        p0.remove(element)  # remove subsets that are connected to an end activity
-                                    break
-                    for s in self.start_activities:
-                        if (act, s) in iterable_dfg:  # same as above (in this case for activities connected to
-                            # a start activity)
-                            for s2 in self.start_activities:
-                                if (act, s2) not in iterable_dfg:
-                                    for acti in element:
-                                        if acti not in p0[0]:
-                                            p0[0].append(acti)
-                                    if element in p0:
-                                        p0.remove(element)  # remove subsets that are connected to an end activity
-                                    break
-
-        if len(p0) > 1:
-            return [True, p0]
-        else:
+        return start_activities, end_activities
+
+    def _detect_loop(self):
+        if self.contains_empty_trace():
             return [False, []]
+        start_activities, end_activities = self.get_start_end_activities()
+        return detect_loop_cut(self.dfg, self.activities, start_activities, end_activities, self.start_activities,
+                               self.end_activities)
+
+    def contains_empty_trace(self):
+        return contains_empty_traces(self.log)
+
+    def add_child(self, log, parameters, statistics=None, with_start_end_activities=True):
+        """
+        Appends the subtree discovered on a sublog to the children
+
+        Parameters
+        -----------
+        log
+            Sublog (EventLog or CompactLog)
+        parameters
+            Parameters of the algorithm
+        statistics
+            Statistics of the sublog as returned by get_log_statistics, computed if not given
+        with_start_end_activities
+            Whether the start and end activities of the sublog are passed to the child
+        """
+        activity_key = self.context.activity_key
+        if statistics is None:
+            with self.profiler.phase('dfg', self.rec_depth):
+                statistics = get_log_statistics(log, activity_key, parameters)
+        new_dfg, activities, start_activities, end_activities = statistics
+        if not with_start_end_activities:
+            start_activities = None
+            end_activities = None
+
+        sweep = exec_utils.get_param_value(MyParameters.SWEEP_CACHE, parameters, None)
+        if sweep is not None:
+            sweep_key = self.get_sweep_key(sweep, log, start_activities, end_activities)
+            cached = sweep.get(sweep_key)
+            if cached is not None:
+                # subtree found with another noise threshold, which it does not depend on
+                subtree = CachedSubtree(cached, parameters)
+                subtree.threshold_independent = True
+                self.children.append(subtree)
+                return
+
+        cache = exec_utils.get_param_value(MyParameters.SUBTREE_CACHE, parameters, None)
+        if cache is not None:
+            cache_key = cache.key(log, activity_key, self.initial_dfg, self.initial_start_activities,
+                                  self.initial_end_activities, self.sender_nodes, self.f, self.noise_threshold,
+                                  start_activities, end_activities, parameters)
+            cached = cache.get(cache_key)
+            if isinstance(cached, (MySubtreeInfrequent, RemoteSubtree)):
+                # same sublog met in another branch of this run
+                self.children.append(cached)
+                return
+            elif cached is not None:
+                self.children.append(CachedSubtree(cached, parameters))
+                return
+
+        child = None
+        if self.engine is not None:
+            # large sublogs may be discovered on the pool of processes of the engine
+            child = self.engine.offload(self, log, statistics, start_activities, end_activities)
+        if child is not None:
+            if cache is not None:
+                # stored as a tree by ParallelDiscovery.join once the worker returns it
+                child.cache_key = cache_key
+                cache.add_pending(cache_key, child)
+            self.children.append(child)
+            return
+
+        child = MySubtreeInfrequent(None, log, None, new_dfg, None, None, activities, None, self.rec_depth + 1,
+                                    start_activities=start_activities, end_activities=end_activities,
+                                    context=self.context)
+        if cache is not None:
+            # stored as a tree by get_tree_repr once the representation of the subtree is built
+            child.cache_key = cache_key
+            cache.add_pending(cache_key, child)
+        if sweep is not None:
+            child.sweep_key = sweep_key
+        self.children.append(child)
+
+    def get_sweep_key(self, sweep, log, start_activities, end_activities):
+        """
+        Key of the subtree of a sublog in the SweepCache, which leaves the noise threshold out
+        """
+        return sweep.key(log, self.context.activity_key, self.initial_dfg, self.initial_start_activities,
+                         self.initial_end_activities, self.sender_nodes, self.f, self.noise_threshold,
+                         start_activities, end_activities, self.parameters)
+
+    def check_plain_cut(self, parameters):
+        """
+        Cut detection on the unfiltered dfg, looked up in the SweepCache if any: it does not depend on the noise
+        threshold
+        """
+        sweep = exec_utils.get_param_value(MyParameters.SWEEP_CACHE, parameters, None)
+        if sweep is None or self.threshold_dependent:
+            # a subtree detecting its cut again on the log without the empty traces (see
+            # apply_fall_through_infrequent) keeps its dfg filtered on the threshold
+            return self.check_cut_im_plain()
+        if self.sweep_key is None:
+            # root of the tree
+            self.sweep_key = self.get_sweep_key(sweep, self.log, self.start_activities, self.end_activities)
+        return sweep.plain_cut(self.sweep_key, self.check_cut_im_plain)
+
+    def find_concurrent_activity(self, log, parameters):
+        """
+        Activity concurrent fall through of pm4py on log, the EventLog of the subtree. Its probes, the cut detection
+        on the log without each activity in turn, are looked up in the SweepCache if any: they are made on the logs
+        and dfgs computed again from the unfiltered log, which do not depend on the noise threshold
+        """
+        activity_key = self.context.activity_key
+        sweep = exec_utils.get_param_value(MyParameters.SWEEP_CACHE, parameters, None)
+        if sweep is None:
+            return fall_through.activity_concurrent(self, log, self.activities, activity_key, parameters=parameters)
+        results = []
+
+        def probe():
+            results.append(fall_through.activity_concurrent(self, log, self.activities, activity_key,
+                                                            parameters=parameters))
+            found, _, _, activity = results[0]
+            return activity if found else None
+
+        # the probes follow the order of the activities, which is kept in the key
+        key = (self.get_sweep_key(sweep, self.log, self.start_activities, self.end_activities),
+               tuple(self.activities.items()))
+        activity = sweep.concurrent_activity(key, probe)
+        if results:
+            return results[0]
+        if activity is None:
+            return False, None, None, None
+        new_log, small_log = concurrent_activity_logs(log, self.activities, activity, activity_key)
+        return True, new_log, small_log, activity
 
     #TODO; da modificare rimuovendo log
     def apply_cut_im_plain(self, type_of_cut, cut, activity_key):
         if type_of_cut == 'concurrent':
             self.detected_cut = 'concurrent'
-            new_logs = split.split_xor(cut[1], self.log, activity_key)
-            for l in new_logs:
-                new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=self.parameters).items() if v > 0]
-                activities = attributes_get.get_attribute_values(l, activity_key)
-                start_activities = list(
-                    start_activities_get.get_start_activities(l, parameters=self.parameters).keys())
-                end_activities = list(
-                    end_activities_get.get_end_activities(l, parameters=self.parameters).keys())
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities, self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold, start_activities=start_activities,
-                                      end_activities=end_activities,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=self.parameters))
+            split_name = 'split_xor'
         elif type_of_cut == 'sequential':
-            new_logs = split.split_sequence(cut[1], self.log, activity_key)
             self.detected_cut = "sequential"
-            for l in new_logs:
-                new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=self.parameters).items() if v > 0]
-                activities = attributes_get.get_attribute_values(l, activity_key)
-                start_activities = list(
-                    start_activities_get.get_start_activities(l, parameters=self.parameters).keys())
-                end_activities = list(
-                    end_activities_get.get_end_activities(l, parameters=self.parameters).keys())
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities, self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold, start_activities=start_activities,
-                                      end_activities=end_activities,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=self.parameters))
+            split_name = 'split_sequence'
         elif type_of_cut == 'parallel':
-            new_logs = split.split_parallel(cut[1], self.log, activity_key)
             self.detected_cut = "parallel"
-            for l in new_logs:
-                new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=self.parameters).items() if v > 0]
-                activities = attributes_get.get_attribute_values(l, activity_key)
-                start_activities = list(
-                    start_activities_get.get_start_activities(l, parameters=self.parameters).keys())
-                end_activities = list(
-                    end_activities_get.get_end_activities(l, parameters=self.parameters).keys())
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities, self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold, start_activities=start_activities,
-                                      end_activities=end_activities,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=self.parameters))
+            split_name = 'split_parallel'
         elif type_of_cut == 'loopCut':
-            new_logs = split.split_loop(cut[1], self.log, activity_key)
             self.detected_cut = "loopCut"
-            for l in new_logs:
-                new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=self.parameters).items() if v > 0]
-                activities = attributes_get.get_attribute_values(l, activity_key)
-                start_activities = list(
-                    start_activities_get.get_start_activities(l, parameters=self.parameters).keys())
-                end_activities = list(
-                    end_activities_get.get_end_activities(l, parameters=self.parameters).keys())
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities, self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold,
-                                      start_activities=start_activities,
-                                      end_activities=end_activities,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=self.parameters))
+            split_name = 'split_loop'
+        else:
+            return
+        with self.profiler.phase('split', self.rec_depth):
+            sublogs = split_log_with_statistics(split_name, cut[1], self.log, activity_key, self.parameters)
+        for l, statistics in sublogs:
+            self.add_child(l, self.parameters, statistics)
 
     #TODO; da modificare rimuovendo log
     def detect_cut_if(self, second_iteration=False, parameters=None):
+        with self.profiler.phase('detect_cut', self.rec_depth):
+            self._detect_cut_if(second_iteration, parameters)
+
+    def _detect_cut_if(self, second_iteration=False, parameters=None):
         if parameters is None:
             parameters = {}
         activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
                                                   pmutil.xes_constants.DEFAULT_NAME_KEY)
         # check base cases:
-        empty_log = base_case.empty_log(self.log)
-        single_activity = base_case.single_activity(self.log, activity_key)
+        with self.profiler.phase('base_case', self.rec_depth):
+            if isinstance(self.log, CompactLog):
+                empty_log = self.log.is_empty()
+                single_activity = self.log.single_activity() is not None
+            else:
+                empty_log = base_case.empty_log(self.log)
+                single_activity = base_case.single_activity(self.log, activity_key)
         if empty_log:
             self.detected_cut = 'empty_log'
         elif single_activity:
             self.detected_cut = 'single_activity'
             current_activity = list(self.activities.keys())[0]
-            filtered_initial_dfg = [x[0][0] for x in self.initial_dfg if x[0][1] == current_activity and x[0][0] in self.initial_start_activities]
-            # remove from filtered_initial_dfg the activities that are in the log
-            if len(filtered_initial_dfg) > 0:
-                any_log_activity = []
-                for trace in self.initial_log:
-                    for event in trace:
-                        if event[activity_key] not in any_log_activity:
-                            any_log_activity.append(event[activity_key])
-                filtered_initial_dfg = list(set(filtered_initial_dfg).difference(set(any_log_activity)))
+            # predecessors of the activity in the initial dfg which are start activities not in the log
+            filtered_initial_dfg = self.receive_predecessors.get(current_activity, [])
 
             if len(filtered_initial_dfg) > 0:
                 self.detected_cut = 'receive_message_activity'
                 from pm4py.objects.log import obj
                 for a in filtered_initial_dfg:
-                    sender_node = MySubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False)
+                    sender_node = MySubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False,
+                                                      context=self.context)
                     sender_node.detected_cut = 'single_activity'
                     sender_node.activities = {a: self.activities[current_activity]}
-                    sender_node.parameters = self.parameters
                     tmp_log = obj.EventLog()
                     tmp_log.attributes.clear()
                     tmp_log.append([])
                     tmp_log[0].append({activity_key: a})
                     sender_node.log = tmp_log
                     self.children.append(sender_node)
-                receiver_node = MySubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False)
+                receiver_node = MySubtreeInfrequent(None, None, None, None, None, None, None, None, None, real_init=False,
+                                                      context=self.context)
                 receiver_node.detected_cut = 'single_activity'
                 receiver_node.activities = {current_activity: self.activities[current_activity]}
-                receiver_node.parameters = self.parameters
                 tmp_log = obj.EventLog()
                 tmp_log.attributes.clear()
                 tmp_log.append([])
@@ -406,110 +517,51 @@ class MySubtreeInfrequent(SubtreeInfrequent):
         # if no base cases are found, search for a cut:
         # use the cutting and splitting functions of im_plain:
         else:
-            found_plain_cut, type_of_cut, cut = self.check_cut_im_plain()
+            found_plain_cut, type_of_cut, cut = self.check_plain_cut(parameters)
 
             if found_plain_cut:
                 self.apply_cut_im_plain(type_of_cut, cut, activity_key)
             # if im_plain does not find a cut, we filter on our threshold and then again apply the im_cut detection
             # but this time, we have to use different splitting functions:
             else:
+                self.threshold_dependent = True
                 self.filter_dfg_on_threshold()
                 found_plain_cut, type_of_cut, cut = self.check_cut_im_plain()
                 if found_plain_cut:
+                    split_name = None
                     if type_of_cut == 'concurrent':
                         logging.debug("concurrent_cut_if")
                         self.detected_cut = 'concurrent'
-                        new_logs = splitting_infrequent.split_xor_infrequent(cut[1], self.log, activity_key)
-                        for l in new_logs:
-                            new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=parameters).items() if v > 0]
-                            activities = attributes_get.get_attribute_values(l, activity_key)
-                            start_activities = list(
-                                start_activities_get.get_start_activities(l, parameters=parameters).keys())
-                            end_activities = list(
-                                end_activities_get.get_end_activities(l, parameters=parameters).keys())
-                            self.children.append(
-                                MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities,
-                                                  self.counts,
-                                                  self.rec_depth + 1, self.f,
-                                                  noise_threshold=self.noise_threshold,
-                                                  start_activities=start_activities,
-                                                  end_activities=end_activities,
-                                                  initial_start_activities=self.initial_start_activities,
-                                                  initial_end_activities=self.initial_end_activities,
-                                                  parameters=parameters))
+                        split_name = 'split_xor_infrequent'
                     elif type_of_cut == 'sequential':
                         logging.debug("sequential_if")
-                        new_logs = splitting_infrequent.split_sequence_infrequent(cut[1], self.log, activity_key)
                         self.detected_cut = "sequential"
-                        for l in new_logs:
-                            new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=parameters).items() if v > 0]
-                            activities = attributes_get.get_attribute_values(l, activity_key)
-                            start_activities = list(
-                                start_activities_get.get_start_activities(l, parameters=parameters).keys())
-                            end_activities = list(
-                                end_activities_get.get_end_activities(l, parameters=parameters).keys())
-                            self.children.append(
-                                MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities,
-                                                  self.counts,
-                                                  self.rec_depth + 1, self.f,
-                                                  noise_threshold=self.noise_threshold,
-                                                  start_activities=start_activities,
-                                                  end_activities=end_activities,
-                                                  initial_start_activities=self.initial_start_activities,
-                                                  initial_end_activities=self.initial_end_activities,
-                                                  parameters=parameters))
+                        split_name = 'split_sequence_infrequent'
                     elif type_of_cut == 'parallel':
                         logging.debug("parallel_if")
-                        new_logs = split.split_parallel(cut[1], self.log, activity_key)
                         self.detected_cut = "parallel"
-                        for l in new_logs:
-                            new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=parameters).items() if v > 0]
-                            activities = attributes_get.get_attribute_values(l, activity_key)
-                            start_activities = list(
-                                start_activities_get.get_start_activities(l, parameters=parameters).keys())
-                            end_activities = list(
-                                end_activities_get.get_end_activities(l, parameters=parameters).keys())
-                            self.children.append(
-                                MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities,
-                                                  self.counts,
-                                                  self.rec_depth + 1, self.f,
-                                                  noise_threshold=self.noise_threshold,
-                                                  start_activities=start_activities,
-                                                  end_activities=end_activities,
-                                                  initial_start_activities=self.initial_start_activities,
-                                                  initial_end_activities=self.initial_end_activities,
-                                                  parameters=parameters))
+                        split_name = 'split_parallel'
                     elif type_of_cut == 'loopCut':
                         logging.debug("loopCut_if")
-                        new_logs = splitting_infrequent.split_loop_infrequent(cut[1], self.log, activity_key)
                         self.detected_cut = "loopCut"
-                        for l in new_logs:
-                            new_dfg = [(k, v) for k, v in dfg_inst.apply(l, parameters=parameters).items() if v > 0]
-                            activities = attributes_get.get_attribute_values(l, activity_key)
-                            start_activities = list(
-                                start_activities_get.get_start_activities(l, parameters=parameters).keys())
-                            end_activities = list(
-                                end_activities_get.get_end_activities(l, parameters=parameters).keys())
-                            self.children.append(
-                                MySubtreeInfrequent(self.sender_nodes, l, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities,
-                                                  self.counts,
-                                                  self.rec_depth + 1, self.f,
-                                                  noise_threshold=self.noise_threshold,
-                                                  start_activities=start_activities,
-                                                  end_activities=end_activities,
-                                                  initial_start_activities=self.initial_start_activities,
-                                                  initial_end_activities=self.initial_end_activities,
-                                                  parameters=parameters))
+                        split_name = 'split_loop_infrequent'
+                    if split_name is not None:
+                        with self.profiler.phase('split', self.rec_depth):
+                            sublogs = split_log_with_statistics(split_name, cut[1], self.log, activity_key,
+                                                                parameters)
+                        for l, statistics in sublogs:
+                            self.add_child(l, parameters, statistics)
 
                 else:
-                    self.apply_fall_through_infrequent(parameters)
+                    with self.profiler.phase('fall_through', self.rec_depth):
+                        self.apply_fall_through_infrequent(parameters)
 
     #TODO; da modificare rimuovendo log
     def apply_fall_through_infrequent(self, parameters=None):
         if parameters is None:
             parameters = {}
-        activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, self.parameters,
-                                                  pmutil.xes_constants.DEFAULT_NAME_KEY)
+        activity_key = self.context.activity_key
+        is_compact = isinstance(self.log, CompactLog)
 
         # set flags for fall_throughs, base case is True (enabled)
         use_empty_trace = (Parameters.EMPTY_TRACE_KEY not in parameters) or parameters[
@@ -522,9 +574,18 @@ class MySubtreeInfrequent(SubtreeInfrequent):
             Parameters.STRICT_TAU_LOOP_KEY]
         use_tau_loop = (Parameters.TAU_LOOP_KEY not in parameters) or parameters[Parameters.TAU_LOOP_KEY]
 
+        profiler = self.profiler
+        # statistics of the logs built by the fall throughs of a CompactLog, computed while building them
+        statistics = None
+        small_statistics = None
         if use_empty_trace:
-            empty_traces_present, enough_traces, new_log = fall_through_infrequent.empty_trace_filtering(self.log,
-                                                                                                         self.f)
+            with profiler.phase('empty_trace', self.rec_depth):
+                if is_compact:
+                    empty_traces_present, enough_traces, new_log, statistics = self.log.empty_trace_filtering(
+                        self.f)
+                else:
+                    empty_traces_present, enough_traces, new_log = fall_through_infrequent.empty_trace_filtering(
+                        self.log, self.f)
             self.log = new_log
         else:
             empty_traces_present = False
@@ -533,153 +594,74 @@ class MySubtreeInfrequent(SubtreeInfrequent):
         if empty_traces_present and enough_traces:
             logging.debug("empty_trace_if")
             self.detected_cut = 'empty_trace'
-            new_dfg = [(k, v) for k, v in dfg_inst.apply(new_log, parameters=self.parameters).items() if v > 0]
-            activities = attributes_get.get_attribute_values(new_log, activity_key)
-            start_activities = list(
-                start_activities_get.get_start_activities(new_log, parameters=parameters).keys())
-            end_activities = list(
-                end_activities_get.get_end_activities(new_log, parameters=parameters).keys())
-            self.children.append(
-                MySubtreeInfrequent(self.sender_nodes, new_log, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities, self.counts,
-                                  self.rec_depth + 1, self.f,
-                                  noise_threshold=self.noise_threshold,
-                                  start_activities=start_activities,
-                                  end_activities=end_activities,
-                                  initial_start_activities=self.initial_start_activities,
-                                  initial_end_activities=self.initial_end_activities, parameters=parameters))
+            self.add_child(new_log, parameters, as_tuple(statistics))
         elif empty_traces_present and not enough_traces:
             # no node is added to the PT, instead we just use recursion on the log without the empty traces
             self.detect_cut_if(parameters=parameters)
         else:
             if use_act_once_per_trace:
-                activity_once, new_log, small_log = fall_through.act_once_per_trace(self.log, self.activities,
-                                                                                    activity_key)
+                with profiler.phase('act_once_per_trace', self.rec_depth):
+                    if is_compact:
+                        activity_once, new_log, small_log, statistics, small_statistics = \
+                            self.log.act_once_per_trace(self.activities)
+                    else:
+                        activity_once, new_log, small_log = fall_through.act_once_per_trace(self.log, self.activities,
+                                                                                            activity_key)
             else:
                 activity_once = False
             if activity_once:
                 self.detected_cut = 'parallel'
-                # create two new dfgs as we need them to append to self.children later
-                new_dfg = [(k, v) for k, v in dfg_inst.apply(new_log, parameters=parameters).items() if
-                           v > 0]
-                activities = attributes_get.get_attribute_values(new_log, activity_key)
-                small_dfg = [(k, v) for k, v in dfg_inst.apply(small_log, parameters=parameters).items() if
-                             v > 0]
-                small_activities = attributes_get.get_attribute_values(small_log, activity_key)
-                start_activities = list(
-                    start_activities_get.get_start_activities(new_log, parameters=parameters).keys())
-                end_activities = list(
-                    end_activities_get.get_end_activities(new_log, parameters=parameters).keys())
                 # append the chosen activity as leaf:
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, small_log, self.initial_log, small_dfg, self.master_dfg, self.initial_dfg, small_activities,
-                                      self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=parameters))
+                self.add_child(small_log, parameters, as_tuple(small_statistics), with_start_end_activities=False)
                 # continue with the recursion on the new log
-                self.children.append(
-                    MySubtreeInfrequent(self.sender_nodes, new_log, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg, activities,
-                                      self.counts,
-                                      self.rec_depth + 1, self.f,
-                                      noise_threshold=self.noise_threshold,
-                                      start_activities=start_activities,
-                                      end_activities=end_activities,
-                                      initial_start_activities=self.initial_start_activities,
-                                      initial_end_activities=self.initial_end_activities, parameters=parameters))
+                self.add_child(new_log, parameters, as_tuple(statistics))
 
             else:
                 if use_act_concurrent:
-                    activity_concurrent, new_log, small_log, key = fall_through.activity_concurrent(self, self.log,
-                                                                                                    self.activities,
-                                                                                                    activity_key,
-                                                                                                    parameters=parameters)
+                    with profiler.phase('activity_concurrent', self.rec_depth):
+                        # the concurrent activity fall through re-runs the cut detection of pm4py, which needs an
+                        # EventLog
+                        event_log = self.log.to_event_log(activity_key) if is_compact else self.log
+                        activity_concurrent, new_log, small_log, key = self.find_concurrent_activity(event_log,
+                                                                                                     parameters)
+                        if activity_concurrent and is_compact:
+                            new_log = CompactLog.from_event_log(new_log, activity_key, self.log.activity_index)
+                            small_log = CompactLog.from_event_log(small_log, activity_key, self.log.activity_index)
                 else:
                     activity_concurrent = False
                 if activity_concurrent:
                     self.detected_cut = 'parallel'
-                    # create two new dfgs on to append later
-                    new_dfg = [(k, v) for k, v in dfg_inst.apply(new_log, parameters=parameters).items() if
-                               v > 0]
-                    activities = attributes_get.get_attribute_values(new_log, activity_key)
-                    small_dfg = [(k, v) for k, v in dfg_inst.apply(small_log, parameters=parameters).items() if
-                                 v > 0]
-                    small_activities = attributes_get.get_attribute_values(small_log, activity_key)
-                    start_activities = list(
-                        start_activities_get.get_start_activities(new_log, parameters=parameters).keys())
-                    end_activities = list(
-                        end_activities_get.get_end_activities(new_log, parameters=parameters).keys())
                     # append the concurrent activity as leaf:
-                    self.children.append(
-                        MySubtreeInfrequent(self.sender_nodes, small_log, self.initial_log, small_dfg, self.master_dfg, self.initial_dfg,
-                                          small_activities,
-                                          self.counts,
-                                          self.rec_depth + 1, self.f,
-                                          noise_threshold=self.noise_threshold,
-                                          initial_start_activities=self.initial_start_activities,
-                                          initial_end_activities=self.initial_end_activities, parameters=parameters))
+                    self.add_child(small_log, parameters, with_start_end_activities=False)
                     # continue with the recursion on the new log:
-                    self.children.append(
-                        MySubtreeInfrequent(self.sender_nodes, new_log, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg,
-                                          activities,
-                                          self.counts,
-                                          self.rec_depth + 1, self.f,
-                                          noise_threshold=self.noise_threshold,
-                                          start_activities=start_activities,
-                                          end_activities=end_activities,
-                                          initial_start_activities=self.initial_start_activities,
-                                          initial_end_activities=self.initial_end_activities, parameters=parameters))
+                    self.add_child(new_log, parameters)
                 else:
                     if use_strict_tau_loop:
-                        strict_tau_loop, new_log = fall_through.strict_tau_loop(self.log, self.start_activities,
-                                                                                self.end_activities, activity_key)
+                        with profiler.phase('strict_tau_loop', self.rec_depth):
+                            if is_compact:
+                                strict_tau_loop, new_log, statistics = self.log.strict_tau_loop(
+                                    self.start_activities, self.end_activities)
+                            else:
+                                strict_tau_loop, new_log = fall_through.strict_tau_loop(
+                                    self.log, self.start_activities, self.end_activities, activity_key)
                     else:
                         strict_tau_loop = False
                     if strict_tau_loop:
                         self.detected_cut = 'strict_tau_loop'
-                        new_dfg = [(k, v) for k, v in dfg_inst.apply(new_log, parameters=parameters).items() if
-                                   v > 0]
-                        activities = attributes_get.get_attribute_values(new_log, activity_key)
-                        start_activities = list(
-                            start_activities_get.get_start_activities(new_log, parameters=parameters).keys())
-                        end_activities = list(
-                            end_activities_get.get_end_activities(new_log, parameters=parameters).keys())
-                        self.children.append(
-                            MySubtreeInfrequent(self.sender_nodes, new_log, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg,
-                                              activities,
-                                              self.counts,
-                                              self.rec_depth + 1, self.f,
-                                              noise_threshold=self.noise_threshold,
-                                              start_activities=start_activities,
-                                              end_activities=end_activities,
-                                              initial_start_activities=self.initial_start_activities,
-                                              initial_end_activities=self.initial_end_activities,
-                                              parameters=parameters))
+                        self.add_child(new_log, parameters, as_tuple(statistics))
                     else:
                         if use_tau_loop:
-                            tau_loop, new_log = fall_through.tau_loop(self.log, self.start_activities, activity_key)
+                            with profiler.phase('tau_loop', self.rec_depth):
+                                if is_compact:
+                                    tau_loop, new_log, statistics = self.log.tau_loop(self.start_activities)
+                                else:
+                                    tau_loop, new_log = fall_through.tau_loop(self.log, self.start_activities,
+                                                                              activity_key)
                         else:
                             tau_loop = False
                         if tau_loop:
                             self.detected_cut = 'tau_loop'
-                            new_dfg = [(k, v) for k, v in dfg_inst.apply(new_log, parameters=parameters).items() if
-                                       v > 0]
-                            activities = attributes_get.get_attribute_values(new_log, activity_key)
-                            start_activities = list(
-                                start_activities_get.get_start_activities(new_log, parameters=parameters).keys())
-                            end_activities = list(
-                                end_activities_get.get_end_activities(new_log, parameters=parameters).keys())
-                            self.children.append(
-                                MySubtreeInfrequent(self.sender_nodes, new_log, self.initial_log, new_dfg, self.master_dfg, self.initial_dfg,
-                                                  activities,
-                                                  self.counts,
-                                                  self.rec_depth + 1, self.f,
-                                                  noise_threshold=self.noise_threshold,
-                                                  start_activities=start_activities,
-                                                  end_activities=end_activities,
-                                                  initial_start_activities=self.initial_start_activities,
-                                                  initial_end_activities=self.initial_end_activities,
-                                                  parameters=parameters))
+                            self.add_child(new_log, parameters, as_tuple(statistics))
                         else:
                             logging.debug("flower_if")
                             self.detected_cut = 'flower'
@@ -687,13 +669,17 @@ class MySubtreeInfrequent(SubtreeInfrequent):
 
 
 def my_make_tree(sender_nodes, log, dfg, master_dfg, initial_dfg, activities, c, f, recursion_depth, noise_threshold, start_activities,
-              end_activities, initial_start_activities, initial_end_activities, parameters=None):
+              end_activities, initial_start_activities, initial_end_activities, parameters=None, engine=None):
     if parameters is None:
         parameters = {}
+    if engine is None:
+        engine = DiscoveryEngine.from_parameters(parameters)
 
     tree = MySubtreeInfrequent(sender_nodes, log, log, dfg, master_dfg, initial_dfg, activities, c, f, recursion_depth, noise_threshold,
                              start_activities, end_activities, initial_start_activities, initial_end_activities,
-                             parameters=parameters)
+                             parameters=parameters, engine=engine)
+    # the subtrees are discovered by the engine, one at a time
+    engine.run()
     return tree
 
 pm4py.algo.discovery.inductive.variants.im_f.data_structures.subtree_infrequent.make_tree = my_make_tree
@@ -116,4 +116,156 @@ def my_recursively_add_tree(parent_tree, tree, bpmn, initial_event, final_event,
     return bpmn, counts, initial_connector, final_connector
 
 
+# operators whose nested occurrences are equivalent to a single one with all the children
+FLATTENED_OPERATORS = (Operator.SEQUENCE, Operator.XOR, Operator.PARALLEL, Operator.OR)
+
+
+def flat_children(tree) -> list:
+    """
+    Children of the node, the ones having the same operator being replaced by their own children
+    """
+    children = []
+    stack = list(reversed(tree.children))
+    while stack:
+        child = stack.pop()
+        if child.operator is not None and child.operator == tree.operator and tree.operator in FLATTENED_OPERATORS:
+            stack.extend(reversed(child.children))
+        else:
+            children.append(child)
+    return children
+
+
+def add_gateway(operator, bpmn, counts):
+    to_bpmn = pm4py.objects.conversion.process_tree.variants.to_bpmn
+    if operator == Operator.XOR:
+        return to_bpmn.add_xor_gateway(bpmn, counts)
+    if operator == Operator.PARALLEL:
+        return to_bpmn.add_parallel_gateway(bpmn, counts)
+    return to_bpmn.add_inclusive_gateway(bpmn, counts)
+
+
+def add_flow(bpmn, flows, source, target):
+    # the same pair of nodes is connected once, e.g. by the silent branches of a choice
+    if (id(source), id(target)) not in flows:
+        flows.add((id(source), id(target)))
+        bpmn.add_flow(pm4py.objects.bpmn.obj.BPMN.Flow(source, target))
+
+
+def add_node(node, children_results, bpmn, counts, flows):
+    """
+    Adds the BPMN of a node whose children are already converted
+
+    Returns
+    -----------
+    result
+        (first, last) BPMN nodes of the node, or None if the node is silent: the flows entering and leaving it are
+        connected directly
+    """
+    from pm4py.objects.bpmn.obj import BPMN
+    to_bpmn = pm4py.objects.conversion.process_tree.variants.to_bpmn
+    if node.operator is None:
+        if node.label is None:
+            return None
+        bpmn, task, counts = to_bpmn.add_task(bpmn, counts, node.label)
+        return task, task
+
+    if node.operator == Operator.SEQUENCE:
+        results = [result for result in children_results if result is not None]
+        for previous, following in zip(results, results[1:]):
+            add_flow(bpmn, flows, previous[1], following[0])
+        return (results[0][0], results[-1][1]) if results else None
+
+    if node.operator in (Operator.XOR, Operator.PARALLEL, Operator.OR):
+        results = [result for result in children_results if result is not None]
+        # a silent branch is a no-op in a parallel, a way to skip the other branches in a choice
+        skippable = len(results) < len(children_results) and node.operator != Operator.PARALLEL
+        if not results:
+            return None
+        if len(results) == 1 and not skippable:
+            return results[0]
+        bpmn, split, join, counts = add_gateway(node.operator, bpmn, counts)
+        for first, last in results:
+            add_flow(bpmn, flows, split, first)
+            add_flow(bpmn, flows, last, join)
+        if skippable:
+            add_flow(bpmn, flows, split, join)
+        return split, join
+
+    if node.operator == Operator.LOOP:
+        if len(children_results) != 2:
+            raise Exception("Loop doesn't have 2 childs")
+        do, redo = children_results
+        bpmn, split, join, counts = to_bpmn.add_xor_gateway(bpmn, counts)
+        for source, target, result in ((join, split, do), (split, join, redo)):
+            if result is None:
+                add_flow(bpmn, flows, source, target)
+            else:
+                add_flow(bpmn, flows, source, result[0])
+                add_flow(bpmn, flows, result[1], target)
+        return join, split
+
+    if node.operator == Operator.RECEIVE_MESSAGE:
+        receive_message_node = node.children[len(node.children) - 1]
+        bpmn, receive_message_task, counts = to_bpmn.add_task(bpmn, counts, receive_message_node.label)
+        for child in node.children[:-1]:
+            task = BPMN.Task(name=child.label)
+            bpmn.add_node(task)
+            add_flow(bpmn, flows, task, receive_message_task)
+        return receive_message_task, receive_message_task
+
+    raise Exception("Unsupported operator: %s" % node.operator)
+
+
+def my_apply(tree, parameters=None):
+    """
+    Converts a process tree to BPMN without recursion
+
+    The tree is visited in post order with an explicit stack, so that its depth is not bounded by the recursion
+    limit. While the BPMN is built, silent subtrees become direct flows instead of tau tasks, the children of a
+    sequence are connected to each other, nested gateways of the same type are collapsed into one and a choice or
+    parallel with a single branch is replaced by the branch
+
+    Parameters
+    -----------
+    tree
+        Process tree
+    parameters
+        Parameters of the conversion (unused)
+
+    Returns
+    -----------
+    bpmn
+        BPMN graph
+    """
+    from pm4py.objects.bpmn.obj import BPMN
+    counts = pm4py.objects.conversion.process_tree.variants.to_bpmn.Counts()
+    bpmn = BPMN()
+    start_event = BPMN.StartEvent(name="start", isInterrupting=True)
+    end_event = BPMN.NormalEndEvent(name="end")
+    bpmn.add_node(start_event)
+    bpmn.add_node(end_event)
+    flows = set()
+
+    results = {}
+    stack = [(tree, None)]
+    while stack:
+        node, children = stack.pop()
+        if children is None:
+            # the receive message node converts its children itself
+            children = flat_children(node) if node.operator != Operator.RECEIVE_MESSAGE else []
+            stack.append((node, children))
+            stack.extend((child, None) for child in reversed(children))
+        else:
+            results[id(node)] = add_node(node, [results.pop(id(child)) for child in children], bpmn, counts, flows)
+
+    result = results[id(tree)]
+    if result is None:
+        add_flow(bpmn, flows, start_event, end_event)
+    else:
+        add_flow(bpmn, flows, start_event, result[0])
+        add_flow(bpmn, flows, result[1], end_event)
+    return bpmn
+
+
 pm4py.objects.conversion.process_tree.variants.to_bpmn.recursively_add_tree = my_recursively_add_tree
+pm4py.objects.conversion.process_tree.variants.to_bpmn.apply = my_apply
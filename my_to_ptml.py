@@ -0,0 +1,75 @@
+import copy
+import uuid
+
+import pm4py
+from lxml import etree
+from pm4py.objects.process_tree.exporter.variants import ptml
+from pm4py.objects.process_tree.obj import ProcessTree
+
+from MyOperator import MyOperator
+
+# PTML element of every operator, the receive message one has no counterpart in ProM
+OPERATOR_ELEMENTS = {
+    MyOperator.SEQUENCE: 'sequence',
+    MyOperator.XOR: 'xor',
+    MyOperator.PARALLEL: 'and',
+    MyOperator.OR: 'or',
+    MyOperator.LOOP: 'xorLoop',
+    MyOperator.INTERLEAVING: 'interleaved',
+    MyOperator.RECEIVE_MESSAGE: 'receiveMessage',
+}
+
+
+def my_export_ptree_tree(tree, parameters=None):
+    """
+    Exports the XML tree of a process tree, like the PTML exporter of pm4py, which fails on the operators it does not
+    know (the receive message one)
+
+    Parameters
+    -----------------
+    tree
+        Process tree
+    parameters
+        Parameters of the algorithm
+
+    Returns
+    -----------------
+    xml_tree
+        XML tree object
+    """
+    tree = copy.deepcopy(tree)
+    # loops are exported with 3 children, for ProM compatibility
+    for node in ptml.get_list_nodes_from_tree(tree, parameters=parameters):
+        if node.operator == MyOperator.LOOP and len(node.children) < 3:
+            node.children.append(ProcessTree(operator=None, label=None, parent=node))
+    nodes = ptml.get_list_nodes_from_tree(tree, parameters=parameters)
+    node_ids = {id(node): str(uuid.uuid4()) for node in nodes}
+
+    root = etree.Element("ptml")
+    processtree = etree.SubElement(root, "processTree")
+    processtree.set("name", str(uuid.uuid4()))
+    processtree.set("root", node_ids[id(tree)])
+    processtree.set("id", str(uuid.uuid4()))
+
+    for node in nodes:
+        if node.operator is None:
+            element = etree.SubElement(processtree, "automaticTask" if node.label is None else "manualTask")
+            element.set("name", node.label if node.label is not None else "")
+        else:
+            if node.operator not in OPERATOR_ELEMENTS:
+                raise ValueError("operator %s has no PTML element" % node.operator)
+            element = etree.SubElement(processtree, OPERATOR_ELEMENTS[node.operator])
+            element.set("name", "")
+        element.set("id", node_ids[id(node)])
+
+    for node in nodes:
+        if node is not tree:
+            element = etree.SubElement(processtree, "parentsNode")
+            element.set("id", str(uuid.uuid4()))
+            element.set("sourceId", node_ids[id(node.parent)])
+            element.set("targetId", node_ids[id(node)])
+
+    return etree.ElementTree(root)
+
+
+pm4py.objects.process_tree.exporter.variants.ptml.export_ptree_tree = my_export_ptree_tree
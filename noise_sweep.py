@@ -0,0 +1,266 @@
+"""
+Discovery of the process trees of a set of party logs for several noise thresholds
+
+    python noise_sweep.py Logs/real/hospital.xes Logs/real/gynecologist.xes Logs/real/laboratory.xes \
+        Logs/real/patient.xes --thresholds 0 0.1 0.2 0.4
+
+The logs are parsed, prepared and their messages matched once, the statistics of every party log are computed once,
+and the subtrees, cuts and activity concurrent probes which do not depend on the noise threshold are shared by all
+the discoveries through a SweepCache. Every tree comes with its size and a footprint based fitness on the log of its party
+"""
+import argparse
+import json
+import time
+
+from MyParameters import MyParameters
+
+# leaves: the operator is None
+SEQUENCE, XOR, PARALLEL, LOOP, OR, INTERLEAVING, RECEIVE_MESSAGE = '->', 'X', '+', '*', 'O', '<>', 'receive_message'
+
+
+def tree_size(tree) -> dict:
+    """
+    Size of a process tree
+
+    Returns
+    -----------
+    dict
+        nodes, activities (visible leaves), silent (tau leaves), operators and depth (of the deepest leaf, the root
+        being at depth 0)
+    """
+    size = {'nodes': 0, 'activities': 0, 'silent': 0, 'operators': 0, 'depth': 0}
+    stack = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        size['nodes'] += 1
+        size['depth'] = max(size['depth'], depth)
+        if node.operator is not None:
+            size['operators'] += 1
+            stack.extend((child, depth + 1) for child in node.children)
+        elif node.label is not None:
+            size['activities'] += 1
+        else:
+            size['silent'] += 1
+    return size
+
+
+def _footprint_leaf(node):
+    if node.label is None:
+        return frozenset(), frozenset(), frozenset(), frozenset(), True
+    label = frozenset([node.label])
+    return label, label, label, frozenset(), False
+
+
+def _footprint_node(operator, children):
+    # children: footprints (activities, start, end, directly follows, nullable) of the children
+    activities = frozenset().union(*(child[0] for child in children))
+    directly_follows = set().union(*(child[3] for child in children))
+    if operator == RECEIVE_MESSAGE:
+        # the sender activities belong to the other parties, the party only sees the receiving activity
+        return children[-1]
+    if operator == SEQUENCE:
+        start, end = set(), set()
+        for child in children:
+            start |= child[1]
+            if not child[4]:
+                break
+        for child in reversed(children):
+            end |= child[2]
+            if not child[4]:
+                break
+        for i, child in enumerate(children):
+            # the end of a child can be followed by the start of the next ones, up to the first one never skipped
+            for following in children[i + 1:]:
+                directly_follows.update((a, b) for a in child[2] for b in following[1])
+                if not following[4]:
+                    break
+        return activities, frozenset(start), frozenset(end), frozenset(directly_follows), all(c[4] for c in children)
+    if operator == LOOP:
+        do, redo = children[0], _footprint_node(XOR, children[1:])
+        directly_follows.update((a, b) for a in do[2] for b in redo[1])
+        directly_follows.update((a, b) for a in redo[2] for b in do[1])
+        if redo[4]:
+            directly_follows.update((a, b) for a in do[2] for b in do[1])
+        if do[4]:
+            directly_follows.update((a, b) for a in redo[2] for b in redo[1])
+        start = do[1] | redo[1] if do[4] else do[1]
+        end = do[2] | redo[2] if do[4] else do[2]
+        return activities, start, end, frozenset(directly_follows), do[4]
+    start = frozenset().union(*(child[1] for child in children))
+    end = frozenset().union(*(child[2] for child in children))
+    if operator == XOR:
+        return activities, start, end, frozenset(directly_follows), any(c[4] for c in children)
+    if operator in (PARALLEL, INTERLEAVING, OR):
+        # the activities of different children can follow each other in any order
+        for i, child in enumerate(children):
+            for other in children[i + 1:]:
+                directly_follows.update((a, b) for a in child[0] for b in other[0])
+                directly_follows.update((b, a) for a in child[0] for b in other[0])
+        nullable = any(c[4] for c in children) if operator == OR else all(c[4] for c in children)
+        return activities, start, end, frozenset(directly_follows), nullable
+    raise Exception("Unsupported operator: %s" % operator)
+
+
+def tree_footprint(tree):
+    """
+    Footprint of the behaviour of a process tree on the log of its party: the receive message nodes stand for their
+    receiving activity
+
+    Returns
+    -----------
+    footprint
+        (activities, start activities, end activities, directly follows pairs, whether the empty trace is accepted)
+    """
+    # post order visit with an explicit stack, as in get_tree_repr_implain_get_repr
+    stack = [(tree, [])]
+    while True:
+        node, children = stack[-1]
+        if node.operator is not None and len(children) < len(node.children):
+            stack.append((node.children[len(children)], []))
+            continue
+        stack.pop()
+        if node.operator is None:
+            footprint = _footprint_leaf(node)
+        else:
+            footprint = _footprint_node(node.operator.value, children)
+        if not stack:
+            return footprint
+        stack[-1][1].append(footprint)
+
+
+def footprint_fitness(variants, footprint) -> dict:
+    """
+    Fitness of the log with respect to the footprint of a tree
+
+    The footprint over-approximates the behaviour of the tree, so the measures are upper bounds of the replay fitness
+
+    Returns
+    -----------
+    dict
+        trace_fitness: fraction of the traces whose start, end and directly follows relations are all in the
+        footprint; relation_fitness: fraction of the occurrences of these relations that are in the footprint
+    """
+    _, start, end, directly_follows, nullable = footprint
+    traces = fitting_traces = relations = fitting_relations = 0
+    for variant, count in variants:
+        traces += count
+        if not variant:
+            relations += count
+            if nullable:
+                fitting_traces += count
+                fitting_relations += count
+            continue
+        fitting = (variant[0] in start) + (variant[-1] in end)
+        fitting += sum(1 for pair in zip(variant, variant[1:]) if pair in directly_follows)
+        relations += (len(variant) + 1) * count
+        fitting_relations += fitting * count
+        if fitting == len(variant) + 1:
+            fitting_traces += count
+    return {'trace_fitness': fitting_traces / traces if traces else 1.0,
+            'relation_fitness': fitting_relations / relations if relations else 1.0}
+
+
+def sweep_noise_thresholds(logs, thresholds, parameters=None, convert=False, fitness=True, cache=None) -> list[dict]:
+    """
+    Discovers the process tree of every party log for every noise threshold
+
+    The parties are discovered one after the other in this process, so that they share the cache: the pool of
+    processes of MyParameters.PARALLEL_THRESHOLD is not used either
+
+    Parameters
+    -----------
+    logs
+        One log per party
+    thresholds
+        Noise thresholds
+    parameters
+        Parameters of the algorithm (Parameters.NOISE_THRESHOLD is replaced)
+    convert
+        Whether the logs have still to be converted to EventLog
+    fitness
+        Whether the fitness of every tree on the log of its party is computed
+    cache
+        SweepCache shared by the discoveries (e.g. with a previous sweep), a new one if not given
+
+    Returns
+    -----------
+    list
+        For every threshold, in order, a dict with noise_threshold, trees (index of the party -> process tree),
+        statistics (index of the party -> tree_size, plus footprint_fitness if fitness is set) and seconds
+    """
+    from pm4py import util as pmutil
+    from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+    from pm4py.util import exec_utils
+    import apply_tree
+    from log_statistics import log_variants
+    import my_subtree_infrequent
+    from subtree_cache import SweepCache
+
+    parameters = {key: value for key, value in (parameters or {}).items()
+                  if key != MyParameters.PARALLEL_THRESHOLD}
+    parameters[MyParameters.SWEEP_CACHE] = cache if cache is not None else SweepCache()
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters,
+                                              pmutil.xes_constants.DEFAULT_NAME_KEY)
+
+    # everything not depending on the threshold is done once
+    sender_nodes = apply_tree.discover_in_nodes(logs, parameters)
+    party_logs = [apply_tree.prepare_party_log(log, parameters, convert=convert) for log in logs]
+    statistics = [my_subtree_infrequent.get_log_statistics(log, activity_key, parameters) for log in party_logs]
+    variants = [log_variants(log, activity_key) for log in party_logs] if fitness else None
+
+    results = []
+    for threshold in thresholds:
+        start = time.perf_counter()
+        threshold_parameters = dict(parameters)
+        threshold_parameters[Parameters.NOISE_THRESHOLD] = threshold
+        trees = {index: apply_tree.discover_party_tree(log, threshold_parameters, sender_nodes.get(index, []),
+                                                       statistics[index])
+                 for index, log in enumerate(party_logs)}
+        seconds = time.perf_counter() - start
+        tree_statistics = {}
+        for index, tree in trees.items():
+            tree_statistics[index] = tree_size(tree)
+            if fitness:
+                tree_statistics[index].update(footprint_fitness(variants[index], tree_footprint(tree)))
+        results.append({'noise_threshold': threshold, 'trees': trees, 'statistics': tree_statistics,
+                        'seconds': seconds})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Discovers the process tree of every party log for several noise '
+                                                 'thresholds')
+    parser.add_argument('inputs', nargs='+', help='XES log of every party')
+    parser.add_argument('-t', '--thresholds', nargs='+', type=float, required=True, help='noise thresholds of IMf')
+    parser.add_argument('--compact-log', action='store_true', help='discover on the variant-compressed logs')
+    parser.add_argument('--no-fitness', action='store_true', help='skip the fitness of the trees')
+    parser.add_argument('--trees', action='store_true', help='print the trees as well')
+    args = parser.parse_args(argv)
+
+    import log_cache
+    from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+    from subtree_cache import SweepCache
+    parameters = {
+        Parameters.ACTIVITY_KEY: 'concept:name',
+        Parameters.TIMESTAMP_KEY: 'time:timestamp',
+        Parameters.CASE_ID_KEY: 'case:concept:name',
+        MyParameters.COMPACT_LOG: args.compact_log,
+    }
+    logs = [log_cache.read_columnar(path) for path in args.inputs]
+    cache = SweepCache()
+    results = sweep_noise_thresholds(logs, args.thresholds, parameters, convert=True, fitness=not args.no_fitness,
+                                     cache=cache)
+    output = []
+    for result in results:
+        parties = {}
+        for index, path in enumerate(args.inputs):
+            parties[path] = dict(result['statistics'][index])
+            if args.trees:
+                parties[path]['tree'] = str(result['trees'][index])
+        output.append({'noise_threshold': result['noise_threshold'], 'seconds': result['seconds'],
+                       'parties': parties})
+    print(json.dumps({'sweep': output, 'cache': cache.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pm4py.util import exec_utils
+
+from MyParameters import MyParameters
+
+# context shared by all the subtrees discovered by a worker, set once by the pool initializer
+_context = None
+
+
+def _init_worker(context):
+    from subtree_cache import parameter_caches
+    global _context
+    _context = context
+    # the context is inherited rather than unpickled by forked workers
+    for cache in parameter_caches(context.parameters):
+        cache.start_delta()
+
+
+def _discover_subtree(log, statistics, start_activities, end_activities, rec_depth):
+    # top level function, so that it can be sent to the workers of the pool
+    from discovery_engine import DiscoveryEngine
+    from my_subtree_infrequent import MySubtreeInfrequent
+    import apply_tree
+    from discovery_profiler import DiscoveryProfiler
+    from subtree_cache import parameter_caches
+    parameters = _context.parameters
+    profiler = None
+    if MyParameters.PROFILER in parameters:
+        # every task is timed on its own, the parent merges the profiles
+        profiler = DiscoveryProfiler()
+        parameters = dict(parameters)
+        parameters[MyParameters.PROFILER] = profiler
+    dfg, activities = statistics[0], statistics[1]
+    engine = DiscoveryEngine.from_parameters(parameters)
+    context = _context.derive(parameters=parameters, engine=engine)
+    node = MySubtreeInfrequent(None, log, None, dfg, None, None, activities, None, rec_depth,
+                               start_activities=start_activities, end_activities=end_activities, context=context)
+    engine.run()
+    # the subtrees stored in the copies of the caches of the worker go back to the parent along with the tree
+    return (apply_tree.get_array_tree_repr(node).to_tuple(), profiler,
+            [cache.take_delta() for cache in parameter_caches(parameters)])
+
+
+class RemoteSubtree(object):
+    """
+    Subtree structure standing for a subtree discovered by a worker, get_tree_repr builds its tree from the
+    nested tuple (see subtree_cache.tree_to_tuple) returned by the worker along with its profile and what its caches
+    learned
+    """
+
+    def __init__(self, future, parameters):
+        self.detected_cut = 'cached'
+        self.future = future
+        self.children = []
+        self.parameters = parameters
+        self.cache_key = None
+
+    @property
+    def tree(self):
+        return self.future.result()[0]
+
+
+class ParallelDiscovery(object):
+    """
+    Discovers the subtrees of the sublogs having at least threshold events on a pool of n_jobs processes, the
+    smaller ones are left to the caller
+
+    The subtree of a sublog depends only on the sublog and on the context of the whole log (initial log and dfg,
+    sender nodes, thresholds, parameters), which is sent once to every worker when the pool is started by the first
+    offloaded sublog. The discovered tree is therefore the same as the serial one
+    """
+
+    def __init__(self, threshold, n_jobs=None):
+        self.threshold = threshold
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.executor = None
+        self.remote = []
+        self.profiler = None
+        self.parameters = None
+
+    def context(self, node):
+        parameters = dict(node.parameters) if node.parameters is not None else {}
+        # the workers discover their subtrees serially
+        parameters.pop(MyParameters.PARALLEL_THRESHOLD, None)
+        return node.context.derive(parameters=parameters)
+
+    def submit(self, parent, log, size, statistics, start_activities, end_activities):
+        """
+        Sends the discovery of the subtree of a child of parent to the pool
+
+        Returns
+        -----------
+        subtree
+            RemoteSubtree, or None if the sublog is too small and has to be discovered inline
+        """
+        if size < self.threshold:
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                                initargs=(self.context(parent),))
+        future = self.executor.submit(_discover_subtree, log, statistics, start_activities, end_activities,
+                                      parent.rec_depth + 1)
+        self.profiler = parent.profiler
+        self.parameters = parent.parameters
+        subtree = RemoteSubtree(future, parent.parameters)
+        self.remote.append(subtree)
+        return subtree
+
+    def join(self):
+        """
+        Waits for the subtrees sent to the pool and shuts it down
+
+        The subtrees are stored in the caches of the parameters, with the subtrees the workers discovered below them
+        """
+        if self.executor is not None:
+            from subtree_cache import parameter_caches
+            caches = parameter_caches(self.parameters)
+            for subtree in self.remote:
+                tree, profile, deltas = subtree.future.result()
+                if profile is not None and self.profiler.enabled:
+                    self.profiler.merge(profile)
+                for cache, delta in zip(caches, deltas):
+                    cache.merge(delta)
+                cache = exec_utils.get_param_value(MyParameters.SUBTREE_CACHE, subtree.parameters, None)
+                if cache is not None and subtree.cache_key is not None:
+                    cache.put(subtree.cache_key, tree)
+            self.executor.shutdown()
+            self.executor = None
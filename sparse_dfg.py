@@ -0,0 +1,129 @@
+from collections.abc import Sequence
+from hashlib import blake2b
+
+
+class SparseDfg(Sequence):
+    """
+    Directly follows graph indexed by activity, outgoing[a][b] and ingoing[b][a] being the count of a -> b
+
+    It behaves as the list of ((a, b), count) used by the pm4py utilities (iteration, len, indexing), while edge
+    lookups and adjacency queries are constant time. The object is never modified after construction: the
+    methods deriving a graph return a new one
+    """
+
+    def __init__(self, edges=()):
+        self.edges = []
+        self.index = {}
+        self.outgoing = {}
+        self.ingoing = {}
+        self._fingerprint = None
+        self._structure_fingerprint = None
+        items = edges.items() if hasattr(edges, 'items') else edges
+        for (a, b), count in items:
+            if count <= 0:
+                continue
+            position = self.index.get((a, b))
+            if position is None:
+                self.index[(a, b)] = len(self.edges)
+                self.edges.append(((a, b), count))
+            else:
+                # an edge given twice (e.g. a sender node already in the dfg) is accumulated
+                count += self.edges[position][1]
+                self.edges[position] = ((a, b), count)
+            self.outgoing.setdefault(a, {})[b] = count
+            self.ingoing.setdefault(b, {})[a] = count
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __getitem__(self, position):
+        return self.edges[position]
+
+    def __iter__(self):
+        return iter(self.edges)
+
+    def __contains__(self, item):
+        # accepts both an edge (a, b) and an element ((a, b), count) of the list representation
+        if len(item) == 2 and isinstance(item[0], tuple):
+            return self.weight(*item[0]) == item[1]
+        return item in self.index
+
+    def __repr__(self):
+        return repr(self.edges)
+
+    def has_edge(self, a, b) -> bool:
+        return (a, b) in self.index
+
+    def weight(self, a, b) -> int:
+        position = self.index.get((a, b))
+        return 0 if position is None else self.edges[position][1]
+
+    def activities(self) -> set:
+        return set(self.outgoing) | set(self.ingoing)
+
+    def self_loop_activities(self) -> list:
+        return [a for a, successors in self.outgoing.items() if a in successors]
+
+    def max_count(self) -> int:
+        return max((count for _, count in self.edges), default=0)
+
+    def max_activity_count(self, activity) -> int:
+        # highest count of an edge entering or leaving the activity
+        return max(max(self.outgoing.get(activity, {}).values(), default=0),
+                   max(self.ingoing.get(activity, {}).values(), default=0))
+
+    def fingerprint(self) -> bytes:
+        """
+        Digest of the edges and their counts, independent from the order of the edges
+        """
+        if self._fingerprint is None:
+            digest = blake2b(digest_size=16)
+            for edge in sorted(self.edges):
+                digest.update(repr(edge).encode())
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+    def structure_fingerprint(self) -> bytes:
+        """
+        Digest of the edges without their counts, independent from the order of the edges
+        """
+        if self._structure_fingerprint is None:
+            digest = blake2b(digest_size=16)
+            for edge in sorted(self.index):
+                digest.update(repr(edge).encode())
+            self._structure_fingerprint = digest.digest()
+        return self._structure_fingerprint
+
+    def with_edges(self, edges):
+        return SparseDfg(self.edges + list(edges))
+
+    def without_activities(self, activities):
+        """
+        Returns the graph without the edges touching any of the given activities
+        """
+        activities = set(activities)
+        return SparseDfg([edge for edge in self.edges if edge[0][0] not in activities and
+                          edge[0][1] not in activities])
+
+    def negate(self):
+        """
+        Same as dfg_utils.negate: keeps the edges a -> b such that b -> a is not in the graph
+        """
+        return SparseDfg([edge for edge in self.edges if (edge[0][1], edge[0][0]) not in self.index])
+
+    def filter_noise(self, activities, noise_threshold):
+        """
+        Same as dfg_filtering.clean_dfg_based_on_noise_thresh: drops the edges whose count is lower than
+        noise_threshold times the max activity count of both their activities
+        """
+        max_counts = {a: self.max_activity_count(a) for a in activities}
+        return SparseDfg([((a, b), count) for (a, b), count in self.edges
+                          if count >= min(max_counts.get(a, 0), max_counts.get(b, 0)) * noise_threshold])
+
+    def filter_on_threshold(self, f):
+        """
+        Infrequent filtering of IMf: keeps the edges a -> b whose count is at least f times the count of the most
+        frequent edge leaving a
+        """
+        max_outgoing = {a: max(successors.values()) for a, successors in self.outgoing.items()}
+        return SparseDfg([((a, b), count) for (a, b), count in self.edges if count >= f * max_outgoing[a]])
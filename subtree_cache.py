@@ -0,0 +1,350 @@
+import os
+import pickle
+from collections import Counter, OrderedDict
+from hashlib import blake2b
+
+from compact_log import CompactLog
+from MyParameters import MyParameters
+
+# parameters of the inductive miner changing the discovered subtree, beside the sublog itself
+FALL_THROUGH_KEYS = ('EMPTY_TRACE_KEY', 'ONCE_PER_TRACE_KEY', 'CONCURRENT_KEY', 'STRICT_TAU_LOOP_KEY', 'TAU_LOOP_KEY')
+
+
+def log_fingerprint(log, activity_key: str) -> bytes:
+    """
+    Digest of the multiset of variants of a log, which is all the discovery depends on
+    """
+    if isinstance(log, CompactLog):
+        names = log.activity_index.names
+        variants = Counter()
+        for variant, count in log.variants():
+            variants[tuple(names[a] for a in variant)] += count
+    else:
+        variants = Counter(tuple(event[activity_key] for event in trace) for trace in log)
+    digest = blake2b(digest_size=16)
+    for variant, count in sorted(variants.items()):
+        digest.update(repr((variant, count)).encode())
+    return digest.digest()
+
+
+def tree_to_tuple(tree):
+    """
+    Immutable nested representation (operator value, label, children) of a ProcessTree
+    """
+    operator = tree.operator.value if tree.operator is not None else None
+    return operator, tree.label, tuple(tree_to_tuple(child) for child in tree.children)
+
+
+def tuple_to_tree(representation, parent=None):
+    from pm4py.objects.process_tree.obj import ProcessTree
+    from MyOperator import MyOperator
+    operator, label, children = representation
+    tree = ProcessTree(operator=MyOperator(operator) if operator is not None else None, label=label, parent=parent)
+    for child in children:
+        tree.children.append(tuple_to_tree(child, tree))
+    return tree
+
+
+def parameter_caches(parameters) -> list:
+    """
+    Caches given in the parameters of the algorithm (MyParameters.SUBTREE_CACHE and MyParameters.SWEEP_CACHE)
+    """
+    from pm4py.util import exec_utils
+    caches = (exec_utils.get_param_value(MyParameters.SUBTREE_CACHE, parameters, None),
+              exec_utils.get_param_value(MyParameters.SWEEP_CACHE, parameters, None))
+    return [cache for cache in caches if cache is not None]
+
+
+class CachedSubtree(object):
+    """
+    Subtree structure standing for a subtree found in the cache, get_tree_repr returns its tree
+    """
+
+    def __init__(self, tree, parameters):
+        self.detected_cut = 'cached'
+        self.tree = tree
+        self.children = []
+        self.parameters = parameters
+        self.cache_key = None
+
+
+class SubtreeCache(object):
+    """
+    Memoizes the subtrees discovered on a sublog, keyed by the fingerprint of the sublog and of everything else
+    the discovery of the subtree depends on
+
+    The finished subtrees are kept in a bounded LRU in memory and, if directory is given, pickled on disk so that
+    they survive between runs. A subtree still being built in the current run is shared as it is
+
+    A copy of the cache in another process records what it learns there, which take_delta returns to be merged in
+    the cache of the process owning it by merge
+    """
+
+    def __init__(self, max_size=1024, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # subtrees stored since start_delta (None in the process owning the cache)
+        self.stored = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, log, activity_key, initial_dfg, initial_start_activities, initial_end_activities, sender_nodes,
+            f, noise_threshold, start_activities, end_activities, parameters) -> str:
+        """
+        Parameters
+        -----------
+        log
+            Sublog
+        activity_key
+            Activity attribute
+        initial_dfg
+            DFG of the whole log (SparseDfg), used to detect the received messages
+        initial_start_activities
+            Start activities of the whole log
+        initial_end_activities
+            End activities of the whole log
+        sender_nodes
+            Sender nodes of the party
+        f
+            Noise threshold
+        noise_threshold
+            Noise threshold multiplied by the max count of the dfg
+        start_activities
+            Start activities given to the subtree of the sublog (None if not given)
+        end_activities
+            End activities given to the subtree of the sublog (None if not given)
+        parameters
+            Parameters of the algorithm
+
+        Returns
+        -----------
+        key
+            Hex digest
+        """
+        from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+        from pm4py.util import exec_utils
+        flags = [exec_utils.get_param_value(getattr(Parameters, name), parameters, True) for name in FALL_THROUGH_KEYS]
+        digest = blake2b(digest_size=20)
+        digest.update(log_fingerprint(log, activity_key))
+        digest.update(initial_dfg.fingerprint())
+        digest.update(repr((sorted(initial_start_activities), sorted(initial_end_activities), sorted(sender_nodes),
+                            f, noise_threshold, flags,
+                            sorted(start_activities) if start_activities is not None else None,
+                            sorted(end_activities) if end_activities is not None else None)).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key):
+        """
+        Returns the subtree structure being built in this run, or the nested tuple of the finished subtree,
+        or None if the key is unknown
+        """
+        if key in self.pending:
+            self.hits += 1
+            return self.pending[key]
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as f:
+                tree = pickle.load(f)
+            self._remember(key, tree)
+            self.hits += 1
+            self.disk_hits += 1
+            return tree
+        self.misses += 1
+        return None
+
+    def add_pending(self, key, node):
+        self.pending[key] = node
+
+    def put(self, key, tree):
+        """
+        Stores the nested tuple (see tree_to_tuple) of the finished subtree
+        """
+        self.pending.pop(key, None)
+        self._remember(key, tree)
+        if self.stored is not None:
+            self.stored[key] = tree
+        if self.directory is not None and not os.path.exists(self._path(key)):
+            # written aside and renamed, so that concurrent runs never read a partial file
+            tmp_path = self._path(key) + '.%d.tmp' % os.getpid()
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+
+    def _remember(self, key, tree):
+        self.entries[key] = tree
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'entries': len(self.entries)}
+
+    def start_delta(self):
+        """
+        Starts recording the subtrees stored and the lookups counted by a copy of the cache in another process
+        (see take_delta), done when the copy is unpickled or inherited by a worker
+        """
+        self.stored = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+
+    def take_delta(self):
+        """
+        Returns what was recorded since start_delta or the previous call (None in the process owning the cache)
+        """
+        if self.stored is None:
+            return None
+        delta = {'entries': list(self.stored.items()), 'hits': self.hits, 'disk_hits': self.disk_hits,
+                 'misses': self.misses}
+        self.start_delta()
+        return delta
+
+    def merge(self, delta):
+        """
+        Merges what a copy of the cache learned in another process (see take_delta)
+        """
+        if delta is None:
+            return
+        for key, tree in delta['entries']:
+            self._remember(key, tree)
+        self.hits += delta['hits']
+        self.disk_hits += delta['disk_hits']
+        self.misses += delta['misses']
+
+    def __getstate__(self):
+        # the subtrees being built only make sense in the process building them
+        state = self.__dict__.copy()
+        state['pending'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.start_delta()
+
+
+class SweepCache(SubtreeCache):
+    """
+    Cache shared by the discoveries of the same logs with different noise thresholds (see noise_sweep)
+
+    The noise threshold is used only when a subtree finds no cut on its unfiltered dfg: a subtree where this never
+    happens is the same for every threshold, and is stored under a key leaving the thresholds out. The result of the
+    cut detection on the unfiltered dfg of every sublog (plain_cuts) and the activity found by the probes of the
+    activity concurrent fall through (concurrent_activities) are remembered as well, as they do not depend on the
+    threshold either
+    """
+
+    def __init__(self, max_size=4096, directory=None):
+        super().__init__(max_size, directory)
+        self.plain_cuts = {}
+        self.plain_cut_hits = 0
+        self.concurrent_activities = {}
+        self.concurrent_activity_hits = 0
+        # cut detections and probes done since start_delta (see SubtreeCache.stored)
+        self.stored_plain_cuts = None
+        self.stored_concurrent_activities = None
+
+    def key(self, log, activity_key, initial_dfg, initial_start_activities, initial_end_activities, sender_nodes,
+            f, noise_threshold, start_activities, end_activities, parameters) -> str:
+        # the thresholds are left out, and a missing list of start or end activities is the same as an empty one
+        return super().key(log, activity_key, initial_dfg, initial_start_activities, initial_end_activities,
+                           sender_nodes, None, None, start_activities or [], end_activities or [], parameters)
+
+    def add_pending(self, key, node):
+        # a subtree being built may still turn out to depend on the threshold
+        pass
+
+    def plain_cut(self, key, check_cut):
+        """
+        Returns the result of check_cut (the cut detection on the unfiltered dfg of the sublog), calling it only
+        the first time the sublog is met
+        """
+        if key in self.plain_cuts:
+            self.plain_cut_hits += 1
+        else:
+            self.plain_cuts[key] = check_cut()
+            if self.stored_plain_cuts is not None:
+                self.stored_plain_cuts[key] = self.plain_cuts[key]
+        return self.plain_cuts[key]
+
+    def concurrent_activity(self, key, probe):
+        """
+        Returns the activity found by the probes of the activity concurrent fall through (None if none is found),
+        calling probe only the first time the sublog is met
+        """
+        if key in self.concurrent_activities:
+            self.concurrent_activity_hits += 1
+        else:
+            self.concurrent_activities[key] = probe()
+            if self.stored_concurrent_activities is not None:
+                self.stored_concurrent_activities[key] = self.concurrent_activities[key]
+        return self.concurrent_activities[key]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats['plain_cuts'] = len(self.plain_cuts)
+        stats['plain_cut_hits'] = self.plain_cut_hits
+        stats['concurrent_activities'] = len(self.concurrent_activities)
+        stats['concurrent_activity_hits'] = self.concurrent_activity_hits
+        return stats
+
+    def start_delta(self):
+        super().start_delta()
+        self.stored_plain_cuts = {}
+        self.plain_cut_hits = 0
+        self.stored_concurrent_activities = {}
+        self.concurrent_activity_hits = 0
+
+    def take_delta(self):
+        if self.stored is None:
+            return None
+        probes = {'plain_cuts': self.stored_plain_cuts, 'plain_cut_hits': self.plain_cut_hits,
+                  'concurrent_activities': self.stored_concurrent_activities,
+                  'concurrent_activity_hits': self.concurrent_activity_hits}
+        delta = super().take_delta()
+        delta.update(probes)
+        return delta
+
+    def merge(self, delta):
+        if delta is None:
+            return
+        super().merge(delta)
+        self.plain_cuts.update(delta['plain_cuts'])
+        self.plain_cut_hits += delta['plain_cut_hits']
+        self.concurrent_activities.update(delta['concurrent_activities'])
+        self.concurrent_activity_hits += delta['concurrent_activity_hits']
+
+
+class IncrementalCache(SubtreeCache):
+    """
+    Cache shared by the discoveries of a log growing over time (see incremental_discovery)
+
+    Every new trace changes the counts of the whole log, so the key of SubtreeCache would never match again. A subtree
+    depends on the whole log only through its activities and edges (the sender activities and the received
+    messages), which are all the key keeps: a sublog the new traces did not reach keeps its subtree. The absolute
+    noise threshold, which follows the counts of the whole log, is left out as well, the relative one (f) is kept
+    """
+
+    def key(self, log, activity_key, initial_dfg, initial_start_activities, initial_end_activities, sender_nodes,
+            f, noise_threshold, start_activities, end_activities, parameters) -> str:
+        from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
+        from pm4py.util import exec_utils
+        flags = [exec_utils.get_param_value(getattr(Parameters, name), parameters, True) for name in FALL_THROUGH_KEYS]
+        digest = blake2b(digest_size=20)
+        digest.update(log_fingerprint(log, activity_key))
+        digest.update(initial_dfg.structure_fingerprint())
+        digest.update(repr((sorted(set(initial_start_activities)), sorted(set(initial_end_activities)),
+                            sorted(edge for edge, _ in sender_nodes), f, flags,
+                            sorted(start_activities) if start_activities is not None else None,
+                            sorted(end_activities) if end_activities is not None else None)).encode())
+        return digest.hexdigest()
@@ -1,14 +1,15 @@
 import pm4py
 from pm4py.algo.discovery.inductive.variants.im_f.algorithm import Parameters
-import my_to_bpmn
-import view_process_tree
 import apply_tree
+import log_cache
 
 
 def import_xes(file_path: list[str]):
     event_log = []
     for file_name in file_path:
-        event_log.append(pm4py.read_xes(file_name))
+        # only the attributes used by the discovery are kept, and parsed once: unchanged files are read back from
+        # the columnar cache
+        event_log.append(log_cache.read_xes(file_name))
     params = {
         Parameters.ACTIVITY_KEY: 'concept:name',
         Parameters.TIMESTAMP_KEY: 'time:timestamp',
@@ -22,6 +23,9 @@ def import_xes(file_path: list[str]):
         # im_f_algorithm.Parameters.TAU_LOOP_KEY: "tau_loop",
     }
     process_tree = apply_tree.pm4py.algo.discovery.inductive.variants.im_f.algorithm.apply(event_log, parameters=params)
+    # the viewers are only needed here, a discovery-only run (see cli.py) never imports them
+    import my_to_bpmn
+    import view_process_tree
     view_process_tree.pm4py.view_process_tree(process_tree)
     res = my_to_bpmn.pm4py.convert_to_bpmn(process_tree)
     my_to_bpmn.pm4py.view_bpmn(res)
@@ -0,0 +1,307 @@
+"""
+Replay of the traces of a party against its process tree, receive message and or nodes included
+
+The tree is compiled once into a safe net (places and transitions, the silent ones included) where every node keeps
+the semantics of its operator: the or node runs a non empty subset of its children concurrently, the interleaving
+node runs them one at a time, and a receive message node stands for its receiving activity, the only one the party
+sees. The net is determinized lazily while the traces are replayed: a state is the set of markings reachable after
+a prefix, and every (state, activity) transition is computed once and kept, so that the traces sharing a prefix
+share its replay. Every variant is replayed once, and its result is cached across calls
+"""
+import os
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from MyOperator import MyOperator
+
+# replayed: number of events replayed before the first one the model does not allow (the length of the trace if all)
+ReplayResult = namedtuple('ReplayResult', ['fits', 'replayed', 'length'])
+
+# state in which no marking is reachable any more
+DEAD_STATE = -1
+
+
+class CompiledTree(object):
+    """
+    Safe net of a process tree, determinized lazily
+    """
+
+    def __init__(self, tree):
+        self.n_places = 0
+        # (consumed places, produced places, label), the label being None for the silent transitions
+        self.transitions = []
+        self.by_label = {}
+        self.silent = []
+        source, sink = self._new_place(), self._new_place()
+        self._compile(tree, source, sink)
+        self.final_marking = frozenset([sink])
+        # deterministic states: id -> set of markings, the inverse index and the transitions computed so far
+        self.states = []
+        self.state_ids = {}
+        self.next_states = {}
+        self.initial_state = self._state(self._closure({frozenset([source])}))
+
+    def _new_place(self) -> int:
+        self.n_places += 1
+        return self.n_places - 1
+
+    def _add_transition(self, consumed, produced, label=None):
+        self.transitions.append((frozenset(consumed), frozenset(produced), label))
+        if label is None:
+            self.silent.append(len(self.transitions) - 1)
+        else:
+            self.by_label.setdefault(label, []).append(len(self.transitions) - 1)
+
+    def _compile(self, tree, source, sink):
+        # every node is compiled between an entry place it only consumes and an exit place it only produces, so that
+        # the children of a choice can share them; an explicit stack keeps deep trees within the recursion limit
+        stack = [(tree, source, sink)]
+        while stack:
+            node, entry, exit_place = stack.pop()
+            if node.operator is None:
+                self._add_transition([entry], [exit_place], node.label)
+                continue
+            operator = MyOperator(node.operator.value)
+            children = node.children
+            if operator == MyOperator.RECEIVE_MESSAGE:
+                stack.append((children[-1], entry, exit_place))
+            elif operator == MyOperator.SEQUENCE:
+                places = [entry] + [self._new_place() for _ in children[1:]] + [exit_place]
+                stack.extend((child, places[i], places[i + 1]) for i, child in enumerate(children))
+            elif operator == MyOperator.XOR:
+                stack.extend((child, entry, exit_place) for child in children)
+            elif operator == MyOperator.LOOP:
+                do_place, redo_place = self._new_place(), self._new_place()
+                self._add_transition([entry], [do_place])
+                stack.append((children[0], do_place, redo_place))
+                # the redo children are alternatives
+                stack.extend((child, redo_place, do_place) for child in children[1:])
+                self._add_transition([redo_place], [exit_place])
+            elif operator == MyOperator.PARALLEL:
+                starts = [self._new_place() for _ in children]
+                ends = [self._new_place() for _ in children]
+                self._add_transition([entry], starts)
+                stack.extend((child, starts[i], ends[i]) for i, child in enumerate(children))
+                self._add_transition(ends, [exit_place])
+            elif operator == MyOperator.INTERLEAVING:
+                # a child starts taking the mutex and gives it back when it ends
+                mutex = self._new_place()
+                ready = [self._new_place() for _ in children]
+                done = [self._new_place() for _ in children]
+                self._add_transition([entry], ready + [mutex])
+                for i, child in enumerate(children):
+                    start, end = self._new_place(), self._new_place()
+                    self._add_transition([ready[i], mutex], [start])
+                    stack.append((child, start, end))
+                    self._add_transition([end], [done[i], mutex])
+                self._add_transition(done + [mutex], [exit_place])
+            elif operator == MyOperator.OR:
+                # every child is either skipped or run, the first child run moves the token from none to some and
+                # the join needs some: at least one child has run
+                none, some = self._new_place(), self._new_place()
+                ready = [self._new_place() for _ in children]
+                done = [self._new_place() for _ in children]
+                self._add_transition([entry], ready + [none])
+                for i, child in enumerate(children):
+                    start = self._new_place()
+                    self._add_transition([ready[i]], [done[i]])
+                    self._add_transition([ready[i], none], [start, some])
+                    self._add_transition([ready[i], some], [start, some])
+                    stack.append((child, start, done[i]))
+                self._add_transition(done + [some], [exit_place])
+            else:
+                raise Exception("Unsupported operator: %s" % node.operator)
+
+    def _fire(self, marking, transition):
+        consumed, produced, _ = self.transitions[transition]
+        if consumed <= marking:
+            return (marking - consumed) | produced
+        return None
+
+    def _closure(self, markings) -> frozenset:
+        # markings reachable through silent transitions
+        reached = set(markings)
+        to_visit = list(markings)
+        while to_visit:
+            marking = to_visit.pop()
+            for transition in self.silent:
+                fired = self._fire(marking, transition)
+                if fired is not None and fired not in reached:
+                    reached.add(fired)
+                    to_visit.append(fired)
+        return frozenset(reached)
+
+    def _state(self, markings) -> int:
+        if not markings:
+            return DEAD_STATE
+        state = self.state_ids.get(markings)
+        if state is None:
+            state = len(self.states)
+            self.state_ids[markings] = state
+            self.states.append(markings)
+        return state
+
+    def step(self, state, label) -> int:
+        """
+        State reached from state replaying an event of the activity label, DEAD_STATE if the model does not allow it
+        """
+        key = (state, label)
+        next_state = self.next_states.get(key)
+        if next_state is None:
+            markings = set()
+            for marking in self.states[state]:
+                for transition in self.by_label.get(label, ()):
+                    fired = self._fire(marking, transition)
+                    if fired is not None:
+                        markings.add(fired)
+            next_state = self._state(self._closure(markings))
+            self.next_states[key] = next_state
+        return next_state
+
+    def accepts(self, state) -> bool:
+        return state != DEAD_STATE and self.final_marking in self.states[state]
+
+    def replay(self, variant) -> ReplayResult:
+        """
+        Replays a trace, given as the sequence of its activities
+        """
+        state = self.initial_state
+        for position, label in enumerate(variant):
+            state = self.step(state, label)
+            if state == DEAD_STATE:
+                return ReplayResult(False, position, len(variant))
+        return ReplayResult(self.accepts(state), len(variant), len(variant))
+
+
+# compiled tree of the worker, set once by the pool initializer
+_compiled = None
+
+
+def _init_worker(compiled):
+    global _compiled
+    _compiled = compiled
+
+
+def _replay_chunk(variants):
+    # top level function, so that it can be sent to the workers of the pool
+    return [_compiled.replay(variant) for variant in variants]
+
+
+class TreeReplayer(object):
+    """
+    Replays logs against a process tree, caching the result of every variant
+    """
+
+    def __init__(self, tree, cache_size=1000000, n_jobs=1, chunk_size=1000):
+        """
+        Parameters
+        -----------
+        tree
+            Process tree (receive message and or nodes included)
+        cache_size
+            Maximum number of variants whose result is kept
+        n_jobs
+            Number of worker processes replaying the new variants (None: number of cpus, 1: in this process)
+        chunk_size
+            Number of variants sent to a worker at a time
+        """
+        self.compiled = CompiledTree(tree)
+        self.cache_size = cache_size
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.results = OrderedDict()
+
+    def _remember(self, variant, result):
+        self.results[variant] = result
+        self.results.move_to_end(variant)
+        while len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+
+    def replay_variants(self, variants) -> list[ReplayResult]:
+        """
+        Replays a list of traces, each one given as the tuple of its activities; the variants not in the cache are
+        replayed on the pool if there are more than a chunk of them
+        """
+        variants = [tuple(variant) for variant in variants]
+        new_variants = list(dict.fromkeys(variant for variant in variants if variant not in self.results))
+        if self.n_jobs > 1 and len(new_variants) > self.chunk_size:
+            chunks = [new_variants[i:i + self.chunk_size] for i in range(0, len(new_variants), self.chunk_size)]
+            # the compiled tree is sent once to every worker, with the states found so far
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(self.compiled,)) as executor:
+                for chunk, results in zip(chunks, executor.map(_replay_chunk, chunks)):
+                    for variant, result in zip(chunk, results):
+                        self._remember(variant, result)
+        else:
+            for variant in new_variants:
+                self._remember(variant, self.compiled.replay(variant))
+        results = []
+        for variant in variants:
+            result = self.results.get(variant)
+            if result is None:
+                # evicted by the variants replayed after it
+                result = self.compiled.replay(variant)
+            results.append(result)
+        return results
+
+    def replay_log(self, log, activity_key='concept:name') -> dict:
+        """
+        Replays a log of the party of the tree
+
+        Parameters
+        -----------
+        log
+            EventLog, CompactLog, or iterable of traces given as sequences of activities
+        activity_key
+            Activity attribute
+
+        Returns
+        -----------
+        dict
+            traces, fitting_traces, trace_fitness (fraction of the traces fitting), event_fitness (fraction of the
+            events replayed before the first one not allowed) and variants (variant -> ReplayResult)
+        """
+        from compact_log import CompactLog
+        from log_statistics import log_variants
+        if isinstance(log, CompactLog) or hasattr(log, 'attributes'):
+            variants = log_variants(log, activity_key)
+        else:
+            variants = list(Counter(tuple(trace) for trace in log).items())
+        results = self.replay_variants([variant for variant, _ in variants])
+        traces = fitting_traces = events = replayed_events = 0
+        for (variant, count), result in zip(variants, results):
+            traces += count
+            fitting_traces += count if result.fits else 0
+            events += result.length * count
+            replayed_events += result.replayed * count
+        return {
+            'traces': traces,
+            'fitting_traces': fitting_traces,
+            'trace_fitness': fitting_traces / traces if traces else 1.0,
+            'event_fitness': replayed_events / events if events else 1.0,
+            'variants': {variant: result for (variant, _), result in zip(variants, results)},
+        }
+
+
+def replay_parties(trees, logs, activity_key='concept:name', n_jobs=1) -> dict:
+    """
+    Replays the log of every party against its tree
+
+    Parameters
+    -----------
+    trees
+        Index of the party -> process tree, as returned by my_apply_tree_multi_party
+    logs
+        One log per party, as accepted by TreeReplayer.replay_log
+    activity_key
+        Activity attribute
+    n_jobs
+        Number of worker processes of every replayer
+
+    Returns
+    -----------
+    dict
+        Index of the party -> result of TreeReplayer.replay_log
+    """
+    return {index: TreeReplayer(tree, n_jobs=n_jobs).replay_log(logs[index], activity_key)
+            for index, tree in trees.items()}
@@ -0,0 +1,118 @@
+import sys
+from datetime import datetime
+from xml.etree import ElementTree
+
+# attributes used by the discovery (activity, timestamp) and by the message correlation between parties
+DEFAULT_EVENT_ATTRIBUTES = ('concept:name', 'time:timestamp', 'msgInstanceId', 'msgType', 'msgFlow')
+# the case id is stored as the concept:name of the trace
+DEFAULT_TRACE_ATTRIBUTES = ('concept:name',)
+# types of the attributes with a value; list and container attributes only nest other attributes
+SCALAR_TYPES = frozenset(('string', 'id', 'date', 'int', 'float', 'boolean'))
+
+
+def _local_name(tag: str) -> str:
+    # XES files may or may not declare the xes namespace
+    if tag[0] == '{':
+        return tag[tag.index('}') + 1:]
+    return tag
+
+
+def _parse_value(type_name: str, value: str):
+    if type_name == 'date':
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        return datetime.fromisoformat(value)
+    elif type_name == 'int':
+        return int(value)
+    elif type_name == 'float':
+        return float(value)
+    elif type_name == 'boolean':
+        return value.lower() == 'true'
+    # strings and ids are repeated over and over in the log, interning them avoids a copy per event
+    return sys.intern(value)
+
+
+def _project(element, keys: frozenset) -> dict:
+    projected = {}
+    for child in element:
+        key = child.get('key')
+        if key not in keys:
+            continue
+        type_name = _local_name(child.tag)
+        value = child.get('value')
+        if type_name in SCALAR_TYPES and value is not None:
+            projected[sys.intern(key)] = _parse_value(type_name, value)
+    return projected
+
+
+def iter_xes_traces(file_path: str, event_attributes=DEFAULT_EVENT_ATTRIBUTES,
+                    trace_attributes=DEFAULT_TRACE_ATTRIBUTES):
+    """
+    Incrementally parses a XES file, yielding one trace at a time
+
+    Every event is projected on event_attributes as soon as it is closed, and the XML elements already consumed
+    are dropped, so that the memory used does not depend on the size of the XML document
+
+    Parameters
+    -----------
+    file_path
+        Path of the XES file
+    event_attributes
+        Keys of the event attributes to keep
+    trace_attributes
+        Keys of the trace attributes to keep
+
+    Returns
+    -----------
+    generator
+        Tuples (trace attributes, list of events), every event being a dict of the projected attributes
+    """
+    event_attributes = frozenset(event_attributes)
+    trace_attributes = frozenset(trace_attributes)
+    root = None
+    events = []
+    for action, element in ElementTree.iterparse(file_path, events=('start', 'end')):
+        if action == 'start':
+            if root is None:
+                root = element
+            elif _local_name(element.tag) == 'trace':
+                events = []
+            continue
+        tag = _local_name(element.tag)
+        if tag == 'event':
+            events.append(_project(element, event_attributes))
+            element.clear()
+        elif tag == 'trace':
+            attributes = _project(element, trace_attributes)
+            element.clear()
+            # release the traces already yielded, which are still referenced by the root element
+            root.clear()
+            yield attributes, events
+
+
+def read_xes(file_path: str, event_attributes=DEFAULT_EVENT_ATTRIBUTES, trace_attributes=DEFAULT_TRACE_ATTRIBUTES):
+    """
+    Reads a XES file into an EventLog keeping only the given attributes
+
+    Parameters
+    -----------
+    file_path
+        Path of the XES file
+    event_attributes
+        Keys of the event attributes to keep
+    trace_attributes
+        Keys of the trace attributes to keep
+
+    Returns
+    -----------
+    log
+        Projected event log
+    """
+    from pm4py.objects.log.obj import EventLog, Trace, Event
+    log = EventLog()
+    for attributes, events in iter_xes_traces(file_path, event_attributes, trace_attributes):
+        trace = Trace(attributes=attributes)
+        for event in events:
+            trace.append(Event(event))
+        log.append(trace)
+    return log